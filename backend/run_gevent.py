@@ -0,0 +1,45 @@
+"""Point d'entrée haute concurrence : serveur gevent (green threads)
+
+Chaque client en long-polling garde une requête HTTP en attente ; avec le
+serveur Werkzeug de src/main.py, cela immobilise un thread système par
+utilisateur. Ici chaque requête est servie par un greenlet (quelques Ko) :
+un seul processus peut garder plus de 10 000 utilisateurs connectés.
+
+Usage : pip install -r requirements-gevent.txt
+        python run_gevent.py
+"""
+# Le monkey patching doit précéder tout autre import : les verrous et files
+# du matchmaking deviennent coopératifs au lieu de bloquer le processus
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import resource
+
+os.environ.setdefault('VOCALINE_ASYNC_MODE', 'gevent')
+
+
+def raise_open_files_limit():
+    """Relever la limite de descripteurs ouverts (un par connexion) au maximum autorisé"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        target = hard if hard != resource.RLIM_INFINITY else 65536
+        resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, target), hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+if __name__ == '__main__':
+    open_files = raise_open_files_limit()
+
+    from src.main import app, socketio
+    from src.utils.logger import vocaline_logger
+
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+    vocaline_logger.log('SERVER_START', None, None,
+                       f'Serveur gevent démarré sur {host}:{port}',
+                       {'async_mode': socketio.async_mode, 'open_files_limit': open_files})
+    # Pas de log d'accès : une ligne par requête de polling coûte plus cher que la requête elle-même
+    socketio.run(app, host=host, port=port,
+                 log_output=os.environ.get('VOCALINE_ACCESS_LOG') == '1',
+                 backlog=int(os.environ.get('VOCALINE_LISTEN_BACKLOG', '2048')))
@@ -39,6 +39,10 @@ app.register_blueprint(logs_bp)
 from src.routes.mobile_debug import mobile_debug_bp
 app.register_blueprint(mobile_debug_bp)
 
+# Import metrics routes (Prometheus)
+from src.routes.metrics import metrics_bp
+app.register_blueprint(metrics_bp)
+
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -64,4 +68,4 @@ def serve(path):
 
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    socketio.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
@@ -1,39 +1,40 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-import os
-import json
+from datetime import date, datetime
+from src.utils.feedback_search import FeedbackIndex
+from src.utils.feedback_stats import FeedbackStats
+from src.utils.feedback_store import create_feedback_store
 
 feedback_bp = Blueprint('feedback', __name__)
 
-# Chemin vers le fichier de stockage des avis
-FEEDBACK_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'feedback.json')
+# Stockage des avis en ajout seul : JSONL (défaut) ou SQLite (VOCALINE_FEEDBACK_BACKEND=sqlite:///...)
+feedback_store = create_feedback_store()
+# Compteurs des avis (total, par jour) : construits une fois au démarrage, puis tenus à jour
+feedback_stats = FeedbackStats(feedback_store)
+feedback_stats.sync()
+# Index plein texte des avis, complété de la même façon
+feedback_index = FeedbackIndex(feedback_store)
+feedback_index.sync()
 
-def ensure_feedback_directory():
-    """S'assurer que le répertoire data existe"""
-    data_dir = os.path.dirname(FEEDBACK_FILE)
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+# Nombre d'avis retournés par défaut et au maximum par page de /api/feedback
+FEEDBACK_PAGE = 50
+FEEDBACK_PAGE_MAX = 500
+# Nombre de résultats retournés par défaut et au maximum par page de /api/feedback/search
+SEARCH_PAGE = 20
+SEARCH_PAGE_MAX = 100
 
-def load_feedback():
-    """Charger les avis depuis le fichier JSON"""
-    ensure_feedback_directory()
-    if os.path.exists(FEEDBACK_FILE):
-        try:
-            with open(FEEDBACK_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
+def load_feedback_page(before: int = None, limit: int = FEEDBACK_PAGE):
+    """Charger une page d'avis, du plus récent au plus ancien
 
-def save_feedback(feedback_list):
-    """Sauvegarder les avis dans le fichier JSON"""
-    ensure_feedback_directory()
-    try:
-        with open(FEEDBACK_FILE, 'w', encoding='utf-8') as f:
-            json.dump(feedback_list, f, ensure_ascii=False, indent=2)
-        return True
-    except IOError:
-        return False
+    `before` est un curseur : le rang (ordre d'arrivée) du plus ancien avis
+    de la page précédente ; seuls les avis de rang inférieur sont retournés.
+    Retourne (avis, curseur de la page suivante ou None s'il n'y en a plus).
+    """
+    total = len(feedback_store)
+    stop = total if before is None else max(0, min(before, total))
+    start = max(0, stop - limit)
+    feedback_list = feedback_store.entries(start, stop)
+    feedback_list.reverse()
+    return feedback_list, start if start > 0 else None
 
 @feedback_bp.route('/feedback', methods=['POST'])
 def submit_feedback():
@@ -60,34 +61,58 @@ def submit_feedback():
             'user_agent': request.headers.get('User-Agent', '')
         }
         
-        # Charger les avis existants
-        feedback_list = load_feedback()
-        
-        # Ajouter le nouvel avis
-        feedback_list.append(feedback_entry)
-        
-        # Sauvegarder
-        if save_feedback(feedback_list):
+        # Ajouter l'avis en fin de stockage, sans relire les avis existants
+        try:
+            feedback_store.append(feedback_entry)
+        except TimeoutError:
+            # L'avis reste dans la file d'écriture et sera enregistré : ne pas
+            # répondre en erreur, pour que le client ne le soumette pas une seconde fois
             return jsonify({
                 'success': True,
-                'message': 'Avis enregistré avec succès',
+                'pending': True,
+                'message': 'Avis en cours d\'enregistrement',
                 'id': feedback_entry['id']
-            }), 200
-        else:
-            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500            
+            }), 202
+        except (IOError, OSError) as e:
+            print(f"Erreur lors de la sauvegarde d'un avis: {e}")
+            return jsonify({'error': 'Erreur lors de la sauvegarde'}), 500
+        feedback_stats.sync()
+        feedback_index.sync()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Avis enregistré avec succès',
+            'id': feedback_entry['id']
+        }), 200
     except Exception as e:
         print(f"Erreur lors de la soumission d'avis: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
 @feedback_bp.route('/feedback', methods=['GET'])
 def get_feedback():
-    """Endpoint pour récupérer tous les avis (pour l'administration)"""
+    """Endpoint pour récupérer les avis (pour l'administration), par pages
+
+    Paramètres optionnels : limit (50 par défaut, 500 au plus) et before
+    (curseur : `next_before` de la page précédente). Les avis sont retournés
+    du plus récent au plus ancien ; `next_before` vaut None sur la dernière page.
+    """
     try:
-        feedback_list = load_feedback()
+        try:
+            limit = int(request.args.get('limit') or FEEDBACK_PAGE)
+            before = request.args.get('before')
+            before = int(before) if before else None
+        except ValueError:
+            return jsonify({'error': 'Paramètre invalide'}), 400
+        if limit < 1 or (before is not None and before < 0):
+            return jsonify({'error': 'Paramètre invalide'}), 400
+        
+        feedback_list, next_before = load_feedback_page(before, min(limit, FEEDBACK_PAGE_MAX))
         return jsonify({
             'success': True,
             'feedback': feedback_list,
-            'count': len(feedback_list)
+            'count': len(feedback_list),
+            'total': len(feedback_store),
+            'next_before': next_before
         }), 200
     except Exception as e:
         print(f"Erreur lors de la récupération des avis: {e}")
@@ -95,20 +120,72 @@ def get_feedback():
 
 @feedback_bp.route('/feedback/stats', methods=['GET'])
 def get_feedback_stats():
-    """Endpoint pour récupérer les statistiques des avis"""
+    """Endpoint pour récupérer les statistiques des avis
+
+    Paramètres optionnels : from et to (dates AAAA-MM-JJ, bornes incluses)
+    pour compter les avis d'une période.
+    """
     try:
-        feedback_list = load_feedback()
+        # Compteurs en mémoire : aucun avis n'est relu
+        stats = feedback_stats.get_stats()
         
-             # Calculer les statistiques
-        total_feedback = len(feedback_list)
+        start = request.args.get('from')
+        end = request.args.get('to')
+        if start or end:
+            try:
+                start = date.fromisoformat(start) if start else date.min
+                end = date.fromisoformat(end) if end else None
+            except ValueError:
+                return jsonify({'error': 'Dates invalides (format AAAA-MM-JJ)'}), 400
+            stats['range'] = {
+                'from': request.args.get('from'),
+                'to': request.args.get('to'),
+                'count': feedback_stats.count(start, end)
+            }
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_feedback': total_feedback
-            }
+            'stats': stats
         }), 200
     except Exception as e:
         print(f"Erreur lors de la récupération des statistiques: {e}")
         return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+@feedback_bp.route('/feedback/search', methods=['GET'])
+def search_feedback():
+    """Endpoint de recherche plein texte dans les avis
+
+    Paramètres : q (mots recherchés, sans tenir compte des accents ; `mot*`
+    cherche les mots commençant par `mot`), limit (20 par défaut, 100 au plus)
+    et offset. Les avis contenant tous les mots sont classés par pertinence ;
+    `next_offset` vaut None sur la dernière page.
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Recherche manquante'}), 400
+    try:
+        limit = int(request.args.get('limit') or SEARCH_PAGE)
+        offset = int(request.args.get('offset') or 0)
+    except ValueError:
+        return jsonify({'error': 'Paramètre invalide'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'Paramètre invalide'}), 400
+    limit = min(limit, SEARCH_PAGE_MAX)
+    
+    try:
+        results, total = feedback_index.search(query, offset, limit)
+        # Avis de la page lus en une fois (une ouverture du fichier ou une requête)
+        feedback_list = feedback_store.entries_at([rank for rank, _ in results])
+        for feedback, (_, score) in zip(feedback_list, results):
+            feedback['score'] = score
+        return jsonify({
+            'success': True,
+            'query': query,
+            'feedback': feedback_list,
+            'count': len(feedback_list),
+            'total': total,
+            'next_offset': offset + limit if offset + limit < total else None
+        }), 200
+    except Exception as e:
+        print(f"Erreur lors de la recherche dans les avis: {e}")
+        return jsonify({'error': 'Erreur interne du serveur'}), 500
@@ -1,6 +1,5 @@
-from flask import Blueprint, render_template_string, jsonify
-from src.routes.feedback import load_feedback
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template_string
+from src.routes.feedback import FEEDBACK_PAGE, feedback_stats, load_feedback_page
 
 feedback_page_bp = Blueprint('feedback_page', __name__)
 
@@ -86,6 +85,27 @@ FEEDBACK_PAGE_TEMPLATE = """
         .btn-secondary:hover {
             background: #5a6268;
         }
+        .search {
+            padding: 20px;
+            border-bottom: 1px solid #e9ecef;
+            display: flex;
+            gap: 10px;
+            align-items: center;
+            flex-wrap: wrap;
+        }
+        .search input {
+            flex: 1;
+            min-width: 200px;
+            padding: 10px 14px;
+            border: 1px solid #ced4da;
+            border-radius: 6px;
+            font-size: 16px;
+        }
+        .search-summary {
+            color: #6c757d;
+            font-size: 0.9em;
+            width: 100%;
+        }
         .feedback-list {
             padding: 20px;
         }
@@ -137,6 +157,11 @@ FEEDBACK_PAGE_TEMPLATE = """
             padding: 8px 12px;
             border-radius: 4px;
         }
+        .load-more {
+            text-align: center;
+            padding: 10px 20px 30px;
+            color: #6c757d;
+        }
         .empty-state {
             text-align: center;
             padding: 60px 20px;
@@ -204,7 +229,14 @@ FEEDBACK_PAGE_TEMPLATE = """
             <button class="btn btn-secondary" onclick="location.reload()">🔄 Actualiser</button>
         </div>
         
-        <div class="feedback-list">
+        <form class="search" onsubmit="searchFeedback(); return false;">
+            <input type="search" id="searchInput" placeholder="Rechercher dans les avis (ex : audio, connex*, micro bluetooth)">
+            <button class="btn" type="submit">🔍 Rechercher</button>
+            <button class="btn btn-secondary" type="button" onclick="location.reload()">✖ Effacer</button>
+            <div class="search-summary" id="searchSummary"></div>
+        </form>
+        
+        <div class="feedback-list" id="feedbackList">
             {% if feedback_list %}
                 {% for feedback in feedback_list %}
                 <div class="feedback-item">
@@ -217,7 +249,7 @@ FEEDBACK_PAGE_TEMPLATE = """
                     </div>
                     <div class="feedback-meta">
                         <div class="meta-item">
-                            <strong>IP:</strong> {{ feedback.ip_address }}
+                            <strong>IP:</strong> {{ feedback.ip_address or 'Non disponible' }}
                         </div>
                         <div class="meta-item">
                             <strong>Navigateur:</strong> {{ feedback.user_agent_short }}
@@ -232,6 +264,10 @@ FEEDBACK_PAGE_TEMPLATE = """
                 </div>
             {% endif %}
         </div>
+        
+        <div class="load-more" id="loadMore" {% if next_before is none %}style="display: none;"{% endif %}>
+            <button class="btn btn-secondary" onclick="loadMoreFeedback()">⬇️ Avis plus anciens</button>
+        </div>
     </div>
     
     <div class="copy-notification" id="copyNotification">
@@ -239,8 +275,117 @@ FEEDBACK_PAGE_TEMPLATE = """
     </div>
 
     <script>
-        function copyAllFeedback() {
-            const feedbackData = {{ feedback_json | safe }};
+        // Les avis suivants sont chargés par pages depuis /api/feedback (curseur `before`)
+        const PAGE_SIZE = {{ page_size }};
+        let nextBefore = {{ next_before | tojson }};
+        let loading = false;
+        // Recherche en cours (null = liste de tous les avis) et position de sa page suivante
+        let searchQuery = null;
+        let nextOffset = null;
+        
+        function escapeHtml(text) {
+            const div = document.createElement('div');
+            div.textContent = text == null ? '' : String(text);
+            return div.innerHTML;
+        }
+        
+        function renderFeedback(feedback) {
+            return `
+                <div class="feedback-item">
+                    <div class="feedback-header">
+                        <div class="feedback-date">${escapeHtml(feedback.formatted_date)}</div>
+                        <div class="feedback-id">ID: ${escapeHtml(feedback.short_id)}</div>
+                    </div>
+                    <div class="feedback-content">
+                        ${escapeHtml(feedback.feedback)}
+                    </div>
+                    <div class="feedback-meta">
+                        <div class="meta-item">
+                            <strong>IP:</strong> ${escapeHtml(feedback.ip_address || 'Non disponible')}
+                        </div>
+                        <div class="meta-item">
+                            <strong>Navigateur:</strong> ${escapeHtml(feedback.user_agent_short)}
+                        </div>
+                    </div>
+                </div>
+            `;
+        }
+        
+        async function loadMoreFeedback() {
+            if (loading || (searchQuery === null ? nextBefore : nextOffset) === null) return;
+            loading = true;
+            try {
+                let data;
+                if (searchQuery === null) {
+                    const response = await fetch(`/api/feedback?limit=${PAGE_SIZE}&before=${nextBefore}`);
+                    data = await response.json();
+                    nextBefore = data.next_before;
+                } else {
+                    const params = new URLSearchParams({ q: searchQuery, limit: PAGE_SIZE, offset: nextOffset });
+                    const response = await fetch('/api/feedback/search?' + params.toString());
+                    data = await response.json();
+                    nextOffset = data.next_offset;
+                }
+                document.getElementById('feedbackList')
+                    .insertAdjacentHTML('beforeend', data.feedback.map(renderFeedback).join(''));
+                if ((searchQuery === null ? nextBefore : nextOffset) === null) {
+                    document.getElementById('loadMore').style.display = 'none';
+                }
+            } catch (error) {
+                console.error('Erreur lors du chargement des avis:', error);
+            } finally {
+                loading = false;
+            }
+        }
+        
+        // Recherche côté serveur (index plein texte), résultats classés par pertinence
+        async function searchFeedback() {
+            const query = document.getElementById('searchInput').value.trim();
+            if (!query) {
+                location.reload();
+                return;
+            }
+            try {
+                const params = new URLSearchParams({ q: query, limit: PAGE_SIZE });
+                const response = await fetch('/api/feedback/search?' + params.toString());
+                const data = await response.json();
+                searchQuery = query;
+                nextOffset = data.next_offset;
+                document.getElementById('searchSummary').textContent =
+                    `${data.total} avis trouvé${data.total > 1 ? 's' : ''} pour « ${query} »`;
+                document.getElementById('feedbackList').innerHTML = data.feedback.length
+                    ? data.feedback.map(renderFeedback).join('')
+                    : '<div class="empty-state"><h3>Aucun avis trouvé</h3></div>';
+                document.getElementById('loadMore').style.display = nextOffset === null ? 'none' : '';
+            } catch (error) {
+                console.error('Erreur lors de la recherche:', error);
+            }
+        }
+        
+        // Chargement automatique quand le bas de la liste devient visible
+        if ('IntersectionObserver' in window) {
+            new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) loadMoreFeedback();
+            }, { rootMargin: '400px' }).observe(document.getElementById('loadMore'));
+        }
+        
+        // Tous les avis (pour la copie et l'export), du plus récent au plus ancien
+        async function fetchAllFeedback() {
+            let feedbackData = [];
+            let before = null;
+            do {
+                const params = new URLSearchParams({ limit: 500 });
+                if (before !== null) params.set('before', before);
+                const response = await fetch('/api/feedback?' + params.toString());
+                const data = await response.json();
+                feedbackData = feedbackData.concat(data.feedback);
+                before = data.next_before;
+            } while (before !== null);
+            return feedbackData;
+        }
+        
+        async function copyAllFeedback() {
+            const feedbackData = await fetchAllFeedback();
             
             let textToCopy = "AVIS UTILISATEURS VOCALINE\\n";
             textToCopy += "=" + "=".repeat(50) + "\\n\\n";
@@ -249,8 +394,8 @@ FEEDBACK_PAGE_TEMPLATE = """
                 textToCopy += `AVIS #${index + 1}\\n`;
                 textToCopy += `Date: ${feedback.formatted_date}\\n`;
                 textToCopy += `Contenu: ${feedback.feedback}\\n`;
-                textToCopy += `IP: ${feedback.ip_address}\\n`;
-                textToCopy += `Navigateur: ${feedback.user_agent}\\n`;
+                textToCopy += `IP: ${feedback.ip_address || 'Non disponible'}\\n`;
+                textToCopy += `Navigateur: ${feedback.user_agent || 'Non disponible'}\\n`;
                 textToCopy += "-".repeat(50) + "\\n\\n";
             });
             
@@ -269,16 +414,16 @@ FEEDBACK_PAGE_TEMPLATE = """
             });
         }
         
-        function exportToCSV() {
-            const feedbackData = {{ feedback_json | safe }};
+        async function exportToCSV() {
+            const feedbackData = await fetchAllFeedback();
             
             let csvContent = "Date,Avis,IP,Navigateur\\n";
             feedbackData.forEach(feedback => {
                 const row = [
                     feedback.formatted_date,
                     `"${feedback.feedback.replace(/"/g, '""')}"`,
-                    feedback.ip_address,
-                    `"${feedback.user_agent.replace(/"/g, '""')}"`
+                    feedback.ip_address || 'Non disponible',
+                    `"${(feedback.user_agent || 'Non disponible').replace(/"/g, '""')}"`
                 ].join(',');
                 csvContent += row + "\\n";
             });
@@ -308,65 +453,27 @@ FEEDBACK_PAGE_TEMPLATE = """
 
 @feedback_page_bp.route('/feedbacks')
 def feedback_page():
-    """Page d'affichage de tous les avis utilisateurs"""
+    """Page d'affichage des avis utilisateurs
+
+    Seule la première page d'avis (les plus récents) est rendue ; les
+    suivantes sont chargées par la page au défilement. Les champs affichés
+    (date formatée, ID court, navigateur tronqué) sont calculés à l'écriture.
+    """
     try:
-        # Charger tous les avis
-        feedback_list = load_feedback()
-        
-        # Traitement des données pour l'affichage
-        processed_feedback = []
-        today = datetime.now().date()
-        week_start = today - timedelta(days=7)
-        
-        today_count = 0
-        week_count = 0
-        
-        for feedback in reversed(feedback_list):  # Plus récents en premier
-            try:
-                # Formatage de la date
-                feedback_date = datetime.fromisoformat(feedback['timestamp'].replace('Z', '+00:00'))
-                formatted_date = feedback_date.strftime('%d/%m/%Y à %H:%M')
-                
-                # Compteurs
-                feedback_date_only = feedback_date.date()
-                if feedback_date_only == today:
-                    today_count += 1
-                if feedback_date_only >= week_start:
-                    week_count += 1
-                
-                # ID court
-                short_id = feedback['id'][:8] if 'id' in feedback else 'N/A'
-                
-                # User agent court
-                user_agent = feedback.get('user_agent', 'Non disponible')
-                user_agent_short = user_agent[:50] + '...' if len(user_agent) > 50 else user_agent
-                
-                processed_feedback.append({
-                    'feedback': feedback['feedback'],
-                    'formatted_date': formatted_date,
-                    'short_id': short_id,
-                    'ip_address': feedback.get('ip_address', 'Non disponible'),
-                    'user_agent': user_agent,
-                    'user_agent_short': user_agent_short
-                })
-            except Exception as e:
-                print(f"Erreur lors du traitement d'un avis: {e}")
-                continue
-        
-        # Données JSON pour JavaScript
-        import json
-        feedback_json = json.dumps(processed_feedback, ensure_ascii=False)
+        # Compteurs en mémoire : aucun horodatage n'est relu pour les calculer
+        stats = feedback_stats.get_stats()
+        feedback_list, next_before = load_feedback_page(limit=FEEDBACK_PAGE)
         
         return render_template_string(
             FEEDBACK_PAGE_TEMPLATE,
-            feedback_list=processed_feedback,
-            feedback_count=len(feedback_list),
-            today_count=today_count,
-            week_count=week_count,
-            feedback_json=feedback_json
+            feedback_list=feedback_list,
+            feedback_count=stats['total_feedback'],
+            today_count=stats['today'],
+            week_count=stats['week'],
+            next_before=next_before,
+            page_size=FEEDBACK_PAGE
         )
         
     except Exception as e:
         print(f"Erreur lors de l'affichage de la page des avis: {e}")
         return f"Erreur lors du chargement des avis: {str(e)}", 500
-
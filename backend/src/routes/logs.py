@@ -1,9 +1,22 @@
-from flask import Blueprint, jsonify, render_template_string
+from flask import Blueprint, Response, jsonify, render_template_string, request
+from datetime import datetime
 from src.utils.logger import vocaline_logger
+from src.utils.call_timeline import call_timelines
+from src.utils.log_export import EXPORT_FORMATS, export_logs
+from src.utils.log_query import LogQuery
+from src.utils.log_tail import LogTail
+import hashlib
 import json
+import os
+
+# Jeton exigé (en-tête X-Admin-Token) pour modifier la configuration des logs ; vide = pas de contrôle
+ADMIN_TOKEN = os.environ.get('VOCALINE_ADMIN_TOKEN', '')
 
 logs_bp = Blueprint('logs', __name__)
 
+# Diffusion des nouveaux logs aux pages /logs ouvertes
+log_tail = LogTail(vocaline_logger)
+
 @logs_bp.route('/logs', methods=['GET'])
 def logs_page():
     """Page web pour consulter les logs"""
@@ -214,8 +227,10 @@ def logs_page():
         <div class="controls">
             <button class="btn btn-primary" onclick="refreshLogs()">🔄 Actualiser</button>
             <button class="btn btn-success" onclick="copyLogs()">📋 Copier tous les logs</button>
-            <button class="btn btn-warning" onclick="exportLogs()">📥 Exporter CSV</button>
+            <button class="btn btn-warning" onclick="exportLogs('csv')">📥 Exporter CSV</button>
+            <button class="btn btn-warning" onclick="exportLogs('ndjson')">📥 Exporter NDJSON</button>
             <button class="btn btn-danger" onclick="clearLogs()">🗑️ Vider les logs</button>
+            <a class="btn btn-primary" href="/logs/rooms" style="text-decoration: none;">📞 Appels</a>
             
             <div class="filter-group">
                 <label>Filtrer par type:</label>
@@ -240,6 +255,8 @@ def logs_page():
     <script>
         let allLogs = [];
         let filteredLogs = [];
+        let lastSeq = 0;
+        let eventSource = null;
         
         function showNotification(message, type = 'success') {
             const notification = document.getElementById('notification');
@@ -253,12 +270,20 @@ def logs_page():
         
         async function loadLogs() {
             try {
-                const response = await fetch('/api/logs');
+                // Filtrage et limite appliqués par le serveur
+                const params = new URLSearchParams();
+                const typeFilter = document.getElementById('typeFilter').value;
+                if (typeFilter) params.set('type', typeFilter);
+                params.set('limit', parseInt(document.getElementById('limitInput').value) || 100);
+                const response = await fetch('/api/logs?' + params.toString());
                 const data = await response.json();
                 allLogs = data.logs;
+                lastSeq = data.last_seq;
                 updateStats(data.stats);
-                updateTypeFilter();
-                filterLogs();
+                updateTypeFilter(data.stats);
+                filteredLogs = allLogs.slice();
+                displayLogs();
+                openStream();
             } catch (error) {
                 console.error('Erreur lors du chargement des logs:', error);
                 showNotification('Erreur lors du chargement des logs', 'error');
@@ -287,9 +312,11 @@ def logs_page():
             `;
         }
         
-        function updateTypeFilter() {
+        function updateTypeFilter(stats) {
             const typeFilter = document.getElementById('typeFilter');
-            const types = [...new Set(allLogs.map(log => log.event_type))];
+            const selected = typeFilter.value;
+            const types = Object.keys(stats.event_counts).sort();
+            if (selected && !types.includes(selected)) types.push(selected);
             
             typeFilter.innerHTML = '<option value="">Tous les types</option>';
             types.forEach(type => {
@@ -298,17 +325,41 @@ def logs_page():
                 option.textContent = type;
                 typeFilter.appendChild(option);
             });
+            typeFilter.value = selected;
         }
         
         function filterLogs() {
+            loadLogs();
+        }
+        
+        // Nouveaux logs poussés par le serveur (Server-Sent Events) : seuls les
+        // logs ajoutés depuis le dernier envoi transitent
+        function openStream() {
+            if (eventSource) eventSource.close();
+            const params = new URLSearchParams({ after: lastSeq });
             const typeFilter = document.getElementById('typeFilter').value;
-            const limit = parseInt(document.getElementById('limitInput').value) || 100;
-            
-            filteredLogs = allLogs.filter(log => {
-                return !typeFilter || log.event_type === typeFilter;
-            }).slice(-limit);
-            
-            displayLogs();
+            if (typeFilter) params.set('type', typeFilter);
+            eventSource = new EventSource('/api/logs/stream?' + params.toString());
+            eventSource.addEventListener('logs', event => {
+                const data = JSON.parse(event.data);
+                lastSeq = data.last_seq;
+                if (data.logs.length === 0) return;
+                const limit = parseInt(document.getElementById('limitInput').value) || 100;
+                allLogs = allLogs.concat(data.logs).slice(-limit);
+                filteredLogs = allLogs.slice();
+                displayLogs();
+            });
+        }
+        
+        async function refreshStats() {
+            try {
+                const response = await fetch('/api/logs/stats');
+                const stats = await response.json();
+                updateStats(stats);
+                updateTypeFilter(stats);
+            } catch (error) {
+                console.error('Erreur lors du chargement des statistiques:', error);
+            }
         }
         
         function displayLogs() {
@@ -330,7 +381,7 @@ def logs_page():
                         <span class="log-timestamp">${timestamp}</span>
                         <span class="log-type ${log.event_type}">${log.event_type}</span>
                         ${log.user_id ? `<span style="color: #007bff; margin-left: 10px;">User: ${log.user_id.substring(0, 8)}</span>` : ''}
-                        ${log.room_id ? `<span style="color: #17a2b8; margin-left: 10px;">Room: ${log.room_id.substring(0, 8)}</span>` : ''}
+                        ${log.room_id ? `<a href="/logs/rooms?room=${encodeURIComponent(log.room_id)}" style="color: #17a2b8; margin-left: 10px;">Room: ${log.room_id.substring(0, 8)}</a>` : ''}
                         <div class="log-message">${log.message}</div>
                         ${dataStr ? `<div class="log-data">${dataStr}</div>` : ''}
                     </div>
@@ -359,24 +410,13 @@ def logs_page():
             });
         }
         
-        function exportLogs() {
-            const csvContent = [
-                'Timestamp,Event Type,User ID,Room ID,Message,Data',
-                ...allLogs.map(log => {
-                    const timestamp = new Date(log.timestamp).toISOString();
-                    const dataStr = log.data ? JSON.stringify(log.data).replace(/"/g, '""') : '';
-                    return `"${timestamp}","${log.event_type}","${log.user_id || ''}","${log.room_id || ''}","${log.message.replace(/"/g, '""')}","${dataStr}"`;
-                })
-            ].join('\\n');
-            
-            const blob = new Blob([csvContent], { type: 'text/csv' });
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `vocaline_logs_${new Date().toISOString().split('T')[0]}.csv`;
-            a.click();
-            window.URL.revokeObjectURL(url);
-            showNotification('Logs exportés en CSV');
+        // Export produit par le serveur, avec les filtres affichés, sur tout l'historique
+        function exportLogs(format) {
+            const params = new URLSearchParams({ format: format });
+            const typeFilter = document.getElementById('typeFilter').value;
+            if (typeFilter) params.set('type', typeFilter);
+            window.location.href = '/api/logs/export?' + params.toString();
+            showNotification(`Export ${format.toUpperCase()} lancé`);
         }
         
         async function clearLogs() {
@@ -391,8 +431,8 @@ def logs_page():
             }
         }
         
-        // Auto-refresh toutes les 10 secondes
-        setInterval(loadLogs, 10000);
+        // Statistiques actualisées toutes les 10 secondes (les logs arrivent par le flux)
+        setInterval(refreshStats, 10000);
         
         // Chargement initial
         loadLogs();
@@ -402,15 +442,274 @@ def logs_page():
     """
     return render_template_string(html_template)
 
+@logs_bp.route('/logs/rooms', methods=['GET'])
+def rooms_page():
+    """Page web des appels : percentiles des phases, rooms récentes et chronologie d'une room"""
+    html_template = """
+<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Appels Vocaline</title>
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background-color: #f5f5f5;
+            line-height: 1.6;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+            overflow: hidden;
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+            text-align: center;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 2em;
+        }
+        .header a {
+            color: white;
+        }
+        .section {
+            padding: 20px;
+            border-bottom: 1px solid #dee2e6;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 13px;
+        }
+        th, td {
+            padding: 6px 10px;
+            border-bottom: 1px solid #dee2e6;
+            text-align: left;
+        }
+        th {
+            background: #f8f9fa;
+            color: #6c757d;
+        }
+        td.mono {
+            font-family: 'Courier New', monospace;
+        }
+        tr.room {
+            cursor: pointer;
+        }
+        tr.room:hover {
+            background: #f1f3ff;
+        }
+        .outcome-connected { color: #28a745; font-weight: bold; }
+        .outcome-failed { color: #dc3545; font-weight: bold; }
+        .outcome-not_connected { color: #fd7e14; font-weight: bold; }
+        .outcome-signaling { color: #17a2b8; font-weight: bold; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📞 Appels Vocaline</h1>
+            <p>Phases du signaling WebRTC par room · <a href="/logs">Logs</a></p>
+        </div>
+        
+        <div class="section">
+            <h3>Durée des phases (s)</h3>
+            <table id="phases"></table>
+        </div>
+        
+        <div class="section" id="timelineSection" style="display: none;">
+            <h3 id="timelineTitle"></h3>
+            <table id="timeline"></table>
+        </div>
+        
+        <div class="section">
+            <h3>Rooms récentes</h3>
+            <table id="rooms"></table>
+        </div>
+    </div>
+
+    <script>
+        const PHASES = ['match_to_offer', 'offer_to_answer', 'answer_to_connected', 'total'];
+        
+        function seconds(value) {
+            return value === null || value === undefined ? '—' : value.toFixed(3);
+        }
+        
+        async function loadRooms() {
+            const response = await fetch('/api/logs/rooms?limit=100');
+            const data = await response.json();
+            
+            const outcomes = Object.entries(data.stats.outcomes)
+                .map(([outcome, count]) => `${outcome}: ${count}`).join(' · ');
+            document.getElementById('phases').innerHTML = `
+                <tr><th>Phase</th><th>Appels</th><th>p50</th><th>p95</th><th>p99</th></tr>
+                ${PHASES.map(phase => {
+                    const stats = data.stats.phases[phase];
+                    return `<tr><td>${phase}</td><td>${stats.count}</td><td>${seconds(stats.p50)}</td>
+                            <td>${seconds(stats.p95)}</td><td>${seconds(stats.p99)}</td></tr>`;
+                }).join('')}
+                <tr><td colspan="5">${data.stats.active_rooms} room(s) en cours · ${outcomes || 'aucun appel terminé'}</td></tr>
+            `;
+            
+            document.getElementById('rooms').innerHTML = `
+                <tr><th>Créée</th><th>Room</th><th>Issue</th>${PHASES.map(phase => `<th>${phase}</th>`).join('')}</tr>
+                ${data.rooms.map(room => `
+                    <tr class="room" onclick="showRoom('${room.room_id}')">
+                        <td>${new Date(room.created_at).toLocaleString('fr-FR')}</td>
+                        <td class="mono">${room.room_id.substring(0, 8)}</td>
+                        <td class="outcome-${room.outcome}">${room.outcome}</td>
+                        ${PHASES.map(phase => `<td>${seconds(room.phases[phase])}</td>`).join('')}
+                    </tr>
+                `).join('')}
+            `;
+        }
+        
+        async function showRoom(roomId) {
+            const response = await fetch('/api/logs/rooms/' + encodeURIComponent(roomId));
+            const section = document.getElementById('timelineSection');
+            section.style.display = 'block';
+            if (!response.ok) {
+                document.getElementById('timelineTitle').textContent = `Room ${roomId} inconnue`;
+                document.getElementById('timeline').innerHTML = '';
+                return;
+            }
+            const room = await response.json();
+            const ice = Object.entries(room.ice_candidates)
+                .map(([user, count]) => `${user.substring(0, 8)}: ${count}`).join(', ');
+            document.getElementById('timelineTitle').textContent =
+                `Room ${room.room_id} (${room.outcome}) · candidats ICE ${ice || 'aucun'}`;
+            document.getElementById('timeline').innerHTML = `
+                <tr><th>+s</th><th>Événement</th><th>Utilisateur</th><th>Détail</th></tr>
+                ${room.events.map(event => `
+                    <tr>
+                        <td>${event.offset.toFixed(3)}</td>
+                        <td>${event.event_type}</td>
+                        <td class="mono">${event.user_id ? event.user_id.substring(0, 8) : ''}</td>
+                        <td>${event.detail === null ? '' : event.detail}</td>
+                    </tr>
+                `).join('')}
+                ${room.dropped_events ? `<tr><td colspan="4">… ${room.dropped_events} événement(s) non conservé(s)</td></tr>` : ''}
+            `;
+            history.replaceState(null, '', '?room=' + encodeURIComponent(roomId));
+        }
+        
+        setInterval(loadRooms, 10000);
+        loadRooms();
+        const roomParam = new URLSearchParams(window.location.search).get('room');
+        if (roomParam) showRoom(roomParam);
+    </script>
+</body>
+</html>
+    """
+    return render_template_string(html_template)
+
 @logs_bp.route('/api/logs', methods=['GET'])
 def get_logs_api():
-    """API pour récupérer les logs"""
-    logs = vocaline_logger.get_logs()
-    stats = vocaline_logger.get_stats()
-    return jsonify({
+    """API pour rechercher dans les logs
+
+    Paramètres (optionnels, combinés) : type, user_id, room_id, since et until
+    (ISO 8601), before (curseur : seq), limit (100 par défaut, 1000 au plus).
+    Les logs sont retournés du plus ancien au plus récent ; `next_before` est
+    le curseur de la page précédente (None quand il n'y en a plus). La
+    première page (sans curseur) inclut les statistiques.
+
+    Mode delta : after=<seq> ne retourne que les logs plus récents ;
+    `last_seq` est la valeur de after pour l'appel suivant. La réponse porte
+    un ETag : If-None-Match évite de la recalculer quand rien n'a changé (304).
+    L'ETag dépend aussi des paramètres : deux filtres différents n'ont jamais
+    le même.
+    """
+    params = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    # Calculé avant la requête : au pire la réponse est plus récente que son ETag
+    etag = (f'{vocaline_logger.generation}-{vocaline_logger.last_seq}-'
+            f'{hashlib.sha1(params.encode()).hexdigest()[:12]}')
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    try:
+        query = LogQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Paramètre invalide: {str(e)}'}), 400
+    last_seq = vocaline_logger.last_seq
+    logs, next_before = vocaline_logger.query(query)
+    response = {
         'logs': logs,
-        'stats': stats
-    })
+        'next_before': next_before,
+        'last_seq': last_seq
+    }
+    if query.before is None and query.after is None:
+        response['stats'] = vocaline_logger.get_stats()
+    response = jsonify(response)
+    response.set_etag(etag, weak=True)
+    return response
+
+@logs_bp.route('/api/logs/stream', methods=['GET'])
+def stream_logs_api():
+    """Flux Server-Sent Events des nouveaux logs (paramètres : type, after)
+
+    À la reconnexion, l'en-tête Last-Event-ID envoyé par EventSource reprend
+    le flux là où il s'était arrêté.
+    """
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after')
+                    or vocaline_logger.last_seq)
+    except ValueError:
+        return jsonify({'error': 'Paramètre after invalide'}), 400
+    return Response(log_tail.stream(after, request.args.get('type') or None),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@logs_bp.route('/api/logs/export', methods=['GET'])
+def export_logs_api():
+    """Export des logs en téléchargement (paramètres : format=csv|ndjson, gzip=1)
+
+    Mêmes filtres que /api/logs ; sans limit, tout l'historique est exporté
+    (mémoire puis disque), du plus récent au plus ancien. La réponse est
+    produite page par page : la mémoire utilisée ne dépend pas du volume.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Format inconnu: {export_format}'}), 400
+    try:
+        query = LogQuery.from_args(request.args, default_limit=None, max_limit=None)
+    except ValueError as e:
+        return jsonify({'error': f'Paramètre invalide: {str(e)}'}), 400
+    compress = request.args.get('gzip') == '1'
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f'vocaline_logs_{datetime.now().strftime("%Y-%m-%d")}.{extension}'
+    if compress:
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    return Response(export_logs(vocaline_logger, query, export_format, compress),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+@logs_bp.route('/api/logs/rooms', methods=['GET'])
+def get_rooms_api():
+    """Appels récents (sans leurs événements) et percentiles de chaque phase (paramètre : limit)"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'Paramètre limit invalide'}), 400
+    return jsonify({'rooms': call_timelines.recent(limit), 'stats': call_timelines.get_stats()})
+
+@logs_bp.route('/api/logs/rooms/<room_id>', methods=['GET'])
+def get_room_timeline_api(room_id):
+    """Chronologie d'une room : événements, durée des phases, candidats ICE par utilisateur"""
+    timeline = call_timelines.get(room_id)
+    if timeline is None:
+        return jsonify({'error': 'Room inconnue'}), 404
+    return jsonify(timeline)
 
 @logs_bp.route('/api/logs/clear', methods=['POST'])
 def clear_logs_api():
@@ -423,3 +722,27 @@ def get_logs_stats():
     """API pour récupérer les statistiques des logs"""
     return jsonify(vocaline_logger.get_stats())
 
+@logs_bp.route('/api/logs/config', methods=['GET'])
+def get_logs_config():
+    """API pour consulter les politiques de logs (échantillonnage, débit, capacité réservée)"""
+    return jsonify({'types': vocaline_logger.get_policies()})
+
+@logs_bp.route('/api/logs/config', methods=['PUT', 'POST'])
+def update_logs_config():
+    """API pour modifier les politiques de logs à chaud
+
+    Corps : {"types": {"WEBRTC_ICE": {"sample_rate": 0.1, "rate": 5, "burst": 20}, ...}}
+    (null retire la politique d'un type).
+    """
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({'error': 'Jeton d\'administration invalide'}), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('types'), dict):
+        return jsonify({'error': 'Champ types manquant'}), 400
+    try:
+        policies = vocaline_logger.configure(data['types'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Politique invalide: {str(e)}'}), 400
+    vocaline_logger.log('LOG_CONFIG', None, None, 'Politiques de logs modifiées: %s', None,
+                        (', '.join(sorted(data['types'])),))
+    return jsonify({'types': policies})
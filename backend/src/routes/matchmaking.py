@@ -1,132 +1,209 @@
 from flask import Blueprint, request, jsonify
-from flask_socketio import emit, join_room, leave_room, disconnect
+from flask_socketio import emit
 from src.socketio_instance import get_socketio
-from src.utils.logger import vocaline_logger
-from src.utils.cleanup import cleanup_waiting_users, validate_user_states
+from src.utils.logger import vocaline_logger, Lazy, summarize_ids, SUMMARY_IDS
+from src.utils.cleanup import cleanup_waiting_users
+from src.utils.matchmaking_state import create_matchmaking_state
+from src.utils.pairing_engine import PairingEngine
+from src.utils.ice_batcher import IceCandidateBatcher
+from src.routes.mobile_debug import handle_webrtc_offer_log, handle_webrtc_answer_log
+import os
 import uuid
-import random
 
 matchmaking_bp = Blueprint('matchmaking', __name__)
 
-# Stockage en mémoire des utilisateurs connectés et des paires
-connected_users = {}  # {socket_id: {'user_id': str, 'username': str, 'room': str or None}}
-waiting_users = []    # Liste des utilisateurs en attente de matchmaking
-active_rooms = {}     # {room_id: {'user1': socket_id, 'user2': socket_id}}
+# Stockage des utilisateurs connectés et des paires : en mémoire (défaut) ou
+# partagé entre workers (VOCALINE_STATE_BACKEND=sqlite:///...).
+# Les transitions (appariement, fermeture de room, mise en attente) passent par
+# matchmaking_state, qui les sérialise (verrous répartis ou transactions SQLite).
+if os.environ.get('VOCALINE_STATE_BACKEND', 'memory') == 'memory':
+    matchmaking_state = create_matchmaking_state(
+        pool_partitions=int(os.environ.get('VOCALINE_POOL_PARTITIONS', '8')),
+        lock_stripes=int(os.environ.get('VOCALINE_LOCK_STRIPES', '64')))
+else:
+    matchmaking_state = create_matchmaking_state()
+connected_users = matchmaking_state.connected_users  # {socket_id: Session(user_id, username, room, partner, waiting)}
+waiting_users = matchmaking_state.waiting_users      # File FIFO indexée des utilisateurs en attente
+active_rooms = matchmaking_state.active_rooms        # {room_id: {'user1': socket_id, 'user2': socket_id}}
 
-def try_find_new_partner(user_socket_id):
-    """Essaie de trouver immédiatement un nouveau partenaire pour un utilisateur"""
-    socketio = get_socketio()
-    
-    # Nettoyer les utilisateurs déconnectés avant de chercher un partenaire
-    cleanup_count = cleanup_waiting_users(waiting_users, connected_users)
-    
-    vocaline_logger.log('MATCHMAKING', user_socket_id, None, 
-                       'Tentative de recherche d\'un nouveau partenaire', 
-                       {'waiting_users_count': len(waiting_users), 
-                        'connected_users_count': len(connected_users),
-                        'cleaned_users': cleanup_count})
-    
-    if user_socket_id not in connected_users:
-        vocaline_logger.log('ERROR', user_socket_id, None, 
-                           'Utilisateur non trouvé dans connected_users')
-        return
-    
-    # Chercher d'autres utilisateurs en attente (excluant l'utilisateur actuel)
-    available_partners = []
-    current_username = connected_users[user_socket_id]['username']
-    
-    for uid in waiting_users:
-        if uid != user_socket_id and uid in connected_users:
-            partner_username = connected_users[uid]['username']
-            # Empêcher qu'un utilisateur se connecte à lui-même (même nom)
-            if partner_username != current_username:
-                available_partners.append(uid)
-            else:
-                vocaline_logger.log('SELF_MATCH_PREVENTED', user_socket_id, None, 
-                                   f'Auto-connexion empêchée: {current_username} → {partner_username}')
-    
-    vocaline_logger.log('MATCHMAKING', user_socket_id, None, 
-                       f'Partenaires disponibles trouvés: {len(available_partners)}',
-                       {'available_partners': available_partners})
+# Appariement par lots : 0 = appariement immédiat dans le handler Socket.IO
+PAIRING_TICK_MS = int(os.environ.get('VOCALINE_PAIRING_TICK_MS', '0'))
+PAIRING_BATCH_MAX = int(os.environ.get('VOCALINE_PAIRING_BATCH_MAX', '500'))
+pairing_engine = None
+
+# Regroupement des candidats ICE (clients ayant annoncé ice_batching) : 0 = un envoi par candidat
+ICE_BATCH_MS = int(os.environ.get('VOCALINE_ICE_BATCH_MS', '0'))
+ICE_BATCH_MAX = int(os.environ.get('VOCALINE_ICE_BATCH_MAX', '16'))
+ice_batcher = None
+
+# Purge périodique de la file d'attente (s) : 0 = désactivée
+CLEANUP_INTERVAL = int(os.environ.get('VOCALINE_CLEANUP_INTERVAL', '60'))
+
+def waiting_summary():
+    """Résumé de la file d'attente pour les logs : effectif et premiers identifiants"""
+    return summarize_ids(len(waiting_users), waiting_users.snapshot(SUMMARY_IDS))
+
+def match_notifications(room_id, initiator_id, receiver_id):
+    """Construire les deux messages match_found d'une room ; l'initiateur lance l'appel WebRTC
+
+    Désigner un seul initiateur évite les conflits de négociation WebRTC (glare condition).
+    Les messages sont adressés au socket_id de chaque utilisateur, ce qui fonctionne
+    aussi lorsqu'il est connecté à un autre worker (via la message queue).
+    """
+    initiator_data = connected_users.get(initiator_id)
+    receiver_data = connected_users.get(receiver_id)
+    if initiator_data is None or receiver_data is None:
+        return []
     
-    if available_partners:
-        # Prendre le premier partenaire disponible
-        partner_socket_id = available_partners[0]
-        
-        # Suppression sécurisée des utilisateurs de la liste d'attente
-        if partner_socket_id in waiting_users:
-            waiting_users.remove(partner_socket_id)
-            vocaline_logger.log('WAITING_REMOVE', partner_socket_id, None, 
-                               'Partenaire retiré de waiting_users')
-        else:
-            vocaline_logger.log('WARNING', partner_socket_id, None, 
-                               'Partenaire non trouvé dans waiting_users')
-        
-        if user_socket_id in waiting_users:
-            waiting_users.remove(user_socket_id)
-            vocaline_logger.log('WAITING_REMOVE', user_socket_id, None, 
-                               'Utilisateur retiré de waiting_users')
-        else:
-            vocaline_logger.log('WARNING', user_socket_id, None, 
-                               'Utilisateur non trouvé dans waiting_users')
-        
-        # Créer une nouvelle room
-        room_id = str(uuid.uuid4())
-        
-        vocaline_logger.log('ROOM_CREATE', user_socket_id, room_id, 
-                           f'Nouvelle room créée avec {partner_socket_id}',
-                           {'partner_id': partner_socket_id,
-                            'waiting_users_after': waiting_users.copy()})
-        
-        # Mettre à jour les données des utilisateurs
-        connected_users[user_socket_id]['room'] = room_id
-        connected_users[partner_socket_id]['room'] = room_id
-        
-        # Enregistrer la room active
-        active_rooms[room_id] = {
-            'user1': user_socket_id,
-            'user2': partner_socket_id
-        }
-        
-        # Faire rejoindre les deux utilisateurs à la room
-        socketio.server.enter_room(user_socket_id, room_id)
-        socketio.server.enter_room(partner_socket_id, room_id)
-        
-        # Notifier les deux utilisateurs qu'ils sont connectés
-        partner_data = connected_users[partner_socket_id]
-        user_data = connected_users[user_socket_id]
-        
-        # Désigner l'initiateur WebRTC : l'utilisateur qui cherche un nouveau partenaire initie
-        # Cela évite les conflits de négociation WebRTC (glare condition)
-        
-        socketio.emit('match_found', {
+    return [
+        (initiator_id, {
             'room_id': room_id,
             'partner': {
-                'username': partner_data['username'],
-                'user_id': partner_data['user_id']
+                'username': receiver_data.username,
+                'user_id': receiver_data.user_id
             },
-            'webrtc_role': 'initiator',  # L'utilisateur qui cherche initie
+            'webrtc_role': 'initiator',
             'should_start_call': True
-        }, room=user_socket_id)
-        
-        socketio.emit('match_found', {
+        }),
+        (receiver_id, {
             'room_id': room_id,
             'partner': {
-                'username': user_data['username'],
-                'user_id': user_data['user_id']
+                'username': initiator_data.username,
+                'user_id': initiator_data.user_id
             },
             'webrtc_role': 'receiver',   # Le partenaire en attente reçoit
             'should_start_call': False
-        }, room=partner_socket_id)
-        
+        })
+    ]
+
+def send_notifications(notifications):
+    socketio = get_socketio()
+    for socket_id, payload in notifications:
+        socketio.emit('match_found', payload, room=socket_id)
+
+def deliver_ice_candidates(sender_id, receiver_id, candidates):
+    """Transmettre un lot de candidats ICE si les deux utilisateurs sont toujours en room ensemble"""
+    user_data = connected_users.get(sender_id)
+    if user_data is None or user_data.partner != receiver_id:
+        vocaline_logger.log('WEBRTC_ICE', sender_id, None, 
+                           'Lot de %d candidats ICE abandonné (room fermée)',
+                           {'partner': receiver_id, 'count': len(candidates)}, (len(candidates),))
+        return
+    
+    vocaline_logger.log('WEBRTC_ICE', sender_id, user_data.room, 
+                       '%d candidats ICE envoyés par %s',
+                       {'count': len(candidates),
+                        'candidate_types': [candidate.get('candidate', {}).get('type', 'unknown')
+                                            for candidate in candidates]},
+                       (len(candidates), user_data.username))
+    get_socketio().emit('webrtc_ice_candidates', {'candidates': candidates}, room=receiver_id)
+
+def try_find_new_partner(user_socket_id):
+    """Essaie de trouver immédiatement un nouveau partenaire pour un utilisateur en attente"""
+    user_data = connected_users.get(user_socket_id)
+    if user_data is None:
+        vocaline_logger.log('ERROR', user_socket_id, None, 
+                           'Utilisateur non trouvé dans connected_users')
+        return
+    
+    vocaline_logger.log('MATCHMAKING', user_socket_id, None, 
+                       'Tentative de recherche d\'un nouveau partenaire', 
+                       Lazy(lambda: {'waiting_users_count': len(waiting_users), 
+                                     'connected_users_count': len(connected_users)}))
+    
+    # Empêcher qu'un utilisateur se connecte à lui-même (même nom)
+    current_username = user_data.username
+    if waiting_users.count_username(current_username) > (1 if user_socket_id in waiting_users else 0):
+        vocaline_logger.log('SELF_MATCH_PREVENTED', user_socket_id, None, 
+                           f'Auto-connexion empêchée: {current_username} → {current_username}')
+    
+    # Retrait atomique de l'utilisateur et du premier partenaire éligible de la file
+    match = matchmaking_state.pair(user_socket_id)
+    if match is None:
+        vocaline_logger.log('MATCHMAKING', user_socket_id, None, 
+                           'Aucun partenaire disponible trouvé')
+        return
+    
+    room_id, partner_socket_id = match
+    vocaline_logger.log('ROOM_CREATE', user_socket_id, room_id, 
+                       'Nouvelle room créée avec %s',
+                       {'user1': user_socket_id, 'user2': partner_socket_id,
+                        'partner_id': partner_socket_id,
+                        'waiting_users_after': Lazy(waiting_summary)}, (partner_socket_id,))
+    
+    # L'utilisateur qui cherche un nouveau partenaire initie l'appel
+    notifications = match_notifications(room_id, user_socket_id, partner_socket_id)
+    send_notifications(notifications)
+    
+    if notifications:
         vocaline_logger.log('MATCH_SUCCESS', user_socket_id, room_id, 
                            f'Match réussi avec {partner_socket_id}',
-                           {'partner_username': partner_data['username'],
-                            'user_username': user_data['username'],
+                           {'partner_username': notifications[0][1]['partner']['username'],
+                            'user_username': notifications[1][1]['partner']['username'],
                             'initiator': user_socket_id, 'receiver': partner_socket_id})
+
+def pair_waiting_batch(max_pairs):
+    """Apparier en un seul passage les utilisateurs en attente (ordre FIFO)
+
+    L'utilisateur arrivé le plus récemment initie l'appel WebRTC, comme lorsqu'il
+    rejoint le matchmaking. Tous les match_found du lot sont émis à la fin.
+    Retourne le nombre de paires formées.
+    """
+    notifications = []
+    pairs = 0
+    
+    while pairs < max_pairs:
+        match = matchmaking_state.pop_pair()
+        if match is None:
+            break
+        room_id, initiator_id, receiver_id = match
+        pairs += 1
+        
+        vocaline_logger.log('ROOM_CREATE', initiator_id, room_id, 
+                           'Room créée par lot entre %s et %s',
+                           {'user1': initiator_id, 'user2': receiver_id}, (initiator_id, receiver_id))
+        notifications.extend(match_notifications(room_id, initiator_id, receiver_id))
+    
+    if not pairs:
+        return 0
+    
+    send_notifications(notifications)
+    
+    vocaline_logger.log('MATCH_BATCH', None, None, 
+                       'Lot d\'appariement: %d paires formées',
+                       {'pairs': pairs, 'waiting_users_count': len(waiting_users)}, (pairs,))
+    return pairs
+
+def request_pairing(user_socket_id):
+    """Chercher un partenaire : au prochain tick du moteur s'il est actif, sinon immédiatement"""
+    if pairing_engine is not None:
+        pairing_engine.request_pairing()
     else:
-        vocaline_logger.log('MATCHMAKING', user_socket_id, None, 
-                           'Aucun partenaire disponible trouvé')
+        try_find_new_partner(user_socket_id)
+
+def requeue_partner(room_id, other_user_id, event):
+    """Notifier le partenaire restant d'une room fermée et le remettre en attente"""
+    socketio = get_socketio()
+    socketio.emit(event, room=other_user_id)
+    
+    # Remettre l'autre utilisateur en liste d'attente seulement s'il est toujours connecté
+    # (waiting_for_match part avant la mise en file pour précéder un éventuel match_found)
+    if other_user_id in connected_users:
+        socketio.emit('waiting_for_match', {'status': 'Recherche d\'un nouveau partenaire...'}, room=other_user_id)
+    if matchmaking_state.enqueue(other_user_id):
+        vocaline_logger.log('PARTNER_REQUEUE', other_user_id, None, 
+                           'Partenaire remis en liste d\'attente',
+                           {'waiting_users': Lazy(waiting_summary)})
+        
+        # Essayer de trouver un nouveau partenaire
+        request_pairing(other_user_id)
+    else:
+        vocaline_logger.log('WARNING', other_user_id, None, 
+                           'Partenaire déconnecté ou déjà en attente, non ajouté à waiting_users')
+
+def carries_sdp(data, key):
+    """Vérifier qu'un message de signaling contient une description SDP ({key: {...}} ou {'sdp': ...})"""
+    return isinstance(data, dict) and bool(data.get(key) or data.get('sdp'))
 
 def register_socketio_events():
     socketio = get_socketio()
@@ -134,193 +211,107 @@ def register_socketio_events():
     @socketio.on('connect')
     def handle_connect():
         vocaline_logger.log('CONNECT', request.sid, None, 
-                           f'Utilisateur connecté: {request.sid}')
+                           'Utilisateur connecté: %s', None, (request.sid,))
         print(f'Utilisateur connecté: {request.sid}')
         emit('connected', {'status': 'success', 'socket_id': request.sid})
 
     @socketio.on('disconnect')
     def handle_disconnect():
         vocaline_logger.log('DISCONNECT', request.sid, None, 
-                           f'Utilisateur déconnecté: {request.sid}')
+                           'Utilisateur déconnecté: %s', None, (request.sid,))
         print(f'Utilisateur déconnecté: {request.sid}')
-        user_data = connected_users.get(request.sid)
+        
+        # Retirer l'utilisateur de la liste des connectés et de la liste d'attente
+        user_data = matchmaking_state.unregister(request.sid)
         
         if user_data:
-            vocaline_logger.log('USER_DATA', request.sid, user_data.get('room'), 
-                               'Données utilisateur trouvées lors de la déconnexion',
-                               {'username': user_data.get('username'),
-                                'room': user_data.get('room')})
-            
-            # Retirer l'utilisateur de la liste d'attente s'il y est
-            if request.sid in waiting_users:
-                waiting_users.remove(request.sid)
-                vocaline_logger.log('WAITING_REMOVE', request.sid, None, 
-                                   'Utilisateur retiré de la liste d\'attente')
+            vocaline_logger.log('USER_REMOVE', request.sid, user_data.room, 
+                               'Utilisateur retiré de connected_users',
+                               {'username': user_data.username,
+                                'room': user_data.room})
             
             # Si l'utilisateur était dans une room, notifier l'autre utilisateur
-            if user_data.get('room'):
-                room_id = user_data['room']
-                room_data = active_rooms.get(room_id)
-                if room_data:
-                    vocaline_logger.log('ROOM_DISCONNECT', request.sid, room_id, 
-                                       'Utilisateur déconnecté d\'une room active',
-                                       {'room_data': room_data})
-                    
-                    # Trouver l'autre utilisateur dans la room
-                    other_user_id = None
-                    if room_data['user1'] == request.sid:
-                        other_user_id = room_data['user2']
-                    elif room_data['user2'] == request.sid:
-                        other_user_id = room_data['user1']
-                    
-                    if other_user_id and other_user_id in connected_users:
-                        vocaline_logger.log('PARTNER_NOTIFY', other_user_id, room_id, 
-                                           f'Notification de déconnexion du partenaire {request.sid}')
-                        
-                        # Notifier que le partenaire s'est déconnecté
-                        emit('partner_disconnected', room=other_user_id)
-                        
-                        # Remettre l'autre utilisateur en attente automatiquement
-                        connected_users[other_user_id]['room'] = None
-                        leave_room(room_id, sid=other_user_id)
-                        
-                        # Vérifier que l'utilisateur est toujours connecté avant de le remettre en attente
-                        if other_user_id in connected_users and other_user_id not in waiting_users:
-                            waiting_users.append(other_user_id)
-                            emit('waiting_for_match', {'status': 'Recherche d\'un nouveau partenaire...'}, room=other_user_id)
-                            
-                            vocaline_logger.log('AUTO_REQUEUE', other_user_id, None, 
-                                               'Utilisateur automatiquement remis en attente',
-                                               {'waiting_users_count': len(waiting_users),
-                                                'waiting_users': waiting_users.copy()})
-                            
-                            # Essayer de trouver immédiatement un nouveau partenaire
-                            try_find_new_partner(other_user_id)
-                        else:
-                            vocaline_logger.log('WARNING', other_user_id, None, 
-                                               'Utilisateur déconnecté, non remis en attente')
-                    
-                    # Supprimer la room
-                    del active_rooms[room_id]
-                    vocaline_logger.log('ROOM_DELETE', request.sid, room_id, 
-                                       'Room supprimée après déconnexion')
-            
-            # Retirer l'utilisateur de la liste des connectés
-            del connected_users[request.sid]
-            vocaline_logger.log('USER_REMOVE', request.sid, None, 
-                               'Utilisateur retiré de connected_users')
+            room_id = user_data.room
+            room_data = matchmaking_state.close_room(room_id) if room_id else None
+            if room_data:
+                vocaline_logger.log('ROOM_DELETE', request.sid, room_id, 
+                                   'Room supprimée après déconnexion',
+                                   {'room_data': room_data})
+                
+                # Trouver l'autre utilisateur dans la room
+                other_user_id = matchmaking_state.partner_of(room_data, request.sid)
+                if other_user_id:
+                    vocaline_logger.log('PARTNER_NOTIFY', other_user_id, room_id, 
+                                       f'Notification de déconnexion du partenaire {request.sid}')
+                    requeue_partner(room_id, other_user_id, 'partner_disconnected')
 
     @socketio.on('join_matchmaking')
     def handle_join_matchmaking(data):
         username = data.get('username', f'User_{request.sid[:8]}')
         user_id = data.get('user_id', str(uuid.uuid4()))
+        ice_batching = bool(data.get('ice_batching', False))
         
         vocaline_logger.log('JOIN_MATCHMAKING', request.sid, None, 
-                           f'Utilisateur {username} rejoint le matchmaking',
-                           {'username': username, 'user_id': user_id})
+                           'Utilisateur %s rejoint le matchmaking',
+                           {'username': username, 'user_id': user_id}, (username,))
         
         # Enregistrer l'utilisateur
-        connected_users[request.sid] = {
-            'user_id': user_id,
-            'username': username,
-            'room': None
-        }
+        matchmaking_state.register(request.sid, user_id, username, ice_batching)
         
         vocaline_logger.log('USER_REGISTER', request.sid, None, 
                            'Utilisateur enregistré dans connected_users',
-                           {'total_connected': len(connected_users),
-                            'waiting_count': len(waiting_users)})
+                           Lazy(lambda: {'total_connected': len(connected_users),
+                                         'waiting_count': len(waiting_users)}))
         
-        # Chercher un partenaire disponible
-        if waiting_users:
-            vocaline_logger.log('PARTNER_SEARCH', request.sid, None, 
-                               f'Partenaires en attente trouvés: {len(waiting_users)}',
-                               {'waiting_users': waiting_users.copy()})
-            
-            # Filtrer les partenaires pour éviter l'auto-connexion
-            valid_partners = []
-            for partner_id in waiting_users:
-                if partner_id in connected_users:
-                    partner_username = connected_users[partner_id]['username']
-                    # Empêcher qu'un utilisateur se connecte à lui-même (même nom)
-                    if partner_username != username:
-                        valid_partners.append(partner_id)
-                    else:
-                        vocaline_logger.log('SELF_MATCH_PREVENTED', request.sid, None, 
-                                           f'Auto-connexion empêchée: {username} → {partner_username}')
-            
-            if valid_partners:
-                # Prendre le premier partenaire valide
-                partner_socket_id = valid_partners[0]
-                waiting_users.remove(partner_socket_id)
-                
-                vocaline_logger.log('PARTNER_FOUND', request.sid, None, 
-                                   f'Partenaire valide trouvé: {partner_socket_id}')
-                
-                # Créer une room pour les deux utilisateurs
-                room_id = str(uuid.uuid4())
-                
-                # Mettre à jour les données des utilisateurs
-                connected_users[request.sid]['room'] = room_id
-                connected_users[partner_socket_id]['room'] = room_id
-                
-                # Enregistrer la room active
-                active_rooms[room_id] = {
-                    'user1': request.sid,
-                    'user2': partner_socket_id
-                }
-                
-                vocaline_logger.log('ROOM_CREATE', request.sid, room_id, 
-                                   f'Room créée entre {request.sid} et {partner_socket_id}',
-                                   {'user1': request.sid, 'user2': partner_socket_id})
-                
-                # Faire rejoindre les deux utilisateurs à la room
-                join_room(room_id, sid=request.sid)
-                join_room(room_id, sid=partner_socket_id)
-                
-                # Notifier les deux utilisateurs qu'ils sont connectés
-                partner_data = connected_users[partner_socket_id]
-                user_data = connected_users[request.sid]
-                
-                # Désigner l'initiateur WebRTC : l'utilisateur qui rejoint en second initie l'appel
-                # Cela évite les conflits de négociation WebRTC (glare condition)
-                
-                emit('match_found', {
-                    'room_id': room_id,
-                    'partner': {
-                        'username': partner_data['username'],
-                        'user_id': partner_data['user_id']
-                    },
-                    'webrtc_role': 'initiator',  # L'utilisateur qui rejoint initie
-                    'should_start_call': True
-                }, room=request.sid)
-                
-                emit('match_found', {
-                    'room_id': room_id,
-                    'partner': {
-                        'username': user_data['username'],
-                        'user_id': user_data['user_id']
-                    },
-                    'webrtc_role': 'receiver',   # Le partenaire en attente reçoit
-                    'should_start_call': False
-                }, room=partner_socket_id)
-                
-                vocaline_logger.log('MATCH_SUCCESS', request.sid, room_id, 
-                                   f'Match réussi entre {username} et {partner_data["username"]}',
-                                   {'initiator': request.sid, 'receiver': partner_socket_id})
-                
-            else:
-                vocaline_logger.log('NO_VALID_PARTNER', request.sid, None, 
-                                   f'Aucun partenaire valide trouvé (éviter auto-connexion)')
-                # Aucun partenaire valide, ajouter l'utilisateur à la liste d'attente
-                waiting_users.append(request.sid)
-                emit('waiting_for_match', {'status': 'En attente d\'un partenaire...'})
-        else:
+        # Un utilisateur déjà en room ou en attente reste où il est
+        user_data = connected_users.get(request.sid)
+        if user_data is None or user_data.room or user_data.waiting:
+            vocaline_logger.log('WARNING', request.sid, user_data and user_data.room, 
+                               'Utilisateur déjà en attente ou en conversation')
+            return
+        
+        # Annoncer l'attente avant la mise en file : un autre handler peut apparier
+        # l'utilisateur dès qu'il est en file, son match_found doit arriver après
+        emit('waiting_for_match', {'status': 'En attente d\'un partenaire...'})
+        if not matchmaking_state.enqueue(request.sid):
+            return
+        
+        # Moteur d'appariement par lots : appariement au prochain tick
+        if pairing_engine is not None:
+            pairing_engine.request_pairing()
+            return
+        
+        vocaline_logger.log('PARTNER_SEARCH', request.sid, None, 
+                           'Recherche parmi les utilisateurs en attente',
+                           {'waiting_users': Lazy(waiting_summary)})
+        
+        # Empêcher qu'un utilisateur se connecte à lui-même (même nom)
+        if waiting_users.count_username(username) > 1:
+            vocaline_logger.log('SELF_MATCH_PREVENTED', request.sid, None, 
+                               f'Auto-connexion empêchée: {username} → {username}')
+        
+        # Prendre le premier partenaire valide (ordre FIFO, sans homonyme)
+        match = matchmaking_state.pair(request.sid)
+        if match is None:
             vocaline_logger.log('NO_PARTNER', request.sid, None, 
                                'Aucun partenaire disponible, ajout en liste d\'attente')
-            # Aucun partenaire disponible, ajouter à la liste d'attente
-            waiting_users.append(request.sid)
-            emit('waiting_for_match', {'status': 'En attente d\'un partenaire...'})
+            return
+        
+        room_id, partner_socket_id = match
+        vocaline_logger.log('ROOM_CREATE', request.sid, room_id, 
+                           'Room créée entre %s et %s',
+                           {'user1': request.sid, 'user2': partner_socket_id},
+                           (request.sid, partner_socket_id))
+        
+        # L'utilisateur qui rejoint en second initie l'appel
+        notifications = match_notifications(room_id, request.sid, partner_socket_id)
+        send_notifications(notifications)
+        
+        if notifications:
+            vocaline_logger.log('MATCH_SUCCESS', request.sid, room_id, 
+                               'Match réussi entre %s et %s',
+                               {'initiator': request.sid, 'receiver': partner_socket_id},
+                               (username, notifications[0][1]['partner']['username']))
 
     @socketio.on('leave_conversation')
     def handle_leave_conversation():
@@ -328,188 +319,191 @@ def register_socketio_events():
         
         vocaline_logger.log('LEAVE_CONVERSATION', request.sid, None, 
                            'Utilisateur demande à quitter la conversation',
-                           {'user_data': user_data})
+                           {'user_data': user_data and user_data.to_dict()})
         
-        if user_data and user_data.get('room'):
-            room_id = user_data['room']
-            room_data = active_rooms.get(room_id)
+        if user_data and user_data.room:
+            room_id = user_data.room
+            room_data = matchmaking_state.close_room(room_id)
             
             vocaline_logger.log('LEAVE_ROOM', request.sid, room_id, 
                                'Utilisateur quitte la room',
                                {'room_data': room_data})
             
             if room_data:
+                vocaline_logger.log('ROOM_DELETE', request.sid, room_id, 
+                                   'Room supprimée après leave_conversation')
+                
                 # Trouver l'autre utilisateur
-                other_user_id = None
-                if room_data['user1'] == request.sid:
-                    other_user_id = room_data['user2']
-                elif room_data['user2'] == request.sid:
-                    other_user_id = room_data['user1']
+                other_user_id = matchmaking_state.partner_of(room_data, request.sid)
                 
                 vocaline_logger.log('PARTNER_IDENTIFIED', request.sid, room_id, 
                                    f'Partenaire identifié: {other_user_id}')
                 
-                # Quitter la room
-                leave_room(room_id, sid=request.sid)
-                user_data['room'] = None
-                
                 # Notifier l'autre utilisateur et le remettre en attente
-                if other_user_id and other_user_id in connected_users:
+                if other_user_id:
                     vocaline_logger.log('PARTNER_NOTIFY_LEAVE', other_user_id, room_id, 
                                        f'Notification à {other_user_id} que {request.sid} a quitté')
-                    
-                    leave_room(room_id, sid=other_user_id)
-                    connected_users[other_user_id]['room'] = None
-                    emit('partner_left', room=other_user_id)
-                    
-                    # Remettre l'autre utilisateur en liste d'attente seulement s'il est toujours connecté
-                    if other_user_id in connected_users and other_user_id not in waiting_users:
-                        waiting_users.append(other_user_id)
-                        vocaline_logger.log('PARTNER_REQUEUE', other_user_id, None, 
-                                           'Partenaire remis en liste d\'attente',
-                                           {'waiting_users_count': len(waiting_users),
-                                            'waiting_users': waiting_users.copy()})
-                        
-                        emit('waiting_for_match', {'status': 'Recherche d\'un nouveau partenaire...'}, room=other_user_id)
-                        
-                        # Essayer de trouver immédiatement un nouveau partenaire
-                        try_find_new_partner(other_user_id)
-                    else:
-                        vocaline_logger.log('WARNING', other_user_id, None, 
-                                           'Partenaire déconnecté ou déjà en attente, non ajouté à waiting_users')
-                
-                # Supprimer la room
-                del active_rooms[room_id]
-                vocaline_logger.log('ROOM_DELETE', request.sid, room_id, 
-                                   'Room supprimée après leave_conversation')
+                    requeue_partner(room_id, other_user_id, 'partner_left')
             
             # Remettre l'utilisateur actuel en liste d'attente
-            if request.sid not in waiting_users:
-                waiting_users.append(request.sid)
+            emit('waiting_for_match', {'status': 'En attente d\'un partenaire...'})
+            if matchmaking_state.enqueue(request.sid):
                 vocaline_logger.log('USER_REQUEUE', request.sid, None, 
                                    'Utilisateur remis en liste d\'attente',
-                                   {'waiting_users_count': len(waiting_users),
-                                    'waiting_users': waiting_users.copy()})
+                                   {'waiting_users': Lazy(waiting_summary)})
             else:
                 vocaline_logger.log('WARNING', request.sid, None, 
                                    'Utilisateur déjà dans waiting_users')
             
-            emit('waiting_for_match', {'status': 'En attente d\'un partenaire...'})
-            
-            # Essayer de trouver immédiatement un nouveau partenaire pour l'utilisateur actuel
-            try_find_new_partner(request.sid)
+            # Essayer de trouver un nouveau partenaire pour l'utilisateur actuel
+            request_pairing(request.sid)
 
     @socketio.on('webrtc_offer')
     def handle_webrtc_offer(data):
+        # Sans SDP, c'est le suivi d'un client antérieur à webrtc_offer_debug : logger sans relayer
+        if not carries_sdp(data, 'offer'):
+            handle_webrtc_offer_log(data if isinstance(data, dict) else {})
+            return
+        # Une seule recherche : la session contient directement le partenaire
         user_data = connected_users.get(request.sid)
-        if user_data and user_data.get('room'):
-            room_id = user_data['room']
-            room_data = active_rooms.get(room_id)
+        if user_data and user_data.partner:
+            vocaline_logger.log('WEBRTC_OFFER', request.sid, user_data.room, 
+                               'Offre WebRTC envoyée par %s',
+                               {'partner': user_data.partner, 'offer_type': data.get('type', 'unknown'),
+                                'offer_subtype': data.get('offerType', 'unknown'),
+                                'debug': data.get('debug', 'NO_DEBUG_ID')},
+                               (user_data.username,))
             
-            vocaline_logger.log('WEBRTC_OFFER', request.sid, room_id, 
-                               f'Offre WebRTC envoyée par {user_data["username"]}',
-                               {'room_users': room_data, 'offer_type': data.get('type', 'unknown')})
-            
-            # Transmettre l'offre WebRTC à l'autre utilisateur dans la room
-            emit('webrtc_offer', data, room=room_id, include_self=False)
+            # Transmettre l'offre WebRTC au partenaire (éventuellement sur un autre worker)
+            emit('webrtc_offer', data, room=user_data.partner)
         else:
             vocaline_logger.log('WEBRTC_ERROR', request.sid, None, 
                                'Tentative d\'envoi d\'offre WebRTC sans room active',
-                               {'user_data': user_data})
+                               {'user_data': user_data and user_data.to_dict()})
 
     @socketio.on('webrtc_answer')
     def handle_webrtc_answer(data):
+        if not carries_sdp(data, 'answer'):
+            handle_webrtc_answer_log(data if isinstance(data, dict) else {})
+            return
         user_data = connected_users.get(request.sid)
-        if user_data and user_data.get('room'):
-            room_id = user_data['room']
-            room_data = active_rooms.get(room_id)
-            
-            vocaline_logger.log('WEBRTC_ANSWER', request.sid, room_id, 
-                               f'Réponse WebRTC envoyée par {user_data["username"]}',
-                               {'room_users': room_data, 'answer_type': data.get('type', 'unknown')})
+        if user_data and user_data.partner:
+            vocaline_logger.log('WEBRTC_ANSWER', request.sid, user_data.room, 
+                               'Réponse WebRTC envoyée par %s',
+                               {'partner': user_data.partner, 'answer_type': data.get('type', 'unknown'),
+                                'answer_subtype': data.get('answerType', 'unknown'),
+                                'debug': data.get('debug', 'NO_DEBUG_ID')},
+                               (user_data.username,))
             
-            # Transmettre la réponse WebRTC à l'autre utilisateur dans la room
-            emit('webrtc_answer', data, room=room_id, include_self=False)
+            # Transmettre la réponse WebRTC au partenaire
+            emit('webrtc_answer', data, room=user_data.partner)
         else:
             vocaline_logger.log('WEBRTC_ERROR', request.sid, None, 
                                'Tentative d\'envoi de réponse WebRTC sans room active',
-                               {'user_data': user_data})
+                               {'user_data': user_data and user_data.to_dict()})
 
     @socketio.on('webrtc_ice_candidate')
     def handle_webrtc_ice_candidate(data):
         user_data = connected_users.get(request.sid)
-        if user_data and user_data.get('room'):
-            room_id = user_data['room']
+        if user_data and user_data.partner:
+            # Partenaire compatible : le candidat part dans le prochain lot
+            if ice_batcher is not None:
+                partner_data = connected_users.get(user_data.partner)
+                if partner_data and partner_data.ice_batching:
+                    ice_batcher.add(request.sid, user_data.partner, data)
+                    return
             
-            vocaline_logger.log('WEBRTC_ICE', request.sid, room_id, 
-                               f'Candidat ICE envoyé par {user_data["username"]}',
-                               {'candidate_type': data.get('candidate', {}).get('type', 'unknown')})
+            vocaline_logger.log('WEBRTC_ICE', request.sid, user_data.room, 
+                               'Candidat ICE envoyé par %s',
+                               {'candidate_type': data.get('candidate', {}).get('type', 'unknown')},
+                               (user_data.username,))
             
-            # Transmettre le candidat ICE à l'autre utilisateur dans la room
-            emit('webrtc_ice_candidate', data, room=room_id, include_self=False)
+            # Transmettre le candidat ICE au partenaire
+            emit('webrtc_ice_candidate', data, room=user_data.partner)
         else:
             vocaline_logger.log('WEBRTC_ERROR', request.sid, None, 
                                'Tentative d\'envoi de candidat ICE sans room active',
-                               {'user_data': user_data})
+                               {'user_data': user_data and user_data.to_dict()})
 
-# Enregistrer les événements SocketIO
-register_socketio_events()
-
-@matchmaking_bp.route('/status', methods=['GET'])
-def get_status():
-    return jsonify({
-        'connected_users': len(connected_users),
-        'waiting_users': len(waiting_users),
-        'active_rooms': len(active_rooms)
-    })
-
-
-    # Nouveaux événements pour le suivi de l'état WebRTC côté client
+    # Suivi de l'état WebRTC côté client (chronologie des appels, /logs/rooms) ;
+    # webrtc_error est traité par mobile_debug
     @socketio.on('webrtc_connection_state')
     def handle_webrtc_connection_state(data):
         user_data = connected_users.get(request.sid)
         if user_data:
-            room_id = user_data.get('room')
+            room_id = user_data.room
             state = data.get('state', 'unknown')
             
             vocaline_logger.log('WEBRTC_STATE', request.sid, room_id, 
-                               f'État de connexion WebRTC: {state} pour {user_data["username"]}',
-                               {'connection_state': state, 'timestamp': data.get('timestamp')})
+                               'État de connexion WebRTC: %s pour %s',
+                               {'connection_state': state, 'timestamp': data.get('timestamp')},
+                               (state, user_data.username))
             
             # Si la connexion échoue, notifier l'autre utilisateur
-            if state in ['failed', 'disconnected', 'closed']:
-                if room_id and room_id in active_rooms:
-                    room_data = active_rooms[room_id]
-                    partner_id = room_data['user1'] if room_data['user2'] == request.sid else room_data['user2']
-                    
-                    vocaline_logger.log('WEBRTC_FAILURE', request.sid, room_id, 
-                                       f'Échec WebRTC détecté, notification du partenaire {partner_id}')
-                    
-                    emit('webrtc_connection_failed', {
-                        'reason': f'Connexion audio échouée avec {user_data["username"]}'
-                    }, room=partner_id)
+            partner_id = user_data.partner
+            if state in ['failed', 'disconnected', 'closed'] and partner_id:
+                vocaline_logger.log('WEBRTC_FAILURE', request.sid, room_id, 
+                                   'Échec WebRTC détecté, notification du partenaire %s',
+                                   {'connection_state': state}, (partner_id,))
+                
+                emit('webrtc_connection_failed', {
+                    'reason': f'Connexion audio échouée avec {user_data.username}'
+                }, room=partner_id)
+        else:
+            # Le client doit envoyer son état sur le socket du matchmaking, sinon l'appel
+            # n'a pas de chronologie (answer_to_connected jamais mesuré)
+            vocaline_logger.log('WEBRTC_ERROR', request.sid, None,
+                               'État de connexion WebRTC reçu sans session',
+                               {'connection_state': data.get('state', 'unknown') if isinstance(data, dict) else None})
 
     @socketio.on('webrtc_audio_state')
     def handle_webrtc_audio_state(data):
         user_data = connected_users.get(request.sid)
         if user_data:
-            room_id = user_data.get('room')
-            audio_enabled = data.get('enabled', False)
             audio_type = data.get('type', 'unknown')
             
-            vocaline_logger.log('WEBRTC_AUDIO', request.sid, room_id, 
-                               f'Audio {audio_type} pour {user_data["username"]}',
-                               {'audio_enabled': audio_enabled, 'type': audio_type, 'data': data})
+            vocaline_logger.log('WEBRTC_AUDIO', request.sid, user_data.room, 
+                               'Audio %s pour %s',
+                               {'audio_enabled': data.get('enabled', False), 'type': audio_type,
+                                'data': data},
+                               (audio_type, user_data.username))
 
-    @socketio.on('webrtc_error')
-    def handle_webrtc_error(data):
-        user_data = connected_users.get(request.sid)
-        if user_data:
-            room_id = user_data.get('room')
-            error_type = data.get('type', 'unknown')
-            error_message = data.get('message', 'Erreur inconnue')
-            
-            vocaline_logger.log('WEBRTC_CLIENT_ERROR', request.sid, room_id, 
-                               f'Erreur WebRTC côté client: {error_type} - {error_message}',
-                               {'error_type': error_type, 'error_message': error_message})
+# Enregistrer les événements SocketIO
+register_socketio_events()
+
+if PAIRING_TICK_MS > 0:
+    pairing_engine = PairingEngine(get_socketio(), pair_waiting_batch,
+                                   tick_ms=PAIRING_TICK_MS, max_pairs=PAIRING_BATCH_MAX)
+    pairing_engine.start()
+
+if ICE_BATCH_MS > 0:
+    ice_batcher = IceCandidateBatcher(get_socketio(), deliver_ice_candidates,
+                                      window_ms=ICE_BATCH_MS, max_batch=ICE_BATCH_MAX)
+
+def purge_waiting_users():
+    """Retirer périodiquement de la file les utilisateurs sans session
+
+    La déconnexion et l'appariement retirent déjà ces utilisateurs : la purge
+    est un filet de sécurité, pour qu'une entrée orpheline ne reste pas dans
+    une file inactive, qu'aucun appariement ne parcourt.
+    """
+    socketio = get_socketio()
+    while True:
+        socketio.sleep(CLEANUP_INTERVAL)
+        try:
+            cleanup_waiting_users(waiting_users, connected_users)
+        except Exception as e:
+            vocaline_logger.log('ERROR', None, None,
+                               f'Erreur lors de la purge de la file d\'attente: {str(e)}',
+                               {'error': str(e)})
+
+if CLEANUP_INTERVAL > 0:
+    get_socketio().start_background_task(purge_waiting_users)
 
+@matchmaking_bp.route('/status', methods=['GET'])
+def get_status():
+    return jsonify({
+        'connected_users': len(connected_users),
+        'waiting_users': len(waiting_users),
+        'active_rooms': len(active_rooms)
+    })
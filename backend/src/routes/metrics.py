@@ -0,0 +1,18 @@
+from flask import Blueprint, Response
+from src.routes.matchmaking import matchmaking_state
+from src.utils.metrics import Gauge, metrics_registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Jauges lues à chaque collecte : taille de la file d'attente, sessions et rooms
+metrics_registry.register(Gauge('vocaline_waiting_users', 'Utilisateurs en attente d\'un partenaire',
+                                lambda: len(matchmaking_state.waiting_users)))
+metrics_registry.register(Gauge('vocaline_connected_users', 'Utilisateurs connectés',
+                                lambda: len(matchmaking_state.connected_users)))
+metrics_registry.register(Gauge('vocaline_active_rooms', 'Conversations en cours',
+                                lambda: len(matchmaking_state.active_rooms)))
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
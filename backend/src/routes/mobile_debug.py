@@ -1,9 +1,18 @@
 from flask import Blueprint, request
 from ..socketio_instance import socketio
-from ..utils.logger import vocaline_logger
+from ..utils.logger import vocaline_logger, Lazy
 
 mobile_debug_bp = Blueprint('mobile_debug', __name__)
 
+# Champs déjà extraits dans le log, inutile de les dupliquer dans debug_data
+EXTRACTED_FIELDS = ('userAgent', 'isMobile', 'connection', 'online')
+
+def extra_debug_data(debug_data):
+    """Données de debug mobile hors champs déjà extraits"""
+    if not isinstance(debug_data, dict):
+        return debug_data
+    return {key: value for key, value in debug_data.items() if key not in EXTRACTED_FIELDS}
+
 @socketio.on('mobile_debug')
 def handle_mobile_debug(data):
     """Gérer les logs de debug mobile"""
@@ -20,19 +29,21 @@ def handle_mobile_debug(data):
         # Déterminer le type d'appareil
         device_type = 'Mobile' if is_mobile else 'Desktop'
         
-        # Logger avec informations détaillées
+        # Logger avec informations détaillées ; le reste des données du client
+        # n'est copié que si le log est conservé, et borné en taille par le logger
         vocaline_logger.log(
             'MOBILE_DEBUG',
             request.sid,
             'N/A',
-            f'{device_type}: {message}',
+            '%s: %s',
             {
                 'device_type': device_type,
                 'user_agent': user_agent[:100],  # Limiter la longueur
                 'connection_type': connection_type,
                 'online': online_status,
-                'debug_data': debug_data
-            }
+                'debug_data': Lazy(extra_debug_data, debug_data)
+            },
+            (device_type, message)
         )
         
     except Exception as e:
@@ -102,7 +113,9 @@ def handle_webrtc_ice(data):
             {'error': str(e)}
         )
 
-@socketio.on('webrtc_offer')
+# Suivi des offres et réponses côté client (sans SDP) : événements distincts
+# de webrtc_offer / webrtc_answer, qui transportent le signaling relayé
+@socketio.on('webrtc_offer_debug')
 def handle_webrtc_offer_log(data):
     """Logger les offres WebRTC avec détails"""
     try:
@@ -131,7 +144,7 @@ def handle_webrtc_offer_log(data):
             {'error': str(e)}
         )
 
-@socketio.on('webrtc_answer')
+@socketio.on('webrtc_answer_debug')
 def handle_webrtc_answer_log(data):
     """Logger les réponses WebRTC avec détails"""
     try:
@@ -1,12 +1,29 @@
+import os
 from flask_socketio import SocketIO
 
 socketio = None
 
 def init_socketio(app):
     global socketio
-    socketio = SocketIO(app, cors_allowed_origins="*")
+    # Message queue partagée (ex: redis://localhost:6379/0) : permet à plusieurs
+    # workers d'émettre vers des clients connectés à un autre worker
+    message_queue = os.environ.get('VOCALINE_MESSAGE_QUEUE') or None
+    # Mode asynchrone : 'threading' (défaut, serveur Werkzeug) ou 'gevent' (run_gevent.py).
+    # Explicite : sinon Flask-SocketIO choisit gevent dès qu'il est installé, même
+    # sans monkey patching, et les tâches de fond ne tournent plus
+    async_mode = os.environ.get('VOCALINE_ASYNC_MODE') or 'threading'
+    # Transports acceptés : WebSocket (upgrade depuis le polling) avec repli en long-polling
+    transports = [transport.strip() for transport in
+                  os.environ.get('VOCALINE_TRANSPORTS', 'polling,websocket').split(',')]
+    socketio = SocketIO(app, cors_allowed_origins="*", message_queue=message_queue,
+                        async_mode=async_mode,
+                        transports=transports,
+                        allow_upgrades='websocket' in transports,
+                        ping_interval=float(os.environ.get('VOCALINE_PING_INTERVAL', '25')),
+                        ping_timeout=float(os.environ.get('VOCALINE_PING_TIMEOUT', '20')),
+                        # Messages plus petits que le seuil (octets) envoyés sans compression
+                        compression_threshold=int(os.environ.get('VOCALINE_COMPRESSION_THRESHOLD', '1024')))
     return socketio
 
 def get_socketio():
     return socketio
-
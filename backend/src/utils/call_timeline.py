@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.utils.logger import vocaline_logger
+from src.utils.metrics import CALL_BUCKETS, Histogram, MetricsRegistry, QuantileGauge, metrics_registry
+
+# Nombre de rooms terminées dont la chronologie est conservée
+TIMELINE_ROOMS = int(os.environ.get('VOCALINE_TIMELINE_ROOMS', '1000'))
+# Nombre maximal de rooms en cours suivies (au-delà, la plus ancienne est abandonnée)
+TIMELINE_ACTIVE_MAX = 10000
+# Nombre maximal d'événements conservés par room (les compteurs restent exacts au-delà)
+TIMELINE_EVENTS = 200
+
+# Événements qui composent la chronologie d'un appel
+TIMELINE_EVENT_TYPES = ('ROOM_CREATE', 'WEBRTC_OFFER', 'WEBRTC_ANSWER', 'WEBRTC_ICE', 'WEBRTC_STATE',
+                        'WEBRTC_FAILURE', 'ROOM_DELETE')
+
+# Phases d'un appel : de la création de la room à la première offre, de l'offre
+# à la réponse, de la réponse au premier état `connected`, et durée totale
+PHASES = ('match_to_offer', 'offer_to_answer', 'answer_to_connected', 'total')
+
+
+class CallTimeline:
+    """Chronologie d'une room : événements de signaling et instants des phases
+
+    Les instants sont des horodatages monotones ; les événements sont
+    conservés relativement à la création de la room.
+    """
+
+    __slots__ = ('room_id', 'users', 'started', 'created_at', 'offer', 'answer', 'connected',
+                 'closed', 'failed', 'ice', 'events', 'dropped_events')
+
+    def __init__(self, room_id: str, started: float):
+        self.room_id = room_id
+        self.users: List[str] = []
+        self.started = started
+        self.created_at = datetime.fromtimestamp(time.time() + started - time.monotonic())
+        self.offer = self.answer = self.connected = self.closed = None
+        self.failed = False
+        self.ice: Dict[str, int] = {}
+        self.events: List[tuple] = []
+        self.dropped_events = 0
+
+    def add(self, now: float, event_type: str, user_id: Optional[str], detail: Any):
+        if len(self.events) < TIMELINE_EVENTS:
+            self.events.append((now - self.started, event_type, user_id, detail))
+        else:
+            self.dropped_events += 1
+
+    def phases(self) -> Dict[str, Optional[float]]:
+        """Durée (s) de chaque phase, None si elle n'est pas terminée"""
+        return {
+            'match_to_offer': _duration(self.started, self.offer),
+            'offer_to_answer': _duration(self.offer, self.answer),
+            'answer_to_connected': _duration(self.answer, self.connected),
+            'total': _duration(self.started, self.closed)
+        }
+
+    def outcome(self) -> str:
+        if self.connected is not None:
+            return 'connected'
+        if self.failed:
+            return 'failed'
+        return 'signaling' if self.closed is None else 'not_connected'
+
+    def to_dict(self, events: bool = True) -> Dict[str, Any]:
+        timeline = {
+            'room_id': self.room_id,
+            'users': self.users,
+            'created_at': self.created_at.isoformat(),
+            'active': self.closed is None,
+            'outcome': self.outcome(),
+            'phases': self.phases(),
+            'ice_candidates': dict(self.ice)
+        }
+        if events:
+            timeline['events'] = [{'offset': round(offset, 3), 'event_type': event_type,
+                                   'user_id': user_id, 'detail': detail}
+                                  for offset, event_type, user_id, detail in self.events]
+            timeline['dropped_events'] = self.dropped_events
+        return timeline
+
+
+def _duration(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round(max(end - start, 0.0), 3)
+
+
+class CallTimelines:
+    """Chronologies des appels, tenues à mesure que les événements sont loggés
+
+    Abonné au logger (VocalineLogger.observe) : chaque événement de
+    TIMELINE_EVENT_TYPES met à jour la chronologie de sa room en O(1), avant
+    échantillonnage, et chaque phase terminée alimente l'histogramme de sa
+    durée. Consulter une room ou les percentiles ne relit donc aucun log.
+    Les rooms terminées sont conservées dans la limite de `max_rooms`.
+    """
+
+    def __init__(self, registry: MetricsRegistry, max_rooms: int = TIMELINE_ROOMS):
+        self.max_rooms = max_rooms
+        self._lock = threading.Lock()
+        self._active: Dict[str, CallTimeline] = {}
+        self._closed: 'OrderedDict[str, CallTimeline]' = OrderedDict()
+        self._outcomes: Dict[str, int] = {}
+        self.histograms = {}
+        for phase in PHASES:
+            name = f'vocaline_call_{phase}_seconds'
+            description = ('Durée des appels, de la création à la fermeture de la room' if phase == 'total'
+                           else f'Durée de la phase {phase} du signaling WebRTC')
+            histogram = Histogram(name, description, CALL_BUCKETS) if phase == 'total' \
+                else Histogram(name, description)
+            self.histograms[phase] = registry.register(histogram)
+            registry.register(QuantileGauge(f'vocaline_call_{phase}_quantile_seconds',
+                                            f'Percentiles estimés de {name}', histogram))
+
+    def observe(self, now: float, event_type: str, user_id: Optional[str], room_id: Optional[str], data):
+        """Observateur du logger : intégrer un événement à la chronologie de sa room"""
+        if room_id is None:
+            return
+        data = data if isinstance(data, dict) else {}
+        with self._lock:
+            timeline = self._active.get(room_id)
+            if timeline is None:
+                if event_type != 'ROOM_CREATE':
+                    return  # Room inconnue (créée avant le démarrage ou déjà fermée)
+                if len(self._active) >= TIMELINE_ACTIVE_MAX:
+                    self._active.pop(next(iter(self._active)))
+                timeline = self._active[room_id] = CallTimeline(room_id, now)
+                timeline.users = [data.get('user1'), data.get('user2')]
+                timeline.add(now, event_type, user_id, None)
+                return
+            detail = None
+            if event_type == 'WEBRTC_ICE':
+                count = data.get('count', 1)
+                timeline.ice[user_id] = timeline.ice.get(user_id, 0) + count
+                detail = count
+            elif event_type == 'WEBRTC_OFFER':
+                if timeline.offer is None:
+                    timeline.offer = now
+                    self._record('match_to_offer', timeline.started, now)
+            elif event_type == 'WEBRTC_ANSWER':
+                if timeline.answer is None and timeline.offer is not None:
+                    timeline.answer = now
+                    self._record('offer_to_answer', timeline.offer, now)
+            elif event_type == 'WEBRTC_STATE':
+                detail = data.get('connection_state')
+                if detail == 'connected' and timeline.connected is None:
+                    timeline.connected = now
+                    if timeline.answer is not None:
+                        self._record('answer_to_connected', timeline.answer, now)
+                elif detail == 'failed':
+                    timeline.failed = True
+            elif event_type == 'WEBRTC_FAILURE':
+                timeline.failed = True
+                detail = data.get('connection_state')
+            timeline.add(now, event_type, user_id, detail)
+            if event_type == 'ROOM_DELETE':
+                timeline.closed = now
+                self._record('total', timeline.started, now)
+                outcome = timeline.outcome()
+                self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+                del self._active[room_id]
+                self._closed[room_id] = timeline
+                if len(self._closed) > self.max_rooms:
+                    self._closed.popitem(last=False)
+
+    def _record(self, phase: str, start: float, end: float):
+        self.histograms[phase].observe(max(end - start, 0.0))
+
+    def get(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """Chronologie complète d'une room en cours ou récemment terminée"""
+        with self._lock:
+            timeline = self._active.get(room_id) or self._closed.get(room_id)
+            return timeline.to_dict() if timeline is not None else None
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Rooms les plus récentes (en cours puis terminées), sans leurs événements"""
+        with self._lock:
+            found = []
+            for rooms in (self._active, self._closed):
+                for room_id in reversed(rooms):
+                    if len(found) >= limit:
+                        break
+                    found.append(rooms[room_id])
+            found.sort(key=lambda timeline: timeline.started, reverse=True)
+            return [timeline.to_dict(events=False) for timeline in found[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Percentiles de chaque phase sur tous les appels, et issue des appels terminés"""
+        phases = {}
+        for phase, histogram in self.histograms.items():
+            phases[phase] = {'count': histogram.count}
+            if histogram.count:
+                for q in (0.5, 0.95, 0.99):
+                    phases[phase][f'p{int(q * 100)}'] = round(histogram.quantile(q), 3)
+        with self._lock:
+            return {
+                'active_rooms': len(self._active),
+                'outcomes': dict(self._outcomes),
+                'phases': phases
+            }
+
+
+# Instance globale, alimentée par le logger
+call_timelines = CallTimelines(metrics_registry)
+vocaline_logger.observe(TIMELINE_EVENT_TYPES, call_timelines.observe)
@@ -2,19 +2,16 @@ from src.utils.logger import vocaline_logger
 
 def cleanup_waiting_users(waiting_users, connected_users):
     """
-    Nettoie la liste waiting_users en supprimant les utilisateurs déconnectés
+    Nettoie la file waiting_users (WaitingPool) en supprimant les utilisateurs déconnectés
     """
     initial_count = len(waiting_users)
     
-    # Filtrer les utilisateurs qui sont toujours connectés
-    valid_users = [user_id for user_id in waiting_users if user_id in connected_users]
-    
     # Identifier les utilisateurs à supprimer
     invalid_users = [user_id for user_id in waiting_users if user_id not in connected_users]
     
-    # Mettre à jour la liste
-    waiting_users.clear()
-    waiting_users.extend(valid_users)
+    # Mettre à jour la file d'attente (retrait indexé en O(1) par utilisateur)
+    for user_id in invalid_users:
+        waiting_users.discard(user_id)
     
     # Logger le nettoyage
     if invalid_users:
@@ -22,8 +19,7 @@ def cleanup_waiting_users(waiting_users, connected_users):
                            f'Nettoyage de waiting_users: {len(invalid_users)} utilisateurs déconnectés supprimés',
                            {'removed_users': invalid_users,
                             'before_count': initial_count,
-                            'after_count': len(waiting_users),
-                            'remaining_users': valid_users})
+                            'after_count': len(waiting_users)})
     
     return len(invalid_users)
 
@@ -47,9 +43,28 @@ def validate_user_states(waiting_users, connected_users, active_rooms):
     
     # Vérifier qu'aucun utilisateur n'est à la fois en room et en attente
     for user_id, user_data in connected_users.items():
-        if user_data.get('room') and user_id in waiting_users:
+        if user_data.room and user_id in waiting_users:
             issues.append(f"User {user_id} both in room and waiting_users")
     
+    # Vérifier que chaque utilisateur n'appartient qu'à une room, et à celle qu'il référence
+    room_members = {}
+    for room_id, room_data in active_rooms.items():
+        for user_key in ['user1', 'user2']:
+            user_id = room_data.get(user_key)
+            if user_id in room_members:
+                issues.append(f"User {user_id} paired in rooms {room_members[user_id]} and {room_id}")
+            room_members[user_id] = room_id
+            user_data = connected_users.get(user_id)
+            if user_data and user_data.room != room_id:
+                issues.append(f"User {user_id} in room {room_id} but references room {user_data.room}")
+            partner_id = room_data.get('user2' if user_key == 'user1' else 'user1')
+            if user_data and user_data.partner != partner_id:
+                issues.append(f"User {user_id} in room {room_id} but references partner {user_data.partner}")
+    
+    for user_id, user_data in connected_users.items():
+        if user_data.room and user_data.room not in active_rooms:
+            issues.append(f"User {user_id} references inactive room {user_data.room}")
+    
     if issues:
         vocaline_logger.log('VALIDATION_ERROR', None, None, 
                            f'Incohérences détectées: {len(issues)}',
@@ -0,0 +1,192 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# Nombre d'avis relus à la fois pour compléter l'index
+INDEX_PAGE = 1000
+# Nombre maximal de termes couverts par un préfixe (les premiers dans l'ordre alphabétique)
+PREFIX_TERMS = 200
+# Paramètres du classement BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Mots vides français, sans accents ; les élisions (l', d', qu'...) sont des jetons d'une lettre
+STOPWORDS = frozenset("""
+a ai as au aux avec avez avons c ca car ce ces cet cette d dans de des donc du elle elles en est et
+etre il ils j je l la le les leur leurs m ma mais me mes mon n ne ni nos notre nous on ont ou par pas
+pour qu que qui s sa sans se ses si son sont sur t ta te tes ton tres tu un une vos votre vous y
+""".split())
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ni ligatures (« Problème » -> « probleme », « cœur » -> « coeur »)"""
+    text = unicodedata.normalize('NFKD', text.lower().replace('œ', 'oe').replace('æ', 'ae'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def _normalize(token: str) -> str:
+    """Réduire le pluriel régulier (« connexions » -> « connexion »), au-delà de 4 lettres"""
+    if len(token) > 4 and token[-1] in 'sx':
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes indexés d'un texte : mots sans accents, hors mots vides, pluriel réduit"""
+    return [_normalize(token) for token in _TOKEN.findall(fold(text)) if token not in STOPWORDS]
+
+
+def parse_query(text: str) -> List[Tuple[str, bool]]:
+    """Termes d'une recherche : (terme, est un préfixe) ; `audi*` cherche les mots commençant par audi"""
+    terms = []
+    for match in re.finditer(r'([a-z0-9]+)(\*?)', fold(text)):
+        token, prefix = match.group(1), bool(match.group(2))
+        if prefix:
+            terms.append((token, True))
+        elif token not in STOPWORDS:
+            terms.append((_normalize(token), False))
+    return terms
+
+
+class _Postings:
+    """Avis contenant un terme : rangs croissants et nombre d'occurrences (tableaux compacts)"""
+
+    __slots__ = ('ranks', 'counts')
+
+    def __init__(self):
+        self.ranks = array('I')
+        self.counts = array('H')
+
+
+class FeedbackIndex:
+    """Index inversé du texte des avis, pour la recherche plein texte
+
+    Chaque terme (mot sans accents, hors mots vides) pointe vers les rangs
+    des avis qui le contiennent. Les avis n'étant jamais supprimés, l'index
+    se complète comme FeedbackStats : sync() n'indexe que les avis ajoutés
+    depuis l'appel précédent. Le vocabulaire, trié, sert aux recherches par
+    préfixe.
+
+    Une recherche retient les avis contenant tous les termes. Le terme le plus
+    rare est traité en premier, et les autres ne sont cherchés que parmi ses
+    avis. Les avis retenus sont classés par BM25 puis par récence. Le coût
+    dépend du nombre d'avis qui correspondent, pas du nombre total d'avis.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.indexed = 0
+        self._postings: Dict[str, _Postings] = {}
+        # Vocabulaire trié (recherche par préfixe) ; les nouveaux termes y sont fusionnés à la demande
+        self._terms: List[str] = []
+        self._new_terms: List[str] = []
+        self._lengths = array('H')
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def sync(self) -> int:
+        """Indexer les avis ajoutés depuis le dernier appel, retourne le nombre d'avis indexés"""
+        with self._lock:
+            total = len(self.store)
+            while self.indexed < total:
+                stop = min(self.indexed + INDEX_PAGE, total)
+                for rank, feedback in enumerate(self.store.entries(self.indexed, stop), self.indexed):
+                    self._add(rank, feedback.get('feedback') or '')
+                self.indexed = stop
+            return self.indexed
+
+    def _add(self, rank: int, text: str):
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = _Postings()
+                self._new_terms.append(token)
+            postings.ranks.append(rank)
+            postings.counts.append(min(count, 0xFFFF))
+        self._lengths.append(min(len(tokens), 0xFFFF))
+        self._total_length += len(tokens)
+
+    def _expand(self, term: str, prefix: bool) -> List[_Postings]:
+        """Listes d'avis d'un terme de recherche (plusieurs pour un préfixe), verrou pris"""
+        if not prefix:
+            postings = self._postings.get(term)
+            return [postings] if postings is not None else []
+        if self._new_terms:
+            self._terms = list(heapq.merge(self._terms, sorted(self._new_terms)))
+            self._new_terms = []
+        found = []
+        position = bisect.bisect_left(self._terms, term)
+        while position < len(self._terms) and len(found) < PREFIX_TERMS:
+            candidate = self._terms[position]
+            if not candidate.startswith(term):
+                break
+            found.append(self._postings[candidate])
+            position += 1
+        return found
+
+    def search(self, text: str, offset: int = 0, limit: int = 20) -> Tuple[List[Tuple[int, float]], int]:
+        """Avis correspondant à tous les termes de `text`, les mieux classés d'abord
+
+        Retourne ([(rang, score)] de la page offset..offset+limit, nombre total d'avis trouvés).
+        """
+        terms = parse_query(text)
+        self.sync()
+        with self._lock:
+            if not terms or not self.indexed:
+                return [], 0
+            count = self.indexed
+            average = self._total_length / count or 1.0
+            groups = [self._expand(term, prefix) for term, prefix in terms]
+            if not all(groups):
+                return [], 0
+            groups.sort(key=lambda group: sum(len(postings.ranks) for postings in group))
+            scores: Optional[Dict[int, float]] = None
+            for group in groups:
+                matched = self._score(group[0], count, average, scores)
+                for postings in group[1:]:
+                    for rank, score in self._score(postings, count, average, scores).items():
+                        matched[rank] = matched.get(rank, 0.0) + score
+                if scores is not None:
+                    matched = {rank: scores[rank] + score for rank, score in matched.items()}
+                scores = matched
+                if not scores:
+                    return [], 0
+        best = heapq.nlargest(offset + limit, zip(scores.values(), scores.keys()))
+        return [(rank, round(score, 3)) for score, rank in best[offset:]], len(scores)
+
+    def _score(self, postings: _Postings, count: int, average: float,
+               candidates: Optional[Dict[int, float]]) -> Dict[int, float]:
+        """Score BM25 d'un terme pour ses avis parmi `candidates` (tous si None), verrou pris"""
+        ranks, counts, lengths = postings.ranks, postings.counts, self._lengths
+        frequency = len(ranks)
+        idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5)) * (BM25_K1 + 1)
+        norm = BM25_K1 * (1 - BM25_B)
+        slope = BM25_K1 * BM25_B / average
+        if candidates is None:
+            return {rank: idf * tf / (tf + norm + slope * lengths[rank]) for rank, tf in zip(ranks, counts)}
+        if len(candidates) * 16 < frequency:
+            # Peu de candidats : recherche dichotomique de chacun dans les rangs triés
+            found = {}
+            for rank in candidates:
+                position = bisect.bisect_left(ranks, rank)
+                if position < frequency and ranks[position] == rank:
+                    found[rank] = counts[position]
+        else:
+            found = dict(zip(ranks, counts))
+            found = {rank: found[rank] for rank in candidates.keys() & found.keys()}
+        return {rank: idf * tf / (tf + norm + slope * lengths[rank]) for rank, tf in found.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'indexed': self.indexed, 'terms': len(self._postings)}
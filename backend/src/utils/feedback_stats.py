@@ -0,0 +1,75 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+# Nombre d'avis relus à la fois pour mettre à jour les compteurs
+SYNC_PAGE = 1000
+
+
+def feedback_day(feedback: Dict[str, Any]) -> Optional[date]:
+    """Jour de l'horodatage d'un avis (None s'il est absent ou illisible)"""
+    try:
+        return datetime.fromisoformat(feedback['timestamp'].replace('Z', '+00:00')).date()
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return None
+
+
+class FeedbackStats:
+    """Compteurs des avis, total et par jour, tenus à jour incrémentalement
+
+    Les avis n'étant jamais supprimés, les compteurs retiennent le nombre
+    d'avis déjà comptés et sync() ne lit que les suivants : tout le stockage
+    au premier appel (démarrage), puis seulement les nouveaux avis, y compris
+    ceux écrits par d'autres workers sur une base SQLite partagée. Le nombre
+    d'avis d'une période se lit dans les compteurs par jour, en O(jours).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.counted = 0
+        self.undated = 0
+        self._days: Dict[date, int] = {}
+        self._last_day: Optional[date] = None
+        self._lock = threading.Lock()
+
+    def sync(self) -> int:
+        """Compter les avis ajoutés depuis le dernier appel, retourne le total"""
+        with self._lock:
+            total = len(self.store)
+            while self.counted < total:
+                stop = min(self.counted + SYNC_PAGE, total)
+                for feedback in self.store.entries(self.counted, stop):
+                    self._add(feedback_day(feedback))
+                self.counted = stop
+            return self.counted
+
+    def _add(self, day: Optional[date]):
+        if day is None:
+            self.undated += 1
+            return
+        self._days[day] = self._days.get(day, 0) + 1
+        if self._last_day is None or day > self._last_day:
+            self._last_day = day
+
+    def count(self, start: date, end: date = None) -> int:
+        """Nombre d'avis datés du jour `start` au jour `end` inclus (par défaut le plus récent)"""
+        self.sync()
+        with self._lock:
+            end = end or self._last_day
+            if end is None or end < start:
+                return 0
+            if (end - start).days >= len(self._days):
+                return sum(count for day, count in self._days.items() if start <= day <= end)
+            return sum(self._days.get(start + timedelta(days=offset), 0)
+                       for offset in range((end - start).days + 1))
+
+    def get_stats(self, today: date = None) -> Dict[str, Any]:
+        """Total, avis du jour et des 7 derniers jours (comme la page /feedbacks)"""
+        today = today or datetime.now().date()
+        total = self.sync()
+        return {
+            'total_feedback': total,
+            'today': self.count(today, today),
+            'week': self.count(today - timedelta(days=7)),
+            'undated': self.undated
+        }
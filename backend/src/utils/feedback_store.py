@@ -0,0 +1,272 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Répertoire des données (avis utilisateurs)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+# Ancien stockage : liste JSON réécrite en entier à chaque avis (migré une fois vers le nouveau)
+LEGACY_FEEDBACK_FILE = os.path.join(DATA_DIR, 'feedback.json')
+FEEDBACK_JSONL_FILE = os.path.join(DATA_DIR, 'feedback.jsonl')
+# Nombre maximal d'avis écrits et synchronisés sur disque en une même validation
+COMMIT_BATCH = 256
+# Attente maximale (s) de la validation d'un avis ; au-delà, POST /api/feedback répond 202 (avis en cours d'enregistrement)
+COMMIT_TIMEOUT = 10.0
+# Longueur du navigateur affiché dans la liste des avis (au-delà, tronqué)
+USER_AGENT_SHORT = 50
+
+
+def with_display_fields(feedback: Dict[str, Any]) -> Dict[str, Any]:
+    """Ajouter à un avis ses champs d'affichage (date formatée, ID court, navigateur tronqué)
+
+    Calculés une fois, à l'écriture de l'avis (ou à la lecture d'un avis
+    écrit avant leur introduction), jamais à l'affichage.
+    """
+    if 'formatted_date' in feedback:
+        return feedback
+    try:
+        date = datetime.fromisoformat(feedback['timestamp'].replace('Z', '+00:00'))
+        formatted_date = date.strftime('%d/%m/%Y à %H:%M')
+    except (KeyError, AttributeError, TypeError, ValueError):
+        formatted_date = 'Date inconnue'
+    user_agent = feedback.get('user_agent') or 'Non disponible'
+    feedback['formatted_date'] = formatted_date
+    feedback['short_id'] = str(feedback['id'])[:8] if 'id' in feedback else 'N/A'
+    feedback['user_agent_short'] = (user_agent[:USER_AGENT_SHORT] + '...'
+                                    if len(user_agent) > USER_AGENT_SHORT else user_agent)
+    return feedback
+
+
+class _Pending:
+    """Avis en attente de validation : le soumetteur attend `done`"""
+
+    __slots__ = ('item', 'done', 'error')
+
+    def __init__(self, item):
+        self.item = item
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitWriter:
+    """Écrivain unique des avis, par validations groupées
+
+    Les requêtes déposent leur avis dans une file et attendent ; un thread de
+    fond prend tous les avis en attente (au plus COMMIT_BATCH), les écrit et
+    les rend durables en une seule opération (`commit(items)` : écriture puis
+    fsync, ou transaction SQLite), puis réveille leurs soumetteurs. Les avis
+    arrivés pendant une validation partent ensemble avec la suivante : un
+    fsync est partagé par toutes les requêtes simultanées, et le débit croît
+    avec la concurrence au lieu de s'effondrer.
+    """
+
+    def __init__(self, commit: Callable[[List[Any]], None], name: str = 'vocaline-feedback',
+                 batch: int = COMMIT_BATCH):
+        self.commit = commit
+        self.name = name
+        self.batch = batch
+        self.commits = 0
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, item, timeout: float = COMMIT_TIMEOUT):
+        """Faire valider `item` et attendre qu'il soit durable (lève l'erreur de validation)"""
+        if self._worker is None:
+            self._start_worker()
+        pending = _Pending(item)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError('Validation de l\'avis trop longue')
+        if pending.error is not None:
+            raise pending.error
+
+    def _start_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            batch = [pending for pending in batch if pending is not None]
+            error = None
+            if batch:
+                try:
+                    self.commit([pending.item for pending in batch])
+                    self.commits += 1
+                except Exception as e:
+                    error = e
+            for pending in batch:
+                pending.error = error
+                pending.done.set()
+            if stop:
+                return
+
+    def close(self, timeout: float = 2):
+        """Valider les avis en attente puis arrêter le thread de fond"""
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+
+def load_legacy_feedback(path: str = LEGACY_FEEDBACK_FILE) -> List[Dict[str, Any]]:
+    """Avis de l'ancien fichier JSON (liste vide s'il n'existe pas ou est illisible)"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            feedback_list = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return []
+    return feedback_list if isinstance(feedback_list, list) else []
+
+
+class JsonlFeedbackStore:
+    """Avis stockés en JSONL, un avis par ligne, en ajout seul
+
+    Un index des positions de début de ligne, construit en une lecture au
+    démarrage puis tenu à chaque ajout, donne un accès direct à n'importe quel
+    avis : ajouter coûte O(1) quel que soit le nombre d'avis, lire une plage
+    ne lit que ses lignes. Une dernière ligne incomplète (arrêt brutal pendant
+    une écriture) est tronquée à l'ouverture.
+
+    Les ajouts passent par un GroupCommitWriter : append() ne retourne qu'une
+    fois l'avis écrit et synchronisé (fsync), et un avis n'est visible en
+    lecture qu'une fois durable.
+    """
+
+    def __init__(self, path: str = FEEDBACK_JSONL_FILE, legacy_path: str = LEGACY_FEEDBACK_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not os.path.exists(path):
+            self._migrate(legacy_path)
+        self._offsets: List[int] = []
+        self._size = self._load()
+        self._file = open(path, 'ab')
+        self._writer = GroupCommitWriter(self._commit)
+        atexit.register(self.close)
+
+    def _migrate(self, legacy_path: str):
+        """Créer le fichier à partir de l'ancien feedback.json (une seule fois, écriture atomique)"""
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            for entry in load_legacy_feedback(legacy_path):
+                f.write(_encode(with_display_fields(entry)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def _load(self) -> int:
+        """Indexer les lignes du fichier, retourne la taille de la partie valide"""
+        position = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._offsets.append(position)
+                position += len(line)
+        if position != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(position)
+        return position
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajouter un avis en fin de fichier, retourne une fois l'avis durable"""
+        self._writer.submit(_encode(with_display_fields(entry)))
+        return entry
+
+    def _commit(self, lines: List[bytes]):
+        """Écrire un lot de lignes et le synchroniser sur disque (thread d'écriture)"""
+        try:
+            self._file.write(b''.join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            # Retirer un lot partiellement écrit : le fichier reste aligné sur l'index
+            self._file = _reopen_truncated(self._file, self.path, self._size)
+            raise
+        with self._lock:
+            for line in lines:
+                self._offsets.append(self._size)
+                self._size += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Avis de rang start (inclus) à stop (exclu), du plus ancien au plus récent"""
+        with self._lock:
+            offsets = self._offsets[start:stop]
+            end = self._offsets[stop] if stop is not None and stop < len(self._offsets) else self._size
+        if not offsets:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(offsets[0])
+            data = f.read(end - offsets[0])
+        return [with_display_fields(json.loads(line)) for line in data.split(b'\n')[:-1]]
+
+    def entries_at(self, ranks: List[int]) -> List[Dict[str, Any]]:
+        """Avis des rangs donnés, dans l'ordre de `ranks` (une seule ouverture du fichier)"""
+        with self._lock:
+            spans = [(self._offsets[rank],
+                      self._offsets[rank + 1] if rank + 1 < len(self._offsets) else self._size)
+                     for rank in ranks]
+        if not spans:
+            return []
+        entries = []
+        with open(self.path, 'rb') as f:
+            for start, end in spans:
+                f.seek(start)
+                entries.append(with_display_fields(json.loads(f.read(end - start))))
+        return entries
+
+    def close(self):
+        self._writer.close()
+        with self._lock:
+            self._file.close()
+
+
+def _encode(entry: Dict[str, Any]) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False) + '\n').encode()
+
+
+def _reopen_truncated(file, path: str, size: int):
+    """Ramener le fichier à `size` octets après un échec d'écriture, retourne le fichier rouvert"""
+    try:
+        file.close()
+    except OSError:
+        pass
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+    return open(path, 'ab')
+
+
+def create_feedback_store(backend: str = None):
+    """Créer le stockage des avis pour le backend demandé
+
+    `backend` (par défaut VOCALINE_FEEDBACK_BACKEND) vaut 'jsonl' pour un
+    fichier data/feedback.jsonl en ajout seul, ou 'sqlite:///chemin/feedback.db'
+    pour une base SQLite en mode WAL. Dans les deux cas, les avis de l'ancien
+    data/feedback.json sont repris à la création du stockage.
+    """
+    backend = backend or os.environ.get('VOCALINE_FEEDBACK_BACKEND', 'jsonl')
+    if backend == 'jsonl':
+        return JsonlFeedbackStore()
+    if backend.startswith('sqlite:///'):
+        from src.utils.sqlite_feedback_store import SQLiteFeedbackStore
+        return SQLiteFeedbackStore(backend[len('sqlite:///'):])
+    raise ValueError(f'Backend d\'avis inconnu: {backend}')
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from src.utils.logger import vocaline_logger
+
+
+class IceCandidateBatcher:
+    """Regroupement des candidats ICE relayés vers un même partenaire
+
+    Le premier candidat d'un couple (émetteur, destinataire) ouvre une fenêtre
+    de `window_ms` ; les candidats reçus pendant cette fenêtre sont transmis
+    ensemble par `deliver(sender, receiver, candidates)`. Un lot qui atteint
+    `max_batch` candidats est transmis sans attendre la fin de la fenêtre.
+
+    Une seule tâche de fond, démarrée au premier candidat, transmet les lots
+    dont la fenêtre est écoulée. Chaque lot porte l'échéance de sa propre
+    fenêtre : un lot ouvert après la transmission du précédent n'est jamais
+    envoyé avant la fin de sa fenêtre.
+    """
+
+    def __init__(self, socketio, deliver: Callable[[str, str, List[dict]], None],
+                 window_ms: int = 10, max_batch: int = 16):
+        self.socketio = socketio
+        self.deliver = deliver
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        # {(émetteur, destinataire): (échéance, [candidats])}, par échéance croissante :
+        # les fenêtres durent toutes `window` et un lot est ajouté à l'ouverture de sa fenêtre
+        self._buffers: Dict[Tuple[str, str], Tuple[float, List[dict]]] = {}
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._started = False
+
+    def add(self, sender: str, receiver: str, candidate: dict):
+        key = (sender, receiver)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                self._buffers[key] = (time.monotonic() + self.window, [candidate])
+                full = self.max_batch <= 1
+            else:
+                buffer[1].append(candidate)
+                full = len(buffer[1]) >= self.max_batch
+            start = not self._started
+            self._started = True
+        if start:
+            self.socketio.start_background_task(self._run)
+        if full:
+            self.flush(sender, receiver)
+        else:
+            self._pending.set()
+
+    def flush(self, sender: str, receiver: str):
+        with self._lock:
+            buffer = self._buffers.pop((sender, receiver), None)
+        if buffer:
+            self._deliver(sender, receiver, buffer[1])
+
+    def _due(self) -> Tuple[List[Tuple[Tuple[str, str], List[dict]]], float]:
+        """Retirer les lots dont la fenêtre est écoulée, retourne (lots, attente avant la prochaine échéance)"""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for key, (deadline, candidates) in self._buffers.items():
+                if deadline > now:
+                    return self._pop(due), deadline - now
+                due.append((key, candidates))
+            self._pending.clear()
+            return self._pop(due), 0.0
+
+    def _pop(self, due):
+        """Retirer les lots échus du dictionnaire, verrou pris"""
+        for key, _ in due:
+            del self._buffers[key]
+        return due
+
+    def _run(self):
+        while True:
+            due, wait = self._due()
+            for (sender, receiver), candidates in due:
+                self._deliver(sender, receiver, candidates)
+            if wait > 0:
+                self.socketio.sleep(wait)
+            elif not due:
+                # Aucun lot en attente : attendre le prochain candidat (vérifié à chaque fenêtre)
+                self._pending.wait(self.window)
+
+    def _deliver(self, sender: str, receiver: str, candidates: List[dict]):
+        try:
+            self.deliver(sender, receiver, candidates)
+        except Exception as e:
+            vocaline_logger.log('ERROR', sender, None,
+                               f'Erreur lors de l\'envoi d\'un lot de candidats ICE: {str(e)}',
+                               {'error': str(e), 'partner': receiver})
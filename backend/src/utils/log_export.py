@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List
+
+from src.utils.log_query import LogQuery
+
+# Nombre de logs lus (puis sérialisés et envoyés) à la fois par un export
+EXPORT_PAGE = 1000
+
+CSV_COLUMNS = ['seq', 'timestamp', 'event_type', 'user_id', 'room_id', 'message', 'data']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+
+
+def iter_pages(logger, query: LogQuery, page_size: int = EXPORT_PAGE) -> Iterator[List[Dict[str, Any]]]:
+    """Pages de logs correspondant à `query`, du plus récent au plus ancien
+
+    Chaque page est une requête curseur (`before`) au logger : seule la page
+    courante est en mémoire, quel que soit le nombre de logs exportés.
+    `query.limit` borne le total (None = tout l'historique).
+    """
+    remaining = query.limit
+    before = query.before
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        logs, before = logger.query(query.with_bounds(before, size))
+        if logs:
+            logs.reverse()
+            if remaining is not None:
+                remaining -= len(logs)
+            yield logs
+        if before is None:
+            return
+
+
+def _csv_chunk(logs: Iterable[Dict[str, Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for log in logs:
+        data = log.get('data')
+        writer.writerow([log['seq'], log['timestamp'], log['event_type'], log['user_id'] or '',
+                         log['room_id'] or '', log['message'],
+                         json.dumps(data, ensure_ascii=False, default=str) if data else ''])
+    return buffer.getvalue().encode()
+
+
+def _ndjson_chunk(logs: Iterable[Dict[str, Any]]) -> bytes:
+    return ''.join(json.dumps(log, ensure_ascii=False, default=str) + '\n' for log in logs).encode()
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresser au fil de l'eau : chaque morceau est envoyé dès qu'il est compressé"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_logs(logger, query: LogQuery, export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """Export des logs en CSV ou NDJSON (du plus récent au plus ancien), un morceau par page
+
+    L'en-tête CSV est envoyé avant toute lecture, pour que le téléchargement
+    commence immédiatement.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Format inconnu: {export_format}')
+
+    def chunks() -> Iterator[bytes]:
+        if export_format == 'csv':
+            yield _csv_chunk((), header=True)
+            for logs in iter_pages(logger, query):
+                yield _csv_chunk(logs)
+        else:
+            for logs in iter_pages(logger, query):
+                yield _ndjson_chunk(logs)
+
+    return _gzip(chunks()) if compress else chunks()
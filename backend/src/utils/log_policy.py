@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict
+
+# Politique par défaut : les types bavards sont limités en débit, les types rares
+# et précieux disposent d'une capacité réservée que les autres ne peuvent pas évincer,
+# et les types aux données volumineuses (fournies par le client) d'un quota d'octets
+DEFAULT_POLICIES = {
+    'WEBRTC_ICE': {'rate': 20, 'burst': 50},
+    'MOBILE_DEBUG': {'rate': 10, 'burst': 30, 'quota': 2 ** 20},
+    'WEBRTC_AUDIO': {'rate': 10, 'burst': 30},
+    'WEBRTC_STATE': {'rate': 10, 'burst': 30},
+    'ERROR': {'reserved': 100},
+    'WEBRTC_ERROR': {'reserved': 100},
+    'WEBRTC_FAILURE': {'reserved': 50},
+    'VALIDATION_ERROR': {'reserved': 50},
+    'MATCH_SUCCESS': {'reserved': 200},
+}
+
+
+class LogPolicy:
+    """Règles d'admission d'un type d'événement et compteurs de logs écartés
+
+    - sample_rate : fraction des logs conservés (1.0 = tous) ;
+    - rate / burst : seau à jetons, `rate` logs par seconde en régime établi et
+      jusqu'à `burst` d'un coup (rate None = pas de limite) ;
+    - reserved : capacité dédiée au type dans le tampon, en nombre de logs ;
+    - quota : mémoire dédiée au type, en octets (estimés) ; avec reserved ou
+      quota, le type a son propre tampon (0 et 0 = tampon partagé).
+    """
+
+    __slots__ = ('sample_rate', 'rate', 'burst', 'reserved', 'quota', '_tokens', '_updated',
+                 'sampled_out', 'rate_limited', '_lock')
+
+    def __init__(self, sample_rate: float = 1.0, rate: float = None, burst: float = None,
+                 reserved: int = 0, quota: int = 0):
+        self.sample_rate = float(sample_rate)
+        self.rate = float(rate) if rate is not None else None
+        self.burst = float(burst if burst is not None else max(rate or 0, 1))
+        self.reserved = int(reserved)
+        self.quota = int(quota)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Décider si un log de ce type est conservé (et compter ceux qui ne le sont pas)"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        if self.rate is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.rate_limited += 1
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sample_rate': self.sample_rate,
+            'rate': self.rate,
+            'burst': self.burst if self.rate is not None else None,
+            'reserved': self.reserved,
+            'quota': self.quota,
+            'sampled_out': self.sampled_out,
+            'rate_limited': self.rate_limited
+        }
+
+
+def parse_policy(config: Dict[str, Any]) -> LogPolicy:
+    """Construire une LogPolicy à partir d'un dict (API d'administration, variable d'environnement)"""
+    unknown = set(config) - {'sample_rate', 'rate', 'burst', 'reserved', 'quota'}
+    if unknown:
+        raise ValueError(f'Paramètres inconnus: {", ".join(sorted(unknown))}')
+    sample_rate = float(config.get('sample_rate', 1.0))
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError('sample_rate doit être compris entre 0 et 1')
+    rate = config.get('rate')
+    if rate is not None and float(rate) < 0:
+        raise ValueError('rate doit être positif')
+    reserved = int(config.get('reserved', 0))
+    if reserved < 0:
+        raise ValueError('reserved doit être positif')
+    quota = int(config.get('quota', 0))
+    if quota < 0:
+        raise ValueError('quota doit être positif')
+    return LogPolicy(sample_rate, rate, config.get('burst'), reserved, quota)
+
+
+def load_default_policies() -> Dict[str, LogPolicy]:
+    """Politiques par défaut, complétées ou remplacées par VOCALINE_LOG_POLICY (JSON par type)"""
+    configs = dict(DEFAULT_POLICIES)
+    override = os.environ.get('VOCALINE_LOG_POLICY')
+    if override:
+        configs.update(json.loads(override))
+    return {event_type: parse_policy(config) for event_type, config in configs.items()}
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Nombre de logs retournés par défaut et au maximum par /api/logs
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _timestamp(value: Optional[str]) -> Optional[str]:
+    """Normaliser une date ISO 8601 au format des logs (comparable en tant que chaîne)"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=None).isoformat()
+
+
+class LogQuery:
+    """Critères de recherche dans les logs, combinés par ET (None = pas de critère)
+
+    - event_type, user_id, room_id : égalité exacte ;
+    - since / until : bornes incluses sur l'horodatage (ISO 8601) ;
+    - before : curseur, seuls les logs de seq strictement inférieur sont retenus ;
+    - after : mode delta, seuls les logs de seq strictement supérieur sont retenus ;
+    - limit : nombre maximal de logs (les plus récents d'abord), None = tous.
+    """
+
+    __slots__ = ('event_type', 'user_id', 'room_id', 'since', 'until', 'before', 'after', 'limit')
+
+    def __init__(self, event_type: str = None, user_id: str = None, room_id: str = None,
+                 since: str = None, until: str = None, before: int = None, after: int = None,
+                 limit: Optional[int] = DEFAULT_LIMIT):
+        self.event_type = event_type
+        self.user_id = user_id
+        self.room_id = room_id
+        self.since = _timestamp(since)
+        self.until = _timestamp(until)
+        self.before = before
+        self.after = after
+        self.limit = limit
+
+    @classmethod
+    def from_args(cls, args, default_limit: Optional[int] = DEFAULT_LIMIT,
+                  max_limit: Optional[int] = MAX_LIMIT) -> 'LogQuery':
+        """Construire une requête depuis des paramètres d'URL (ValueError si invalides)
+
+        Sans paramètre limit, `default_limit` s'applique ; None = pas de limite.
+        """
+        before = args.get('before')
+        after = args.get('after')
+        limit = args.get('limit')
+        limit = int(limit) if limit else default_limit
+        if limit is not None:
+            if limit < 1:
+                raise ValueError('limit doit être positif')
+            if max_limit is not None:
+                limit = min(limit, max_limit)
+        return cls(event_type=args.get('type') or None,
+                   user_id=args.get('user_id') or None,
+                   room_id=args.get('room_id') or None,
+                   since=args.get('since'),
+                   until=args.get('until'),
+                   before=int(before) if before else None,
+                   after=int(after) if after else None,
+                   limit=limit)
+
+    def with_bounds(self, before: Optional[int], limit: Optional[int]) -> 'LogQuery':
+        """Même filtre avec un autre curseur et une autre limite"""
+        query = LogQuery(self.event_type, self.user_id, self.room_id, before=before,
+                         after=self.after, limit=limit)
+        query.since = self.since
+        query.until = self.until
+        return query
+
+    def matches(self, log_entry: Dict[str, Any]) -> bool:
+        """Vérifier les critères d'égalité (le curseur et les dates sont traités par l'appelant)"""
+        return ((self.event_type is None or log_entry['event_type'] == self.event_type)
+                and (self.user_id is None or log_entry['user_id'] == self.user_id)
+                and (self.room_id is None or log_entry['room_id'] == self.room_id))
+
+    def needles(self) -> List[bytes]:
+        """Fragments présents dans toute ligne JSONL correspondante (pré-filtre sans décodage)"""
+        return [f'"{field}": {json.dumps(value, ensure_ascii=False)}'.encode()
+                for field, value in (('event_type', self.event_type), ('user_id', self.user_id),
+                                     ('room_id', self.room_id))
+                if value is not None]
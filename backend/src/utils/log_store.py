@@ -0,0 +1,296 @@
+import bisect
+import json
+import mmap
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.log_query import LogQuery
+
+# Répertoire des segments de logs sur disque (vide = logs en mémoire uniquement)
+DEFAULT_DIR = os.environ.get('VOCALINE_LOG_DIR', '')
+# Rotation : nouveau segment au-delà de cette taille (octets) ou de cet âge (secondes)
+SEGMENT_BYTES = int(os.environ.get('VOCALINE_LOG_SEGMENT_BYTES', str(16 * 2 ** 20)))
+SEGMENT_SECONDS = int(os.environ.get('VOCALINE_LOG_SEGMENT_SECONDS', '3600'))
+# Rétention : segments plus anciens que N jours, ou au-delà d'un volume total, supprimés
+RETENTION_DAYS = float(os.environ.get('VOCALINE_LOG_RETENTION_DAYS', '7'))
+RETENTION_BYTES = int(os.environ.get('VOCALINE_LOG_RETENTION_BYTES', str(2 ** 30)))
+# Index d'un segment : position d'une ligne sur INDEX_EVERY
+INDEX_EVERY = 128
+# Nombre maximal de lignes examinées par une recherche dans l'historique
+MAX_SCAN = 50000
+# Délai maximal (s) entre l'ajout d'un log et l'écriture du tampon du segment courant vers le fichier
+FLUSH_SECONDS = 1.0
+
+SEGMENT_SUFFIX = '.jsonl'
+
+
+def _line_seq(line: bytes) -> int:
+    """Numéro de séquence d'une ligne : chaque ligne commence par {"seq": N,"""
+    return int(line[8:line.index(b',', 8)])
+
+
+def _line_timestamp(line: bytes) -> bytes:
+    """Horodatage d'une ligne, qui suit directement le seq : {"seq": N, "timestamp": "..."""
+    start = line.index(b'"timestamp": "') + 14
+    return line[start:line.index(b'"', start)]
+
+
+class _Segment:
+    """Un fichier de logs JSONL et son index creux [(seq, position)]"""
+
+    __slots__ = ('path', 'first_seq', 'last_seq', 'size', 'lines', 'created', 'index')
+
+    def __init__(self, path: str, first_seq: int):
+        self.path = path
+        self.first_seq = first_seq
+        self.last_seq = first_seq - 1
+        self.size = 0
+        self.lines = 0
+        self.created = time.time()
+        self.index: List[tuple] = []
+
+    def load(self):
+        """Construire l'index et relever le dernier seq d'un segment existant (une lecture via mmap)"""
+        self.size = os.path.getsize(self.path)
+        self.index = []
+        if not self.size:
+            return
+        with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            while position < self.size:
+                end = data.find(b'\n', position)
+                if end < 0:
+                    break  # Dernière ligne incomplète (arrêt brutal) : ignorée
+                try:
+                    seq = _line_seq(data[position:end])
+                except ValueError:
+                    position = end + 1
+                    continue
+                self.add(seq, position)
+                position = end + 1
+
+    def add(self, seq: int, position: int):
+        """Enregistrer une ligne écrite à `position` (indexée une fois sur INDEX_EVERY)"""
+        if self.lines % INDEX_EVERY == 0:
+            self.index.append((seq, position))
+        self.lines += 1
+        self.last_seq = seq
+
+    def offset_before(self, seq: int, data) -> int:
+        """Position de la première ligne de seq >= `seq` (fin du fichier si aucune)"""
+        position = bisect.bisect_left(self.index, (seq,)) - 1
+        position = self.index[position][1] if position >= 0 else 0
+        while position < len(data):
+            end = data.find(b'\n', position)
+            if end < 0:
+                break
+            try:
+                if _line_seq(data[position:end]) >= seq:
+                    return position
+            except ValueError:
+                pass
+            position = end + 1
+        return position
+
+
+class SegmentedLogStore:
+    """Logs persistés dans des segments JSONL en ajout seul, avec rotation et rétention
+
+    Chaque segment porte le seq de son premier log dans son nom. Le segment
+    courant est écrit via un tampon, vidé au plus FLUSH_SECONDS après un ajout
+    (par un minuteur si aucun ajout ne suit) et à chaque lecture ; un nouveau segment est ouvert au-delà de SEGMENT_BYTES ou
+    de SEGMENT_SECONDS, et les segments fermés sortent de la rétention par âge
+    ou par volume total.
+
+    Les lectures passent par mmap : l'index creux d'un segment (une position
+    toutes les INDEX_EVERY lignes) mène à la ligne cherchée, puis les lignes
+    sont lues à reculons depuis cette position. La mémoire utilisée ne dépend
+    que du nombre de segments, pas du volume d'historique.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES,
+                 segment_seconds: float = SEGMENT_SECONDS, retention_days: float = RETENTION_DAYS,
+                 retention_bytes: int = RETENTION_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_days * 86400
+        self.retention_bytes = retention_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._active: Optional[_Segment] = None
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+        os.makedirs(directory, exist_ok=True)
+        self._segments: List[_Segment] = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                segment = _Segment(os.path.join(directory, name), int(name[:-len(SEGMENT_SUFFIX)]))
+                segment.load()
+                self._segments.append(segment)
+        self.last_seq = max((segment.last_seq for segment in self._segments), default=0)
+
+    def append(self, entries: List[Dict[str, Any]]):
+        """Écrire des logs déjà numérotés, dans l'ordre de leur seq"""
+        with self._lock:
+            for log_entry in entries:
+                if self._active is None or self._rotation_due():
+                    self._rotate(log_entry['seq'])
+                line = (json.dumps(log_entry, ensure_ascii=False, default=str) + '\n').encode()
+                segment = self._active
+                segment.add(log_entry['seq'], segment.size)
+                self._file.write(line)
+                segment.size += len(line)
+                self.last_seq = log_entry['seq']
+            now = time.monotonic()
+            if now - self._last_flush >= FLUSH_SECONDS:
+                self._file.flush()
+                self._last_flush = now
+            elif self._timer is None:
+                # Serveur inactif : le tampon est tout de même écrit dans le délai
+                self._timer = threading.Timer(FLUSH_SECONDS - (now - self._last_flush), self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_due(self):
+        with self._lock:
+            self._timer = None
+            if self._file is not None:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def _rotation_due(self) -> bool:
+        return (self._active.size >= self.segment_bytes
+                or time.time() - self._active.created >= self.segment_seconds)
+
+    def _rotate(self, first_seq: int):
+        """Fermer le segment courant, en ouvrir un nouveau et appliquer la rétention, verrou pris"""
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f'{first_seq:016d}{SEGMENT_SUFFIX}')
+        if self._segments and self._segments[-1].path == path:
+            self._segments.pop()  # Segment vide laissé par un arrêt précédent : réutilisé
+        self._file = open(path, 'ab', buffering=256 * 1024)
+        self._active = _Segment(path, first_seq)
+        self._segments.append(self._active)
+        self._apply_retention()
+
+    def _apply_retention(self):
+        expired_before = time.time() - self.retention_seconds
+        total = sum(segment.size for segment in self._segments)
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            try:
+                last_write = os.path.getmtime(oldest.path)
+            except OSError:
+                last_write = 0
+            if last_write >= expired_before and total <= self.retention_bytes:
+                break
+            total -= oldest.size
+            self._segments.pop(0)
+            try:
+                os.remove(oldest.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Supprimer tous les segments ; le prochain log ouvre un nouveau segment"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._active = None
+            for segment in self._segments:
+                try:
+                    os.remove(segment.path)
+                except OSError:
+                    pass
+            self._segments = []
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._active = None
+
+    def read(self, query: LogQuery, max_scan: int = MAX_SCAN) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Logs correspondant à `query`, du plus récent au plus ancien, et curseur de la suite
+
+        Au plus `max_scan` lignes sont examinées : si la limite est atteinte
+        avant `query.limit` logs, le curseur retourné permet de reprendre plus
+        loin. Le curseur vaut None quand l'historique est épuisé.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            segments = list(self._segments)
+        needles = query.needles()
+        since = query.since.encode() if query.since else None
+        until = query.until.encode() if query.until else None
+        results = []
+        scanned = 0
+        for segment in reversed(segments):
+            if query.before is not None and segment.first_seq >= query.before:
+                continue
+            if query.after is not None and segment.last_seq <= query.after:
+                return results, None
+            for line in self._lines_before(segment, query.before):
+                scanned += 1
+                if query.after is not None and _line_seq(line) <= query.after:
+                    return results, None
+                if since or until:
+                    timestamp = _line_timestamp(line)
+                    if since and timestamp < since:
+                        return results, None
+                    if until and timestamp > until:
+                        continue
+                if all(needle in line for needle in needles):
+                    try:
+                        log_entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if query.matches(log_entry):
+                        results.append(log_entry)
+                        if query.limit is not None and len(results) >= query.limit:
+                            return results, log_entry['seq']
+                if scanned >= max_scan:
+                    return results, _line_seq(line)
+        return results, None
+
+    def _lines_before(self, segment: _Segment, before_seq: Optional[int]) -> Iterator[bytes]:
+        """Lignes complètes d'un segment de seq < `before_seq`, de la plus récente à la plus ancienne"""
+        try:
+            file = open(segment.path, 'rb')
+        except FileNotFoundError:
+            return  # Supprimé par la rétention entre-temps
+        with file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = len(data) if before_seq is None else segment.offset_before(before_seq, data)
+                # Ignorer une éventuelle dernière ligne incomplète
+                if before_seq is None and not data[end - 1:end] == b'\n':
+                    end = data.rfind(b'\n', 0, end) + 1
+                while end > 0:
+                    start = data.rfind(b'\n', 0, end - 1) + 1
+                    yield data[start:end - 1]
+                    end = start
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'segments': len(self._segments),
+                'bytes': sum(segment.size for segment in self._segments),
+                'first_seq': self._segments[0].first_seq if self._segments else None,
+                'last_seq': self.last_seq
+            }
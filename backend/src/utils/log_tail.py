@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+from src.utils.log_query import LogQuery
+
+# Intervalle (ms) entre deux envois de nouveaux logs aux pages /logs ouvertes
+TAIL_INTERVAL_MS = int(os.environ.get('VOCALINE_LOG_TAIL_MS', '1000'))
+# Nombre maximal de logs par envoi (au-delà, seuls les plus récents sont envoyés)
+TAIL_BATCH_MAX = 500
+# Commentaire SSE envoyé sans nouveaux logs, pour détecter les connexions fermées
+HEARTBEAT_SECONDS = 15
+
+
+class LogTail:
+    """Diffusion des nouveaux logs en Server-Sent Events
+
+    Un seul lecteur par intervalle interroge le logger (delta depuis le
+    dernier envoi) ; le lot et sa sérialisation, par filtre de type, sont
+    partagés par tous les flux à jour. Le coût ne dépend que du débit de
+    nouveaux logs, pas de la taille du tampon ni du nombre de pages ouvertes.
+    Un flux en retard (reconnexion, Last-Event-ID ancien) fait sa propre
+    requête delta.
+    """
+
+    def __init__(self, logger, interval_ms: int = TAIL_INTERVAL_MS, batch_max: int = TAIL_BATCH_MAX):
+        self.logger = logger
+        self.interval = interval_ms / 1000
+        self.batch_max = batch_max
+        self._lock = threading.Lock()
+        self._polled = 0.0
+        # Dernier lot : logs de seq dans ]start, end], du plus ancien au plus récent
+        self._start = self._end = logger.last_seq
+        self._logs = []
+        self._events: Dict[Optional[str], bytes] = {}
+
+    def _poll(self):
+        """Lire les nouveaux logs si l'intervalle est écoulé, verrou pris"""
+        now = time.monotonic()
+        if now - self._polled < self.interval:
+            return
+        self._polled = now
+        head = self.logger.last_seq
+        if head == self._end:
+            return
+        # Borné à head : un log stocké pendant la requête partira avec le lot suivant
+        logs, _ = self.logger.query(LogQuery(before=head + 1, after=self._end, limit=self.batch_max))
+        self._start, self._end, self._logs = self._end, head, logs
+        self._events = {}
+
+    def _event(self, event_type: Optional[str]) -> bytes:
+        """Événement SSE du dernier lot pour un filtre de type, sérialisé une fois, verrou pris"""
+        event = self._events.get(event_type)
+        if event is None:
+            logs = self._logs if event_type is None else \
+                [log for log in self._logs if log['event_type'] == event_type]
+            event = self._events[event_type] = format_event(
+                self._end, logs, len(self._logs) >= self.batch_max)
+        return event
+
+    def _delta(self, after: int, end: int, event_type: Optional[str]) -> bytes:
+        """Événement SSE propre à un flux décalé : logs de seq dans ]after, end]"""
+        logs, next_before = self.logger.query(
+            LogQuery(event_type, before=end + 1, after=after, limit=self.batch_max))
+        return format_event(end, logs, next_before is not None)
+
+    def stream(self, after: int, event_type: str = None) -> Iterator[bytes]:
+        """Flux SSE des logs de seq > `after` (filtrés par type), indéfiniment
+
+        Un flux décalé rattrape jusqu'à la fin du dernier lot partagé, puis
+        suit les lots suivants.
+        """
+        last = after
+        idle = 0.0
+        yield b'retry: 3000\n\n'
+        while True:
+            with self._lock:
+                self._poll()
+                start, end = self._start, self._end
+                event = self._event(event_type) if last == start and end > last else None
+            if event is None and end > last:
+                event = self._delta(last, end, event_type)
+            if event is not None:
+                last = end
+                idle = 0.0
+                yield event
+            elif idle >= HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield b': ping\n\n'
+            time.sleep(self.interval)
+            idle += self.interval
+
+
+def format_event(last_seq: int, logs, truncated: bool) -> bytes:
+    """Événement SSE `logs` ; son id (dernier seq) sert de Last-Event-ID à la reconnexion"""
+    data = json.dumps({'logs': logs, 'last_seq': last_seq, 'truncated': truncated},
+                      ensure_ascii=False, default=str)
+    return f'id: {last_seq}\nevent: logs\ndata: {data}\n\n'.encode()
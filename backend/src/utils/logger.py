@@ -1,68 +1,637 @@
+import atexit
+import bisect
+import heapq
+import itertools
 import json
+import os
+import queue
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import threading
 
-class VocalineLogger:
+from src.utils.log_policy import LogPolicy, load_default_policies, parse_policy
+from src.utils.log_query import LogQuery
+from src.utils.log_store import DEFAULT_DIR, SegmentedLogStore
+
+# Mémoire (octets, estimés) des logs du tampon partagé : au-delà, les plus anciens sont évincés
+DEFAULT_MEMORY_BYTES = int(os.environ.get('VOCALINE_LOG_MEMORY_BYTES', str(8 * 2 ** 20)))
+# Nombre maximal de logs du tampon partagé, en plus du budget en octets (0 = pas de limite)
+DEFAULT_CAPACITY = int(os.environ.get('VOCALINE_LOG_CAPACITY', '0'))
+# 1 : les handlers déposent les logs bruts dans une file, un thread les met en forme et les stocke
+DEFAULT_ASYNC = os.environ.get('VOCALINE_LOG_ASYNC', '0') == '1'
+# Nombre maximal de logs mis en forme et stockés sous une même prise de verrou
+ASYNC_BATCH = 256
+# Taille maximale (octets, en JSON) des données d'un log ; au-delà seul un aperçu est gardé
+DATA_MAX_BYTES = int(os.environ.get('VOCALINE_LOG_DATA_MAX', '4096'))
+# Nombre d'identifiants gardés dans un résumé de liste (summarize_ids)
+SUMMARY_IDS = 10
+
+# Estimation de la mémoire d'un log : dict et champs fixes (horodatage, seq, références
+# des index), plus chaque chaîne, plus les données (objets Python ~4 fois leur JSON)
+ENTRY_BYTES = 560
+STR_BYTES = 49
+DICT_BYTES = 64
+ITEM_BYTES = 100
+JSON_FACTOR = 4
+
+
+class Lazy:
+    """Données de log calculées seulement si le log est conservé
+
+    Passé comme `data` ou comme valeur d'un champ de `data`, l'appel
+    `func(*args)` n'a lieu qu'au stockage du log : un log écarté par sa
+    politique ne coûte rien, et en mode asynchrone le calcul se fait dans le
+    thread de fond. La valeur reflète l'état au moment du stockage.
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __call__(self):
+        return self.func(*self.args)
+
+
+def summarize_ids(count: int, ids) -> Dict[str, Any]:
+    """Résumé de taille bornée d'une liste d'identifiants : effectif et premiers éléments"""
+    return {'count': count, 'first': list(ids[:SUMMARY_IDS])}
+
+
+def _flat_size(data: Dict[str, Any]) -> Optional[int]:
+    """Mémoire estimée de données (scalaires et chaînes courtes) tenant sûrement dans DATA_MAX_BYTES
+
+    None si les données sont imbriquées ou trop grandes : évite la
+    sérialisation JSON pour le cas courant de quelques champs simples.
+    """
+    budget = DATA_MAX_BYTES // 4  # Un caractère fait au plus 4 octets en UTF-8
+    size = DICT_BYTES
+    for key, value in data.items():
+        if isinstance(value, str):
+            budget -= len(value) + len(key) + 8
+            size += ITEM_BYTES + len(value)
+        elif value is None or isinstance(value, (bool, int, float)):
+            budget -= len(key) + 32
+            size += ITEM_BYTES
+        else:
+            return None
+        if budget < 0:
+            return None
+    return size
+
+
+def _materialize(data) -> Tuple[Dict[str, Any], int]:
+    """Évaluer les données paresseuses, borner leur taille sérialisée et estimer leur mémoire"""
+    try:
+        if isinstance(data, Lazy):
+            data = data()
+        if not data:
+            return {}, DICT_BYTES
+        if any(isinstance(value, Lazy) for value in data.values()):
+            data = {key: value() if isinstance(value, Lazy) else value
+                    for key, value in data.items()}
+    except Exception as e:
+        return {'data_error': str(e)}, DICT_BYTES + ITEM_BYTES
+    size = _flat_size(data)
+    if size is not None:
+        return data, size
+    encoded = json.dumps(data, default=str, ensure_ascii=False)
+    if len(encoded) <= DATA_MAX_BYTES // 4 or len(encoded.encode()) <= DATA_MAX_BYTES:
+        return data, DICT_BYTES + JSON_FACTOR * len(encoded)
+    encoded = encoded.encode()
+    preview = encoded[:DATA_MAX_BYTES].decode(errors='ignore')
+    return ({'truncated': True, 'bytes': len(encoded), 'preview': preview},
+            DICT_BYTES + 3 * ITEM_BYTES + len(preview))
+
+
+def _seq(log_entry: Dict[str, Any]) -> int:
+    return log_entry['seq']
+
+
+class _Index:
+    """Logs d'une même clé (type, sid ou room) par ordre d'ajout
+
+    Liste avec un début mobile : ajout en fin et retrait du plus ancien en
+    O(1) amorti, accès par position en O(1) (recherche dichotomique sur seq).
+    """
+
+    __slots__ = ('items', 'head')
+
     def __init__(self):
-        self.logs: List[Dict[str, Any]] = []
+        self.items: List[Dict[str, Any]] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.items) - self.head
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        return self.items[self.head + position]
+
+    def append(self, log_entry: Dict[str, Any]):
+        self.items.append(log_entry)
+
+    def popleft(self):
+        self.items[self.head] = None
+        self.head += 1
+        if self.head >= 64 and self.head * 2 >= len(self.items):
+            del self.items[:self.head]
+            self.head = 0
+
+
+class _Ring:
+    """Tampon FIFO borné en mémoire (octets estimés) et optionnellement en nombre de logs
+
+    L'ajout est en O(1) amorti : les logs les plus anciens sont évincés
+    jusqu'à repasser sous les bornes (un seul en général, plusieurs si le
+    nouveau log est volumineux). Les index par type, par sid et par room sont
+    tenus à l'ajout et à l'éviction. Dans un tampon, l'éviction suit l'ordre
+    d'ajout : le log évincé est toujours le plus ancien de chacun de ses index.
+    """
+
+    __slots__ = ('budget', 'capacity', 'logs', 'sizes', 'bytes', 'evicted',
+                 'by_type', 'by_user', 'by_room')
+
+    def __init__(self, budget: Optional[int], capacity: int = 0):
+        self.budget = budget  # None = pas de limite en octets
+        self.capacity = capacity  # 0 = pas de limite en nombre
+        self.logs = deque()
+        self.sizes = deque()  # Mémoire estimée de chaque log, dans l'ordre de self.logs
+        self.bytes = 0
+        self.evicted = 0  # Nombre de logs évincés depuis la création
+        self.by_type: Dict[str, _Index] = {}
+        self.by_user: Dict[str, _Index] = {}
+        self.by_room: Dict[str, _Index] = {}
+
+    def __len__(self) -> int:
+        return len(self.logs)
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        """Le log de rang `position`, du plus ancien (0) au plus récent"""
+        return self.logs[position]
+
+    def append(self, log_entry: Dict[str, Any], size: int):
+        """Ajouter un log de mémoire estimée `size`, retourne les logs évincés"""
+        self.logs.append(log_entry)
+        self.sizes.append(size)
+        self.bytes += size
+        self._index(self.by_type, log_entry['event_type'], log_entry)
+        if log_entry['user_id'] is not None:
+            self._index(self.by_user, log_entry['user_id'], log_entry)
+        if log_entry['room_id'] is not None:
+            self._index(self.by_room, log_entry['room_id'], log_entry)
+        budget = self.budget if self.budget is not None else float('inf')
+        capacity = self.capacity or float('inf')
+        logs = self.logs
+        if self.bytes <= budget and len(logs) <= capacity:
+            return ()
+        evicted = []
+        # Le log ajouté est toujours conservé, même s'il dépasse à lui seul le budget
+        while len(logs) > 1 and (self.bytes > budget or len(logs) > capacity):
+            oldest = logs.popleft()
+            self.bytes -= self.sizes.popleft()
+            self.evicted += 1
+            self._unindex(self.by_type, oldest['event_type'])
+            if oldest['user_id'] is not None:
+                self._unindex(self.by_user, oldest['user_id'])
+            if oldest['room_id'] is not None:
+                self._unindex(self.by_room, oldest['room_id'])
+            evicted.append(oldest)
+        return evicted
+
+    @staticmethod
+    def _index(index: Dict[str, _Index], key: str, log_entry: Dict[str, Any]):
+        entries = index.get(key)
+        if entries is None:
+            entries = index[key] = _Index()
+        entries.append(log_entry)
+
+    @staticmethod
+    def _unindex(index: Dict[str, _Index], key: str):
+        entries = index[key]
+        entries.popleft()
+        if entries.head == len(entries.items):
+            del index[key]
+
+    def entries(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Logs du plus ancien au plus récent (les `limit` derniers)"""
+        count = len(self) if not limit else min(limit, len(self))
+        return list(itertools.islice(reversed(self.logs), count))[::-1]
+
+    def sized_entries(self) -> List[Tuple[Dict[str, Any], int]]:
+        """Logs du plus ancien au plus récent, avec leur mémoire estimée"""
+        return list(zip(self.entries(), self.sizes))
+
+    def oldest(self):
+        return self.logs[0] if self.logs else None
+
+    def newest(self):
+        return self.logs[-1] if self.logs else None
+
+    def search(self, query: LogQuery, floor: int = 0) -> List[Dict[str, Any]]:
+        """Logs correspondant à `query` et de seq >= `floor`, du plus récent au plus ancien
+
+        Le parcours part de l'index le plus court parmi les critères donnés et
+        du curseur (recherche dichotomique), puis remonte le temps jusqu'à
+        `query.limit` résultats ou la borne `since`.
+        """
+        candidates = self
+        for index, key in ((self.by_type, query.event_type), (self.by_user, query.user_id),
+                           (self.by_room, query.room_id)):
+            if key is not None:
+                entries = index.get(key)
+                if entries is None:
+                    return []
+                if len(entries) < len(candidates):
+                    candidates = entries
+        end = len(candidates)
+        if query.before is not None:
+            end = bisect.bisect_left(candidates, query.before, key=_seq)
+        results = []
+        for position in range(end - 1, -1, -1):
+            log_entry = candidates[position]
+            if log_entry['seq'] < floor:
+                break
+            if query.after is not None and log_entry['seq'] <= query.after:
+                break
+            if query.until is not None and log_entry['timestamp'] > query.until:
+                continue
+            if query.since is not None and log_entry['timestamp'] < query.since:
+                break
+            if query.matches(log_entry):
+                results.append(log_entry)
+                if query.limit is not None and len(results) >= query.limit:
+                    break
+        return results
+
+
+class VocalineLogger:
+    """Logs en mémoire dans un tampon FIFO borné en octets
+
+    La mémoire de chaque log est estimée à l'ajout (champs, message, données) ;
+    au-delà du budget (`memory_bytes`), les logs les plus anciens sont évincés.
+    L'ajout est en O(1) amorti quel que soit le nombre de logs. Les compteurs
+    par type d'événement sont mis à jour à l'ajout et à l'éviction, get_stats
+    ne parcourt donc pas les logs.
+
+    En mode asynchrone, log() se contente de déposer un tuple brut (horodatage
+    monotone, type, identifiants, modèle de message, arguments, données) dans
+    une file ; un thread de fond met en forme les logs et les stocke par lots.
+    Le coût d'un log dans un handler ne dépend alors ni du volume de logs ni
+    de la contention sur le verrou.
+
+    Chaque type d'événement peut avoir une politique (LogPolicy) :
+    échantillonnage et limite de débit sont appliqués dès l'entrée de log(),
+    avant toute mise en forme ; une capacité réservée donne au type son propre
+    tampon, que les types bavards ne peuvent pas évincer. Chaque log stocké
+    reçoit un numéro de séquence (`seq`) qui ordonne les logs des différents
+    tampons. Un quota (octets) donne aussi au type son propre tampon, borné
+    en mémoire : les données volumineuses d'un type (MOBILE_DEBUG) n'évincent
+    que des logs de ce type. La mémoire totale est bornée par le budget du
+    tampon partagé plus les quotas.
+
+    Chaque tampon indexe ses logs par type, par sid et par room : query()
+    filtre et pagine sans parcourir les logs qui ne correspondent pas.
+
+    Avec un SegmentedLogStore, chaque log conservé est aussi écrit sur disque :
+    la mémoire ne garde que les logs récents, query() poursuit dans
+    l'historique (et la numérotation reprend après un redémarrage).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, asynchronous: bool = DEFAULT_ASYNC,
+                 policies: Dict[str, LogPolicy] = None, store: SegmentedLogStore = None,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.capacity = max(0, capacity)
+        self.memory_bytes = memory_bytes
+        self._shared = _Ring(self.memory_bytes, self.capacity)
+        self._reserved: Dict[str, _Ring] = {}
+        self.store = store
+        self._seq = store.last_seq if store else 0
+        # Les logs de seq >= _floor n'ayant pas été évincés sont tous en mémoire
+        self._floor = self._seq + 1
+        # Logs de seq < _cleared_below effacés par clear_logs, y compris sur disque
+        self._cleared_below = 0
+        # Incrémenté quand des logs disparaissent autrement que par éviction (clear_logs, set_policy)
+        self.generation = 0
+        self._event_counts: Dict[str, int] = {}
         self.lock = threading.Lock()
-    
-    def log(self, event_type: str, user_id: str = None, room_id: str = None, 
-            message: str = "", data: Dict = None):
-        """Ajouter un log avec timestamp et informations contextuelles"""
+        # Conversion des horodatages monotones en date : une seule lecture de l'horloge murale
+        self._wall_anchor = time.time()
+        self._monotonic_anchor = time.monotonic()
+        self.asynchronous = asynchronous
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._policies: Dict[str, LogPolicy] = {}
+        self._observers: Dict[str, List[Callable]] = {}
+        self.observer_errors = 0
+        for event_type, policy in (load_default_policies() if policies is None else policies).items():
+            self.set_policy(event_type, policy)
+        if store is not None:
+            atexit.register(self.close)
+
+    def log(self, event_type: str, user_id: str = None, room_id: str = None,
+            message: str = "", data: Dict = None, args: Tuple = None):
+        """Ajouter un log avec timestamp et informations contextuelles
+
+        `message` peut être un modèle (`'Offre envoyée par %s'`) complété par
+        `args` : la mise en forme n'a lieu qu'au stockage, hors du handler en
+        mode asynchrone. `data` (ou chacun de ses champs) peut être un Lazy,
+        évalué au même moment ; il est ensuite borné à DATA_MAX_BYTES.
+        """
+        now = time.monotonic()
+        observers = self._observers.get(event_type)
+        if observers is not None:
+            for observer in observers:
+                try:
+                    observer(now, event_type, user_id, room_id, data)
+                except Exception:
+                    # Un observateur en erreur ne doit pas faire échouer le handler qui logge
+                    self.observer_errors += 1
+        policy = self._policies.get(event_type)
+        if policy is not None and not policy.admit():
+            return
+        raw = (now, event_type, user_id, room_id, message, args, data)
+        if self.asynchronous:
+            if self._worker is None:
+                self._start_worker()
+            self._queue.put(raw)
+            return
+        log_entry, size = self._format_safe(raw)
         with self.lock:
-            log_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'event_type': event_type,
-                'user_id': user_id,
-                'room_id': room_id,
-                'message': message,
-                'data': data or {}
-            }
-            self.logs.append(log_entry)
-            
-            # Garder seulement les 1000 derniers logs pour éviter la surcharge mémoire
-            if len(self.logs) > 1000:
-                self.logs = self.logs[-1000:]
-    
+            self._store(log_entry, size)
+            if self.store is not None:
+                # Sous le verrou : les lignes du segment restent dans l'ordre des seq
+                self.store.append((log_entry,))
+
+    def observe(self, event_types, observer: Callable):
+        """Appeler `observer(monotonic, event_type, user_id, room_id, data)` à chaque log de ces types
+
+        L'appel a lieu dans log(), avant échantillonnage et limite de débit :
+        l'observateur voit tous les événements, y compris ceux non conservés.
+        Une exception de l'observateur est ignorée (comptée dans get_stats).
+        `data` est tel que passé à log() (éventuellement un Lazy).
+        """
+        for event_type in event_types:
+            self._observers.setdefault(event_type, []).append(observer)
+
+    def _format_safe(self, raw) -> Tuple[Dict[str, Any], int]:
+        """Comme _format, mais un log illisible (modèle et arguments incompatibles,
+        Lazy en erreur) devient un log ERROR au lieu de lever une exception"""
+        try:
+            return self._format(raw)
+        except Exception as e:
+            return self._format((raw[0], 'ERROR', raw[2], raw[3],
+                                 f'Log {raw[1]} illisible: {str(e)}', None,
+                                 {'template': str(raw[4])}))
+
+    def _format(self, raw) -> Tuple[Dict[str, Any], int]:
+        """Mettre en forme un log brut, retourne le log et sa mémoire estimée"""
+        monotonic, event_type, user_id, room_id, message, args, data = raw
+        if args:
+            message = message % args
+        timestamp = datetime.fromtimestamp(self._wall_anchor + monotonic - self._monotonic_anchor)
+        data, size = _materialize(data)
+        size += ENTRY_BYTES + STR_BYTES + len(message)
+        if user_id is not None:
+            size += STR_BYTES + len(user_id)
+        if room_id is not None:
+            size += STR_BYTES + len(room_id)
+        return {
+            'seq': None,  # Attribué au stockage ; en tête pour les lignes des segments sur disque
+            'timestamp': timestamp.isoformat(),
+            'event_type': event_type,
+            'user_id': user_id,
+            'room_id': room_id,
+            'message': message,
+            'data': data
+        }, size
+
+    def _store(self, log_entry: Dict[str, Any], size: int):
+        """Insérer un log mis en forme dans le tampon de son type, verrou déjà pris"""
+        self._seq += 1
+        log_entry['seq'] = self._seq
+        event_type = log_entry['event_type']
+        for evicted in self._reserved.get(event_type, self._shared).append(log_entry, size):
+            self._decrement(evicted['event_type'])
+        self._event_counts[event_type] = self._event_counts.get(event_type, 0) + 1
+
+    def _start_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name='vocaline-logger',
+                                                daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < ASYNC_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = []
+            flushed = []
+            for raw in batch:
+                if isinstance(raw, threading.Event):
+                    flushed.append(raw)
+                    continue
+                entries.append(self._format_safe(raw))
+            with self.lock:
+                for log_entry, size in entries:
+                    self._store(log_entry, size)
+            if self.store is not None and entries:
+                # Le thread de fond est le seul à stocker : écriture hors du verrou
+                self.store.append([log_entry for log_entry, _ in entries])
+            for event in flushed:
+                event.set()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Attendre que les logs déjà déposés dans la file soient stockés (et écrits sur disque)"""
+        done = True
+        if self.asynchronous and self._worker is not None:
+            event = threading.Event()
+            self._queue.put(event)
+            done = event.wait(timeout)
+        if self.store is not None:
+            self.store.flush()
+        return done
+
+    def close(self):
+        """Écrire les logs en attente et fermer le segment courant (arrêt du processus)"""
+        self.flush(timeout=2)
+        if self.store is not None:
+            self.store.close()
+
+    def _decrement(self, event_type: str):
+        remaining = self._event_counts[event_type] - 1
+        if remaining:
+            self._event_counts[event_type] = remaining
+        else:
+            del self._event_counts[event_type]
+
+    def _rings(self) -> List[_Ring]:
+        return [self._shared, *self._reserved.values()]
+
+    def _size(self) -> int:
+        return sum(len(ring) for ring in self._rings())
+
+    def _entries(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Logs de tous les tampons, du plus ancien au plus récent (les `limit` derniers), verrou déjà pris"""
+        if not self._reserved:
+            return self._shared.entries(limit)
+        merged = list(heapq.merge(*(ring.entries(limit) for ring in self._rings()),
+                                  key=lambda log_entry: log_entry['seq']))
+        return merged[-limit:] if limit else merged
+
     def get_logs(self, limit: int = None) -> List[Dict[str, Any]]:
         """Récupérer les logs, optionnellement limités"""
         with self.lock:
-            if limit:
-                return self.logs[-limit:]
-            return self.logs.copy()
-    
+            return self._entries(limit)
+
+    @property
+    def last_seq(self) -> int:
+        """Seq du dernier log stocké (0 s'il n'y en a aucun)"""
+        return self._seq
+
+    def _memory_floor(self) -> int:
+        """Plus petit seq à partir duquel la mémoire contient tous les logs, verrou déjà pris"""
+        floor = self._floor
+        for ring in self._rings():
+            if ring.evicted:
+                floor = max(floor, ring.oldest()['seq'])
+        return floor
+
+    def query(self, query: LogQuery) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Logs correspondant à `query` (du plus ancien au plus récent) et curseur de la page précédente
+
+        La mémoire est interrogée d'abord par ses index ; si les logs sont
+        persistés, la recherche continue sur disque au-delà des logs encore en
+        mémoire. Le curseur (`before` de la requête suivante) vaut None quand
+        il n'y a plus rien à lire.
+        """
+        with self.lock:
+            floor = self._memory_floor() if self.store is not None else 0
+            cleared_below = self._cleared_below
+            found = []
+            for ring in self._rings():
+                found.extend(ring.search(query, floor))
+        found.sort(key=_seq, reverse=True)
+        if query.limit is not None and len(found) >= query.limit:
+            found = found[:query.limit]
+            return found[::-1], found[-1]['seq']
+        next_before = None
+        if self.store is not None and (query.after is None or query.after + 1 < floor):
+            before = floor if query.before is None else min(query.before, floor)
+            limit = None if query.limit is None else query.limit - len(found)
+            history = query.with_bounds(before, limit)
+            if cleared_below:
+                # Un log déposé avant clear_logs peut être écrit sur disque après
+                history.after = max(history.after or 0, cleared_below - 1)
+            older, next_before = self.store.read(history)
+            found.extend(older)
+        return found[::-1], next_before
+
     def get_logs_by_type(self, event_type: str) -> List[Dict[str, Any]]:
-        """Récupérer les logs filtrés par type d'événement"""
+        """Récupérer les logs en mémoire d'un type d'événement"""
         with self.lock:
-            return [log for log in self.logs if log['event_type'] == event_type]
-    
+            found = [log for ring in self._rings() for log in ring.search(LogQuery(event_type, limit=None))]
+        return sorted(found, key=_seq)
+
     def get_logs_by_user(self, user_id: str) -> List[Dict[str, Any]]:
-        """Récupérer les logs filtrés par utilisateur"""
+        """Récupérer les logs en mémoire d'un utilisateur"""
         with self.lock:
-            return [log for log in self.logs if log['user_id'] == user_id]
-    
+            found = [log for ring in self._rings()
+                     for log in ring.search(LogQuery(user_id=user_id, limit=None))]
+        return sorted(found, key=_seq)
+
     def clear_logs(self):
-        """Vider tous les logs"""
+        """Vider tous les logs, en mémoire et sur disque"""
+        with self.lock:
+            self._shared = _Ring(self.memory_bytes, self.capacity)
+            self._reserved = {event_type: _Ring(ring.budget, ring.capacity)
+                              for event_type, ring in self._reserved.items()}
+            self._event_counts.clear()
+            self._floor = self._seq + 1
+            self._cleared_below = self._floor
+            self.generation += 1
+            if self.store is not None:
+                self.store.clear()
+
+    def set_policy(self, event_type: str, policy: LogPolicy = None):
+        """Remplacer la politique d'un type d'événement (None : aucune règle)
+
+        Redimensionner la capacité réservée ou le quota garde les logs les plus
+        récents du type ; les retirer écarte les logs de son tampon.
+        """
         with self.lock:
-            self.logs.clear()
-    
+            ring = self._reserved.pop(event_type, None)
+            kept = ring.sized_entries() if ring is not None else []
+            if policy is not None and (policy.reserved > 0 or policy.quota > 0):
+                resized = _Ring(policy.quota or None, policy.reserved)
+                dropped = []
+                for log_entry, size in kept:
+                    dropped.extend(resized.append(log_entry, size))
+                self._reserved[event_type] = resized
+            else:
+                dropped = [log_entry for log_entry, _ in kept]
+            for log_entry in dropped:
+                self._decrement(log_entry['event_type'])
+            if dropped:
+                # Les logs écartés ne sont plus que sur disque
+                self._floor = max(self._floor, dropped[-1]['seq'] + 1)
+                self.generation += 1
+            if policy is None:
+                self._policies.pop(event_type, None)
+            else:
+                self._policies[event_type] = policy
+
+    def configure(self, configs: Dict[str, Any]) -> Dict[str, Any]:
+        """Appliquer des politiques décrites par des dicts ({type: {...}}, None retire la règle)
+
+        Toutes les politiques sont validées avant que la première soit appliquée.
+        """
+        policies = {event_type: None if config is None else parse_policy(config)
+                    for event_type, config in configs.items()}
+        for event_type, policy in policies.items():
+            self.set_policy(event_type, policy)
+        return self.get_policies()
+
+    def get_policies(self) -> Dict[str, Any]:
+        """Politiques en vigueur et compteurs de logs écartés, par type"""
+        return {event_type: policy.to_dict() for event_type, policy in sorted(self._policies.items())}
+
     def get_stats(self) -> Dict[str, Any]:
         """Obtenir des statistiques sur les logs"""
         with self.lock:
-            event_counts = {}
-            for log in self.logs:
-                event_type = log['event_type']
-                event_counts[event_type] = event_counts.get(event_type, 0) + 1
-            
-            return {
-                'total_logs': len(self.logs),
-                'event_counts': event_counts,
-                'oldest_log': self.logs[0]['timestamp'] if self.logs else None,
-                'newest_log': self.logs[-1]['timestamp'] if self.logs else None
+            ends = [(ring.oldest(), ring.newest()) for ring in self._rings() if len(ring)]
+            oldest = min((pair[0] for pair in ends), key=lambda log_entry: log_entry['seq'], default=None)
+            newest = max((pair[1] for pair in ends), key=lambda log_entry: log_entry['seq'], default=None)
+            stats = {
+                'total_logs': self._size(),
+                'event_counts': dict(self._event_counts),
+                'oldest_log': oldest['timestamp'] if oldest else None,
+                'newest_log': newest['timestamp'] if newest else None,
+                'capacity': self.capacity,
+                'memory': {'bytes': sum(ring.bytes for ring in self._rings()),
+                           'budget': self.memory_bytes,
+                           'shared_bytes': self._shared.bytes,
+                           'evicted': sum(ring.evicted for ring in self._rings())},
+                'reserved': {event_type: {'capacity': ring.capacity, 'quota': ring.budget,
+                                          'size': len(ring), 'bytes': ring.bytes}
+                             for event_type, ring in self._reserved.items()}
             }
+        if self.store is not None:
+            stats['store'] = self.store.get_stats()
+        stats['observer_errors'] = self.observer_errors
+        stats['dropped'] = {event_type: {'sampled_out': policy.sampled_out,
+                                         'rate_limited': policy.rate_limited}
+                            for event_type, policy in list(self._policies.items())
+                            if policy.sampled_out or policy.rate_limited}
+        return stats
 
 # Instance globale du logger
-vocaline_logger = VocalineLogger()
-
+vocaline_logger = VocalineLogger(store=SegmentedLogStore(DEFAULT_DIR) if DEFAULT_DIR else None)
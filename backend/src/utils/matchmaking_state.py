@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils.logger import vocaline_logger
+from src.utils.metrics import matchmaking_metrics
+from src.utils.waiting_pool import ShardedWaitingPool
+
+
+class Session:
+    """Session d'un utilisateur connecté
+
+    `partner` contient directement le socket_id du partenaire de la room :
+    un relais de signaling n'a besoin que d'une recherche par socket_id.
+    Les __slots__ évitent un dict par session (empreinte mémoire réduite).
+    `ice_batching` indique que le client accepte les candidats ICE groupés
+    (événement webrtc_ice_candidates).
+    """
+
+    __slots__ = ('user_id', 'username', 'room', 'partner', 'waiting', 'ice_batching')
+
+    def __init__(self, user_id: str, username: str, room: str = None,
+                 partner: str = None, waiting: bool = False, ice_batching: bool = False):
+        self.user_id = user_id
+        self.username = username
+        self.room = room
+        self.partner = partner
+        self.waiting = waiting
+        self.ice_batching = ice_batching
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'room': self.room,
+            'partner': self.partner,
+            'waiting': self.waiting,
+            'ice_batching': self.ice_batching
+        }
+
+
+class MatchmakingState:
+    """État du matchmaking (sessions, file d'attente, rooms) partagé entre handlers
+
+    Toutes les transitions passent par cette classe et sont sérialisées par des
+    verrous répartis : un verrou par groupe de sessions, un par groupe de rooms
+    et un par partition de la file d'attente. Deux handlers qui manipulent des
+    utilisateurs ou des rooms différents ne se bloquent donc pas.
+
+    Ordre d'acquisition (évite les interblocages) :
+    room -> sessions (index croissant) -> partition de file.
+    """
+
+    def __init__(self, pool_partitions: int = 8, lock_stripes: int = 64):
+        # {socket_id: Session}
+        self.connected_users: Dict[str, Session] = {}
+        self.waiting_users = ShardedWaitingPool(pool_partitions)
+        # {room_id: {'user1': socket_id, 'user2': socket_id}}
+        self.active_rooms: Dict[str, Dict[str, str]] = {}
+        self._session_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._room_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+    @contextmanager
+    def _locked_sessions(self, *socket_ids):
+        stripes = sorted({hash(socket_id) % len(self._session_locks) for socket_id in socket_ids})
+        for stripe in stripes:
+            self._session_locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._session_locks[stripe].release()
+
+    def _room_lock(self, room_id: str) -> threading.Lock:
+        return self._room_locks[hash(room_id) % len(self._room_locks)]
+
+    def _is_connected(self, socket_id: str) -> bool:
+        return socket_id in self.connected_users
+
+    def register(self, socket_id: str, user_id: str, username: str,
+                 ice_batching: bool = False) -> bool:
+        """Enregistrer un utilisateur ; retourne False s'il était déjà enregistré
+
+        Un utilisateur déjà enregistré conserve sa room et sa place en file.
+        """
+        with self._locked_sessions(socket_id):
+            session = self.connected_users.get(socket_id)
+            if session is not None:
+                session.user_id = user_id
+                session.username = username
+                session.ice_batching = ice_batching
+                return False
+            self.connected_users[socket_id] = Session(user_id, username,
+                                                      ice_batching=ice_batching)
+            return True
+
+    def unregister(self, socket_id: str) -> Optional[Session]:
+        """Retirer un utilisateur (sessions et file d'attente), retourne sa session"""
+        with self._locked_sessions(socket_id):
+            session = self.connected_users.pop(socket_id, None)
+            if session is not None:
+                self.waiting_users.discard(socket_id)
+            return session
+
+    def enqueue(self, socket_id: str) -> bool:
+        """Mettre en attente un utilisateur connecté, sans room et pas déjà en attente"""
+        with self._locked_sessions(socket_id):
+            session = self.connected_users.get(socket_id)
+            if session is None or session.room or session.waiting:
+                return False
+            session.waiting = True
+            self.waiting_users.add(socket_id, session.username)
+            return True
+
+    def pair(self, socket_id: str) -> Optional[Tuple[str, str]]:
+        """Apparier un utilisateur en attente avec le premier partenaire éligible
+
+        Retourne (room_id, partner_socket_id), ou None si aucun partenaire n'est
+        disponible ou si l'utilisateur a déjà été apparié par un autre handler.
+        """
+        session = self.connected_users.get(socket_id)
+        if session is None:
+            return None
+        cleaned_users = []
+        enqueued = {}
+        partner_socket_id = self.waiting_users.claim_partner(
+            socket_id, session.username, is_valid=self._is_connected, evicted=cleaned_users,
+            enqueued=enqueued)
+        self._log_cleanup(cleaned_users)
+        if partner_socket_id is None:
+            return None
+        room_id = self._open_room(socket_id, partner_socket_id, enqueued)
+        if room_id is None:
+            return None
+        return room_id, partner_socket_id
+
+    def pop_pair(self) -> Optional[Tuple[str, str, str]]:
+        """Apparier les deux plus anciens utilisateurs compatibles de la file
+
+        Retourne (room_id, initiator, receiver) : le plus récent des deux initie
+        l'appel WebRTC. None quand plus aucune paire n'est possible.
+        """
+        while True:
+            cleaned_users = []
+            enqueued = {}
+            pair = self.waiting_users.pop_pair(is_valid=self._is_connected, evicted=cleaned_users,
+                                               enqueued=enqueued)
+            self._log_cleanup(cleaned_users)
+            if pair is None:
+                return None
+            receiver, initiator = pair
+            room_id = self._open_room(initiator, receiver, enqueued)
+            if room_id is not None:
+                return room_id, initiator, receiver
+
+    def _open_room(self, initiator: str, receiver: str,
+                   enqueued: Dict[str, float]) -> Optional[str]:
+        """Créer la room de deux utilisateurs déjà retirés de la file
+
+        Si l'un d'eux s'est déconnecté entre-temps, l'autre est remis en file
+        avec sa date d'entrée d'origine. `enqueued` ({socket_id: enqueued_at})
+        sert à mesurer l'attente de chacun.
+        """
+        with self._locked_sessions(initiator, receiver):
+            sessions = {socket_id: self.connected_users.get(socket_id)
+                        for socket_id in (initiator, receiver)}
+            if None in sessions.values():
+                for socket_id, session in sessions.items():
+                    if session is not None:
+                        self.waiting_users.add(socket_id, session.username,
+                                               enqueued.get(socket_id))
+                return None
+
+            room_id = str(uuid.uuid4())
+            self.active_rooms[room_id] = {
+                'user1': initiator,
+                'user2': receiver
+            }
+            sessions[initiator].partner = receiver
+            sessions[receiver].partner = initiator
+            for session in sessions.values():
+                session.room = room_id
+                session.waiting = False
+        now = time.monotonic()
+        waits = [now - enqueued[socket_id] for socket_id in (initiator, receiver)
+                 if enqueued.get(socket_id) is not None]
+        matchmaking_metrics.record_match(*waits)
+        return room_id
+
+    def close_room(self, room_id: str) -> Optional[Dict[str, str]]:
+        """Fermer une room ; seul le premier appelant obtient ses données
+
+        Les sessions des deux membres sont détachées de la room. Retourne None si
+        la room a déjà été fermée par un autre handler.
+        """
+        with self._room_lock(room_id):
+            room_data = self.active_rooms.pop(room_id, None)
+            if room_data is None:
+                return None
+            for socket_id in (room_data['user1'], room_data['user2']):
+                with self._locked_sessions(socket_id):
+                    session = self.connected_users.get(socket_id)
+                    if session is not None and session.room == room_id:
+                        session.room = None
+                        session.partner = None
+            return room_data
+
+    @staticmethod
+    def partner_of(room_data: Dict[str, str], socket_id: str) -> Optional[str]:
+        if room_data['user1'] == socket_id:
+            return room_data['user2']
+        if room_data['user2'] == socket_id:
+            return room_data['user1']
+        return None
+
+    def _log_cleanup(self, cleaned_users):
+        if cleaned_users:
+            vocaline_logger.log('CLEANUP', None, None,
+                               f'Nettoyage de waiting_users: {len(cleaned_users)} utilisateurs déconnectés supprimés',
+                               {'removed_users': cleaned_users,
+                                'after_count': len(self.waiting_users)})
+
+
+def create_matchmaking_state(backend: str = None, **options):
+    """Créer l'état du matchmaking pour le backend demandé
+
+    `backend` (par défaut VOCALINE_STATE_BACKEND) vaut 'memory' pour l'état en
+    mémoire du processus, ou 'sqlite:///chemin/state.db' pour un état partagé
+    entre plusieurs workers. `options` est transmis à MatchmakingState.
+    """
+    backend = backend or os.environ.get('VOCALINE_STATE_BACKEND', 'memory')
+    if backend == 'memory':
+        return MatchmakingState(**options)
+    if backend.startswith('sqlite:///'):
+        from src.utils.sqlite_matchmaking_state import SQLiteMatchmakingState
+        return SQLiteMatchmakingState(backend[len('sqlite:///'):])
+    raise ValueError(f'Backend d\'état inconnu: {backend}')
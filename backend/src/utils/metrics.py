@@ -0,0 +1,213 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Sequence
+
+# Bornes (secondes) des histogrammes de temps d'attente : de 5 ms à 10 min
+WAIT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                30, 60, 120, 300, 600)
+# Bornes (secondes) des histogrammes de durée d'appel : de 1 s à 4 h
+CALL_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Histogramme à bornes fixes, au format Prometheus
+
+    `observe` est en O(1) (recherche dichotomique sur un nombre fixe de
+    bornes) : l'enregistrement peut rester actif en production. Les
+    percentiles sont estimés par interpolation dans les classes, comme
+    histogram_quantile() de Prometheus.
+    """
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = WAIT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> float:
+        """Estimation du percentile `q` (0 < q < 1) ; NaN sans observation"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return math.nan
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    # Au-delà de la dernière borne : seule la borne est connue
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} histogram']
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {_format_value(total_sum)}')
+        lines.append(f'{self.name}_count {total}')
+        return lines
+
+
+class Counter:
+    """Compteur cumulé, avec le débit moyen sur la dernière minute
+
+    Le débit est tenu dans 60 cases d'une seconde réutilisées en anneau :
+    `inc` reste en O(1).
+    """
+
+    WINDOW = 60
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._slot_seconds = [0] * self.WINDOW
+        self._slot_counts = [0] * self.WINDOW
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        second = int(time.monotonic())
+        slot = second % self.WINDOW
+        with self._lock:
+            self.value += amount
+            if self._slot_seconds[slot] != second:
+                self._slot_seconds[slot] = second
+                self._slot_counts[slot] = 0
+            self._slot_counts[slot] += amount
+
+    def rate(self) -> float:
+        """Moyenne par seconde sur les WINDOW dernières secondes"""
+        now = int(time.monotonic())
+        with self._lock:
+            recent = sum(count for second, count in zip(self._slot_seconds, self._slot_counts)
+                         if now - second < self.WINDOW)
+        return recent / self.WINDOW
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.description}',
+                f'# TYPE {self.name} counter',
+                f'{self.name} {self.value}']
+
+
+class Gauge:
+    """Valeur instantanée lue à la demande (ex : taille de la file d'attente)"""
+
+    def __init__(self, name: str, description: str, read: Callable[[], float],
+                 labels: Dict[str, str] = None):
+        self.name = name
+        self.description = description
+        self.read = read
+        self.labels = labels
+
+    def render(self) -> List[str]:
+        labels = ''
+        if self.labels:
+            labels = '{' + ','.join(f'{key}="{value}"' for key, value in self.labels.items()) + '}'
+        return [f'# HELP {self.name} {self.description}',
+                f'# TYPE {self.name} gauge',
+                f'{self.name}{labels} {_format_value(self.read())}']
+
+
+class QuantileGauge:
+    """Percentiles estimés d'un histogramme, exposés comme une jauge par percentile"""
+
+    def __init__(self, name: str, description: str, histogram: Histogram,
+                 quantiles: Sequence[float] = (0.5, 0.95, 0.99)):
+        self.name = name
+        self.description = description
+        self.histogram = histogram
+        self.quantiles = quantiles
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} gauge']
+        for q in self.quantiles:
+            value = self.histogram.quantile(q)
+            lines.append(f'{self.name}{{quantile="{q}"}} '
+                         f'{"NaN" if math.isnan(value) else _format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble de métriques rendues au format texte Prometheus (/metrics)"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics = [m for m in self._metrics if m.name != metric.name] + [metric]
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class MatchmakingMetrics:
+    """Métriques du matchmaking : attente en file et débit d'appariement"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.queue_wait = registry.register(Histogram(
+            'vocaline_queue_wait_seconds',
+            'Attente entre la mise en file (join_matchmaking ou remise en attente) et l\'appariement'))
+        registry.register(QuantileGauge(
+            'vocaline_queue_wait_quantile_seconds',
+            'Percentiles estimés de l\'attente en file', self.queue_wait))
+        self.pairs = registry.register(Counter(
+            'vocaline_pairs_total', 'Paires formées depuis le démarrage'))
+        registry.register(Gauge(
+            'vocaline_pairs_per_second', 'Paires formées par seconde (moyenne sur 60 s)',
+            self.pairs.rate))
+
+    def record_match(self, *waits: float):
+        """Enregistrer une paire formée et l'attente de chacun de ses membres"""
+        self.pairs.inc()
+        for wait in waits:
+            if wait is not None:
+                self.queue_wait.observe(max(wait, 0.0))
+
+
+# Instances globales
+metrics_registry = MetricsRegistry()
+matchmaking_metrics = MatchmakingMetrics(metrics_registry)
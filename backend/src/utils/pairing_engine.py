@@ -0,0 +1,53 @@
+import threading
+from typing import Callable
+
+from src.utils.logger import vocaline_logger
+
+
+class PairingEngine:
+    """Appariement par lots des utilisateurs en attente, à intervalle régulier
+
+    Les handlers Socket.IO se contentent de signaler qu'un appariement est
+    nécessaire (`request_pairing`) ; une tâche de fond appelle `pair_batch` au
+    plus une fois par tick, hors du chemin de latence du signaling.
+    `pair_batch(max_pairs)` retourne le nombre de paires formées.
+    """
+
+    def __init__(self, socketio, pair_batch: Callable[[int], int],
+                 tick_ms: int = 50, max_pairs: int = 500):
+        self.socketio = socketio
+        self.pair_batch = pair_batch
+        self.tick = tick_ms / 1000.0
+        self.max_pairs = max_pairs
+        self._pending = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Démarrer la tâche de fond (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio.start_background_task(self._run)
+
+    def request_pairing(self):
+        """Signaler que la file d'attente a changé ; l'appariement aura lieu au prochain tick"""
+        self._pending.set()
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.tick)
+            if not self._pending.is_set():
+                continue
+            self._pending.clear()
+            try:
+                pairs = self.pair_batch(self.max_pairs)
+            except Exception as e:
+                vocaline_logger.log('ERROR', None, None,
+                                   f'Erreur dans le moteur d\'appariement: {str(e)}',
+                                   {'error': str(e)})
+                continue
+            # Lot plein : il reste probablement des paires à former au prochain tick
+            if pairs >= self.max_pairs:
+                self._pending.set()
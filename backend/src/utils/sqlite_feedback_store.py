@@ -0,0 +1,111 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.utils.feedback_store import LEGACY_FEEDBACK_FILE, GroupCommitWriter, load_legacy_feedback, \
+    with_display_fields
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteFeedbackStore:
+    """Avis stockés dans une base SQLite en mode WAL (même interface que JsonlFeedbackStore)
+
+    Chaque avis est une ligne (seq, JSON de l'avis) ajoutée par un INSERT :
+    O(1) quel que soit le nombre d'avis. Les avis ne sont jamais supprimés,
+    le rang d'un avis est donc seq - 1 et une plage se lit par clé primaire.
+    Plusieurs workers peuvent partager la même base.
+
+    Les ajouts passent par un GroupCommitWriter : les avis simultanés sont
+    insérés dans une même transaction, validée en synchronous=FULL, et
+    append() ne retourne qu'une fois la transaction durable.
+    """
+
+    def __init__(self, path: str, legacy_path: str = LEGACY_FEEDBACK_FILE, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        self._migrate(legacy_path)
+        self._writer = GroupCommitWriter(self._commit)
+        atexit.register(self.close)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, legacy_path: str):
+        """Reprendre les avis de l'ancien feedback.json, une seule fois (marqueur dans meta)"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone() is None:
+                conn.executemany('INSERT INTO feedback (entry) VALUES (?)',
+                                 [(json.dumps(with_display_fields(entry), ensure_ascii=False),)
+                                  for entry in load_legacy_feedback(legacy_path)])
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', '1')")
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def append(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajouter un avis, retourne une fois la transaction qui le contient validée"""
+        self._writer.submit(json.dumps(with_display_fields(entry), ensure_ascii=False))
+        return entry
+
+    def _commit(self, entries: List[str]):
+        """Insérer un lot d'avis en une transaction (thread d'écriture)"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT INTO feedback (entry) VALUES (?)', [(entry,) for entry in entries])
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def __len__(self) -> int:
+        return self._conn().execute('SELECT COALESCE(MAX(seq), 0) FROM feedback').fetchone()[0]
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Avis de rang start (inclus) à stop (exclu), du plus ancien au plus récent"""
+        rows = self._conn().execute(
+            'SELECT entry FROM feedback WHERE seq > ? AND seq <= ? ORDER BY seq',
+            (start, stop if stop is not None else 2 ** 62)).fetchall()
+        return [with_display_fields(json.loads(row[0])) for row in rows]
+
+    def entries_at(self, ranks: List[int]) -> List[Dict[str, Any]]:
+        """Avis des rangs donnés, dans l'ordre de `ranks` (une seule requête)"""
+        if not ranks:
+            return []
+        rows = dict(self._conn().execute(
+            f'SELECT seq, entry FROM feedback WHERE seq IN ({", ".join("?" * len(ranks))})',
+            [rank + 1 for rank in ranks]).fetchall())
+        return [with_display_fields(json.loads(rows[rank + 1])) for rank in ranks]
+
+    def close(self):
+        self._writer.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
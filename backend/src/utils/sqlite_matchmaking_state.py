@@ -0,0 +1,323 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.logger import vocaline_logger
+from src.utils.matchmaking_state import Session
+from src.utils.metrics import matchmaking_metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    room TEXT,
+    partner TEXT,
+    waiting INTEGER NOT NULL DEFAULT 0,
+    ice_batching INTEGER NOT NULL DEFAULT 0,
+    worker TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiting (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sid TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS waiting_username ON waiting (username);
+CREATE TABLE IF NOT EXISTS rooms (
+    room_id TEXT PRIMARY KEY,
+    user1 TEXT NOT NULL,
+    user2 TEXT NOT NULL
+);
+"""
+
+
+class _SessionTable:
+    """Vue dict en lecture seule sur la table sessions ({socket_id: Session})"""
+
+    COLUMNS = 'user_id, username, room, partner, waiting, ice_batching'
+
+    def __init__(self, state):
+        self._state = state
+
+    @staticmethod
+    def _row_to_session(row) -> Session:
+        return Session(row[0], row[1], row[2], row[3], bool(row[4]), bool(row[5]))
+
+    def get(self, socket_id, default=None):
+        row = self._state._conn().execute(
+            f'SELECT {self.COLUMNS} FROM sessions WHERE sid = ?', (socket_id,)).fetchone()
+        return self._row_to_session(row) if row else default
+
+    def __contains__(self, socket_id) -> bool:
+        return self._state._conn().execute(
+            'SELECT 1 FROM sessions WHERE sid = ?', (socket_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._state._conn().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def items(self):
+        rows = self._state._conn().execute(
+            f'SELECT sid, {self.COLUMNS} FROM sessions').fetchall()
+        return [(row[0], self._row_to_session(row[1:])) for row in rows]
+
+
+class _RoomTable:
+    """Vue dict en lecture seule sur la table rooms"""
+
+    def __init__(self, state):
+        self._state = state
+
+    def get(self, room_id, default=None):
+        row = self._state._conn().execute(
+            'SELECT user1, user2 FROM rooms WHERE room_id = ?', (room_id,)).fetchone()
+        return {'user1': row[0], 'user2': row[1]} if row else default
+
+    def __getitem__(self, room_id):
+        room_data = self.get(room_id)
+        if room_data is None:
+            raise KeyError(room_id)
+        return room_data
+
+    def __contains__(self, room_id) -> bool:
+        return self.get(room_id) is not None
+
+    def __len__(self) -> int:
+        return self._state._conn().execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+
+    def items(self):
+        rows = self._state._conn().execute('SELECT room_id, user1, user2 FROM rooms').fetchall()
+        return [(row[0], {'user1': row[1], 'user2': row[2]}) for row in rows]
+
+
+class _WaitingTable:
+    """Vue sur la file d'attente partagée, compatible avec WaitingPool"""
+
+    def __init__(self, state):
+        self._state = state
+
+    def __len__(self) -> int:
+        return self._state._conn().execute('SELECT COUNT(*) FROM waiting').fetchone()[0]
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, socket_id) -> bool:
+        return self._state._conn().execute(
+            'SELECT 1 FROM waiting WHERE sid = ?', (socket_id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.snapshot())
+
+    def discard(self, socket_id: str) -> bool:
+        with self._state._transaction() as conn:
+            conn.execute('UPDATE sessions SET waiting = 0 WHERE sid = ?', (socket_id,))
+            return conn.execute('DELETE FROM waiting WHERE sid = ?', (socket_id,)).rowcount > 0
+
+    def count_username(self, username: str) -> int:
+        return self._state._conn().execute(
+            'SELECT COUNT(*) FROM waiting WHERE username = ?', (username,)).fetchone()[0]
+
+    def snapshot(self, limit: int = None) -> List[str]:
+        rows = self._state._conn().execute(
+            'SELECT sid FROM waiting ORDER BY seq LIMIT ?',
+            (-1 if limit is None else limit,)).fetchall()
+        return [row[0] for row in rows]
+
+
+class SQLiteMatchmakingState:
+    """État du matchmaking partagé entre plusieurs processus via une base SQLite
+
+    Même interface que MatchmakingState. Chaque transition est une transaction
+    BEGIN IMMEDIATE : SQLite sérialise les écritures entre threads et entre
+    processus, un partenaire ne peut donc être apparié qu'une fois quel que
+    soit le worker qui traite la demande. La base est en mode WAL pour que
+    les lectures (relais de signaling, statistiques) ne bloquent pas.
+
+    Les sessions sont marquées avec l'identifiant du worker qui les a créées ;
+    au démarrage, celles des workers disparus de cette machine sont purgées.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._local = threading.local()
+        self.connected_users = _SessionTable(self)
+        self.waiting_users = _WaitingTable(self)
+        self.active_rooms = _RoomTable(self)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        self._migrate()
+        self._purge_dead_workers()
+
+    def _migrate(self):
+        # Bases créées avant l'ajout de colonnes à la table sessions
+        added_columns = {
+            'partner': 'TEXT',
+            'ice_batching': 'INTEGER NOT NULL DEFAULT 0'
+        }
+        columns = {row[1] for row in self._conn().execute('PRAGMA table_info(sessions)')}
+        for column, definition in added_columns.items():
+            if column not in columns:
+                self._conn().execute(f'ALTER TABLE sessions ADD COLUMN {column} {definition}')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _purge_dead_workers(self):
+        hostname = socket.gethostname()
+        with self._transaction() as conn:
+            workers = [row[0] for row in conn.execute('SELECT DISTINCT worker FROM sessions')]
+            dead = []
+            for worker in workers:
+                host, _, pid = worker.rpartition(':')
+                if host == hostname and pid.isdigit() and not _pid_alive(int(pid)):
+                    dead.append(worker)
+            for worker in dead:
+                sids = [row[0] for row in conn.execute(
+                    'SELECT sid FROM sessions WHERE worker = ?', (worker,))]
+                for socket_id in sids:
+                    self._remove_session(conn, socket_id)
+        if dead:
+            vocaline_logger.log('CLEANUP', None, None,
+                               f'Sessions purgées de {len(dead)} workers arrêtés',
+                               {'workers': dead})
+
+    @staticmethod
+    def _remove_session(conn, socket_id):
+        conn.execute('DELETE FROM sessions WHERE sid = ?', (socket_id,))
+        conn.execute('DELETE FROM waiting WHERE sid = ?', (socket_id,))
+        for room_id, in conn.execute('SELECT room_id FROM rooms WHERE user1 = ? OR user2 = ?',
+                                     (socket_id, socket_id)).fetchall():
+            conn.execute('DELETE FROM rooms WHERE room_id = ?', (room_id,))
+            conn.execute('UPDATE sessions SET room = NULL, partner = NULL WHERE room = ?', (room_id,))
+
+    def register(self, socket_id: str, user_id: str, username: str,
+                 ice_batching: bool = False) -> bool:
+        with self._transaction() as conn:
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO sessions '
+                '(sid, user_id, username, room, waiting, ice_batching, worker) '
+                'VALUES (?, ?, ?, NULL, 0, ?, ?)',
+                (socket_id, user_id, username, int(ice_batching), self.worker_id)).rowcount > 0
+            if not inserted:
+                conn.execute('UPDATE sessions SET user_id = ?, username = ?, ice_batching = ? '
+                             'WHERE sid = ?', (user_id, username, int(ice_batching), socket_id))
+            return inserted
+
+    def unregister(self, socket_id: str) -> Optional[Session]:
+        with self._transaction() as conn:
+            row = conn.execute(f'SELECT {_SessionTable.COLUMNS} FROM sessions WHERE sid = ?',
+                               (socket_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (socket_id,))
+            conn.execute('DELETE FROM waiting WHERE sid = ?', (socket_id,))
+            return _SessionTable._row_to_session(row)
+
+    def enqueue(self, socket_id: str) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute('SELECT username, room, waiting FROM sessions WHERE sid = ?',
+                               (socket_id,)).fetchone()
+            if row is None or row[1] or row[2]:
+                return False
+            conn.execute('UPDATE sessions SET waiting = 1 WHERE sid = ?', (socket_id,))
+            conn.execute('INSERT INTO waiting (sid, username, enqueued_at) VALUES (?, ?, ?)',
+                         (socket_id, row[0], time.time()))
+            return True
+
+    @staticmethod
+    def _find_partner(conn, socket_id: str, username: str) -> Optional[str]:
+        row = conn.execute('SELECT sid FROM waiting WHERE username != ? AND sid != ? '
+                           'ORDER BY seq LIMIT 1', (username, socket_id)).fetchone()
+        return row[0] if row else None
+
+    def _open_room(self, conn, initiator: str, receiver: str) -> str:
+        room_id = str(uuid.uuid4())
+        enqueued = conn.execute('SELECT enqueued_at FROM waiting WHERE sid IN (?, ?)',
+                                (initiator, receiver)).fetchall()
+        now = time.time()
+        matchmaking_metrics.record_match(*(now - row[0] for row in enqueued))
+        conn.execute('DELETE FROM waiting WHERE sid IN (?, ?)', (initiator, receiver))
+        conn.execute('INSERT INTO rooms (room_id, user1, user2) VALUES (?, ?, ?)',
+                     (room_id, initiator, receiver))
+        conn.execute('UPDATE sessions SET room = ?, partner = ?, waiting = 0 WHERE sid = ?',
+                     (room_id, receiver, initiator))
+        conn.execute('UPDATE sessions SET room = ?, partner = ?, waiting = 0 WHERE sid = ?',
+                     (room_id, initiator, receiver))
+        return room_id
+
+    def pair(self, socket_id: str) -> Optional[Tuple[str, str]]:
+        with self._transaction() as conn:
+            row = conn.execute('SELECT username FROM waiting WHERE sid = ?', (socket_id,)).fetchone()
+            if row is None:
+                return None
+            partner_socket_id = self._find_partner(conn, socket_id, row[0])
+            if partner_socket_id is None:
+                return None
+            return self._open_room(conn, socket_id, partner_socket_id), partner_socket_id
+
+    def pop_pair(self) -> Optional[Tuple[str, str, str]]:
+        with self._transaction() as conn:
+            head = conn.execute('SELECT sid, username FROM waiting ORDER BY seq LIMIT 1').fetchone()
+            if head is None:
+                return None
+            receiver, username = head
+            initiator = self._find_partner(conn, receiver, username)
+            if initiator is None:
+                return None
+            return self._open_room(conn, initiator, receiver), initiator, receiver
+
+    def close_room(self, room_id: str) -> Optional[Dict[str, str]]:
+        with self._transaction() as conn:
+            row = conn.execute('SELECT user1, user2 FROM rooms WHERE room_id = ?',
+                               (room_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM rooms WHERE room_id = ?', (room_id,))
+            conn.execute('UPDATE sessions SET room = NULL, partner = NULL WHERE room = ?', (room_id,))
+            return {'user1': row[0], 'user2': row[1]}
+
+    @staticmethod
+    def partner_of(room_data: Dict[str, str], socket_id: str) -> Optional[str]:
+        if room_data['user1'] == socket_id:
+            return room_data['user2']
+        if room_data['user2'] == socket_id:
+            return room_data['user1']
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,300 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class WaitingPool:
+    """File d'attente FIFO indexée des utilisateurs en attente de matchmaking.
+
+    Ajout, retrait et test d'appartenance en O(1). La recherche du premier
+    partenaire éligible est en O(1) tant qu'aucun homonyme n'attend ; sinon
+    elle ne saute que les entrées portant le même nom d'utilisateur.
+    """
+
+    def __init__(self):
+        # {socket_id: (username, enqueued_at)}, enqueued_at en time.monotonic()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._username_counts: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __contains__(self, socket_id) -> bool:
+        return socket_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def add(self, socket_id: str, username: str, enqueued_at: float = None) -> bool:
+        """Ajouter un utilisateur en fin de file (sans effet s'il y est déjà)"""
+        if socket_id in self._entries:
+            return False
+        if enqueued_at is None:
+            enqueued_at = time.monotonic()
+        self._entries[socket_id] = (username, enqueued_at)
+        self._username_counts[username] = self._username_counts.get(username, 0) + 1
+        return True
+
+    def discard(self, socket_id: str) -> bool:
+        """Retirer un utilisateur de la file, retourne False s'il n'y était pas"""
+        entry = self._entries.pop(socket_id, None)
+        if entry is None:
+            return False
+        username = entry[0]
+        remaining = self._username_counts[username] - 1
+        if remaining:
+            self._username_counts[username] = remaining
+        else:
+            del self._username_counts[username]
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._username_counts.clear()
+
+    def username_of(self, socket_id: str) -> Optional[str]:
+        entry = self._entries.get(socket_id)
+        return entry[0] if entry else None
+
+    def enqueued_at(self, socket_id: str) -> Optional[float]:
+        entry = self._entries.get(socket_id)
+        return entry[1] if entry else None
+
+    def head(self) -> Optional[Tuple[str, str, float]]:
+        """Premier utilisateur en attente : (socket_id, username, enqueued_at)"""
+        for socket_id, (username, enqueued_at) in self._entries.items():
+            return socket_id, username, enqueued_at
+        return None
+
+    def count_username(self, username: str) -> int:
+        """Nombre d'utilisateurs en attente portant ce nom"""
+        return self._username_counts.get(username, 0)
+
+    def count_eligible(self, username: str, exclude: str = None) -> int:
+        """Nombre de partenaires potentiels pour `username`, calculé en O(1)"""
+        candidates = len(self._entries) - self._username_counts.get(username, 0)
+        excluded_name = self.username_of(exclude) if exclude is not None else None
+        if excluded_name is not None and excluded_name != username:
+            candidates -= 1
+        return candidates
+
+    def find_partner(self, username: str, exclude: str = None,
+                     is_valid: Callable[[str], bool] = None,
+                     evicted: List[str] = None) -> Optional[str]:
+        """Trouver le premier utilisateur en attente dont le nom diffère de `username`
+
+        `exclude` est ignoré (l'utilisateur qui cherche). Si `is_valid` est fourni,
+        les entrées invalides rencontrées sont retirées de la file et ajoutées à
+        `evicted` quand cette liste est fournie.
+        """
+        if self.count_eligible(username, exclude) <= 0:
+            return None
+
+        stale = []
+        partner = None
+        for socket_id, (partner_username, _) in self._entries.items():
+            if partner_username == username or socket_id == exclude:
+                continue
+            if is_valid is not None and not is_valid(socket_id):
+                stale.append(socket_id)
+                continue
+            partner = socket_id
+            break
+
+        for socket_id in stale:
+            self.discard(socket_id)
+        if evicted is not None:
+            evicted.extend(stale)
+        return partner
+
+    def pop_pair(self, is_valid: Callable[[str], bool] = None,
+                 evicted: List[str] = None,
+                 enqueued: Dict[str, float] = None) -> Optional[Tuple[str, str]]:
+        """Retirer la paire éligible la plus ancienne, sous la forme (plus ancien, plus récent)
+
+        Retourne None quand plus aucune paire n'est possible (file vide ou
+        uniquement des homonymes). Si `enqueued` est fourni, il reçoit la date
+        d'entrée en file des deux utilisateurs retirés.
+        """
+        while self._entries:
+            head, username, _ = self.head()
+            if is_valid is not None and not is_valid(head):
+                self.discard(head)
+                if evicted is not None:
+                    evicted.append(head)
+                continue
+            partner = self.find_partner(username, exclude=head, is_valid=is_valid, evicted=evicted)
+            if partner is None:
+                return None
+            if enqueued is not None:
+                enqueued[head] = self.enqueued_at(head)
+                enqueued[partner] = self.enqueued_at(partner)
+            self.discard(head)
+            self.discard(partner)
+            return head, partner
+        return None
+
+    def snapshot(self, limit: int = None) -> List[str]:
+        """Copie ordonnée des identifiants en attente (limitée aux `limit` premiers)"""
+        return [socket_id for _, socket_id in self.timed_snapshot(limit)]
+
+    def timed_snapshot(self, limit: int = None) -> List[Tuple[float, str]]:
+        """Comme snapshot(), avec la date d'entrée en file : [(enqueued_at, socket_id)]"""
+        snapshot = []
+        for socket_id, (_, enqueued_at) in self._entries.items():
+            if limit is not None and len(snapshot) >= limit:
+                break
+            snapshot.append((enqueued_at, socket_id))
+        return snapshot
+
+
+class ShardedWaitingPool:
+    """WaitingPool découpée en partitions, chacune protégée par son propre verrou
+
+    Un utilisateur est placé dans la partition désignée par le hash de son
+    socket_id : les ajouts et retraits d'utilisateurs différents ne se disputent
+    donc pas un verrou global. L'appariement prend au plus deux verrous de
+    partition, toujours dans l'ordre croissant des index (pas d'interblocage),
+    et retire les deux utilisateurs de manière atomique : un même partenaire ne
+    peut pas être apparié deux fois.
+
+    L'ordre est FIFO dans une partition, mais seulement approché entre
+    partitions : claim_partner ne compare que les têtes de partition, relevées
+    sans verrou global, puis prend le premier partenaire éligible de la
+    partition dont la tête est la plus ancienne. Si cette tête est inéligible
+    (même nom d'utilisateur), un utilisateur plus récent de la même partition
+    passe devant un utilisateur éligible plus ancien d'une autre partition ; un
+    ajout ou un retrait concurrent pendant le parcours peut aussi décaler
+    l'ordre. Avec une seule partition, l'ordre est strictement FIFO.
+    """
+
+    def __init__(self, partitions: int = 8):
+        self._partitions = [WaitingPool() for _ in range(partitions)]
+        self._locks = [threading.Lock() for _ in range(partitions)]
+
+    def _index(self, socket_id: str) -> int:
+        return hash(socket_id) % len(self._partitions)
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self._partitions)
+
+    def __bool__(self) -> bool:
+        return any(self._partitions)
+
+    def __contains__(self, socket_id) -> bool:
+        return socket_id in self._partitions[self._index(socket_id)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.snapshot())
+
+    def add(self, socket_id: str, username: str, enqueued_at: float = None) -> bool:
+        index = self._index(socket_id)
+        with self._locks[index]:
+            return self._partitions[index].add(socket_id, username, enqueued_at)
+
+    def discard(self, socket_id: str) -> bool:
+        index = self._index(socket_id)
+        with self._locks[index]:
+            return self._partitions[index].discard(socket_id)
+
+    def clear(self):
+        for index, partition in enumerate(self._partitions):
+            with self._locks[index]:
+                partition.clear()
+
+    def username_of(self, socket_id: str) -> Optional[str]:
+        index = self._index(socket_id)
+        with self._locks[index]:
+            return self._partitions[index].username_of(socket_id)
+
+    def enqueued_at(self, socket_id: str) -> Optional[float]:
+        index = self._index(socket_id)
+        with self._locks[index]:
+            return self._partitions[index].enqueued_at(socket_id)
+
+    def count_username(self, username: str) -> int:
+        return sum(partition.count_username(username) for partition in self._partitions)
+
+    def count_eligible(self, username: str, exclude: str = None) -> int:
+        return sum(partition.count_eligible(username, exclude) for partition in self._partitions)
+
+    def _heads(self) -> List[Tuple[float, int, str, str]]:
+        """Têtes de partition triées de la plus ancienne à la plus récente"""
+        heads = []
+        for index, partition in enumerate(self._partitions):
+            with self._locks[index]:
+                head = partition.head()
+            if head is not None:
+                socket_id, username, enqueued_at = head
+                heads.append((enqueued_at, index, socket_id, username))
+        heads.sort()
+        return heads
+
+    def claim_partner(self, socket_id: str, username: str,
+                      is_valid: Callable[[str], bool] = None,
+                      evicted: List[str] = None,
+                      enqueued: Dict[str, float] = None) -> Optional[str]:
+        """Retirer atomiquement `socket_id` et son premier partenaire éligible
+
+        Les partitions sont parcourues de la plus ancienne tête à la plus récente.
+        Retourne None si aucun partenaire n'est disponible ou si `socket_id`
+        n'est plus en attente (déjà apparié par un autre handler). Si `enqueued`
+        est fourni, il reçoit la date d'entrée en file des deux utilisateurs.
+        """
+        own = self._index(socket_id)
+        for _, index, _, _ in self._heads():
+            locks = [self._locks[i] for i in sorted({own, index})]
+            for lock in locks:
+                lock.acquire()
+            try:
+                if socket_id not in self._partitions[own]:
+                    return None
+                partner = self._partitions[index].find_partner(
+                    username, exclude=socket_id, is_valid=is_valid, evicted=evicted)
+                if partner is not None:
+                    if enqueued is not None:
+                        enqueued[socket_id] = self._partitions[own].enqueued_at(socket_id)
+                        enqueued[partner] = self._partitions[index].enqueued_at(partner)
+                    self._partitions[own].discard(socket_id)
+                    self._partitions[index].discard(partner)
+                    return partner
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        return None
+
+    def pop_pair(self, is_valid: Callable[[str], bool] = None,
+                 evicted: List[str] = None,
+                 enqueued: Dict[str, float] = None) -> Optional[Tuple[str, str]]:
+        """Retirer la paire éligible la plus ancienne : (plus ancien, plus récent)"""
+        while True:
+            heads = self._heads()
+            if not heads:
+                return None
+            _, _, head, username = heads[0]
+            if is_valid is not None and not is_valid(head):
+                if self.discard(head) and evicted is not None:
+                    evicted.append(head)
+                continue
+            partner = self.claim_partner(head, username, is_valid=is_valid, evicted=evicted,
+                                         enqueued=enqueued)
+            if partner is not None:
+                return head, partner
+            if head in self:
+                # La tête la plus ancienne n'a aucun partenaire : il ne reste que des homonymes
+                return None
+
+    def snapshot(self, limit: int = None) -> List[str]:
+        """Identifiants en attente, toutes partitions fusionnées par ordre d'arrivée"""
+        snapshots = []
+        for index, partition in enumerate(self._partitions):
+            with self._locks[index]:
+                snapshots.append(partition.timed_snapshot(limit))
+        # sorted() fusionne les séquences déjà triées de chaque partition (Timsort), en C
+        merged = sorted(itertools.chain.from_iterable(snapshots))
+        return [socket_id for _, socket_id in (merged if limit is None else merged[:limit])]
@@ -0,0 +1,69 @@
+"""Mesure du débit d'enregistrement des avis sous concurrence
+
+Plusieurs threads soumettent des avis en parallèle au stockage, comme des
+requêtes POST /api/feedback simultanées. Chaque ajout attend que son avis soit
+durable. Le script affiche le débit, le nombre de validations (fsync ou
+transactions) et la taille moyenne des lots. Il vérifie aussi qu'aucun avis
+n'est perdu, y compris après réouverture du stockage.
+
+Usage : python tools/bench_feedback.py [--backend jsonl|sqlite] [--threads 32] [--feedback 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.feedback_store import JsonlFeedbackStore
+from src.utils.sqlite_feedback_store import SQLiteFeedbackStore
+
+
+def open_store(backend: str, directory: str):
+    legacy_path = os.path.join(directory, 'feedback.json')
+    if backend == 'sqlite':
+        return SQLiteFeedbackStore(os.path.join(directory, 'feedback.db'), legacy_path)
+    return JsonlFeedbackStore(os.path.join(directory, 'feedback.jsonl'), legacy_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=['jsonl', 'sqlite'], default='jsonl')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--feedback', type=int, default=200, help='avis par thread')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(args.backend, directory)
+
+        def submit(thread: int):
+            for i in range(args.feedback):
+                store.append({'id': f'{thread}-{i}', 'feedback': f'Avis {i} du thread {thread}'})
+
+        threads = [threading.Thread(target=submit, args=(t,)) for t in range(args.threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = args.threads * args.feedback
+        commits = store._writer.commits
+        stored = len(store)
+        store.close()
+        reopened = open_store(args.backend, directory)
+        ids = {entry['id'] for entry in reopened.entries()}
+        reopened.close()
+
+    print(f'{args.backend}, {args.threads} threads : {total} avis en {elapsed:.2f} s '
+          f'({total / elapsed:.0f} avis/s), {commits} validations '
+          f'({total / max(commits, 1):.1f} avis par lot)')
+    print(f'  stockés : {stored}, relus après réouverture : {len(ids)} '
+          f'({"aucun avis perdu" if len(ids) == total else "AVIS PERDUS"})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Mesure de la recherche plein texte dans les avis (FeedbackIndex)
+
+Remplit un stockage JSONL temporaire d'avis générés (phrases françaises
+combinées au hasard), mesure la construction de l'index, son ajout
+incrémental, puis la latence de recherches typiques (termes, accents,
+préfixes, pages suivantes).
+
+Usage : python tools/bench_feedback_search.py [--feedback 100000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.feedback_search import FeedbackIndex
+from src.utils.feedback_store import JsonlFeedbackStore
+
+PHRASES = [
+    "Le son est coupé après quelques secondes d'appel", "Problème d'audio sur mobile",
+    "La connexion échoue souvent en 4G", "Très bonne application pour les routiers",
+    "Impossible de trouver un partenaire le soir", "L'écho du micro est gênant",
+    "Le bouton suivant ne répond pas sur iPhone", "Appels de qualité, merci !",
+    "Déconnexions fréquentes sur Android", "J'aimerais pouvoir choisir la région",
+    "Latence importante pendant les appels", "Interface claire et rapide",
+    "Le micro ne fonctionne pas avec le Bluetooth", "Connexions instables dans les tunnels",
+]
+QUERIES = ['audio', 'connexion', 'déconnexions', 'micro bluetooth', 'connex*', 'appel qualite',
+           'iphone', 'routier*', 'inexistant']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--feedback', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'feedback.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(args.feedback):
+                text = ' '.join(random.sample(PHRASES, random.randint(1, 3))) + f' ref{i}'
+                f.write(json.dumps({'id': str(i), 'feedback': text, 'timestamp': '2025-01-01T12:00:00'},
+                                   ensure_ascii=False) + '\n')
+        store = JsonlFeedbackStore(path, os.path.join(directory, 'feedback.json'))
+        index = FeedbackIndex(store)
+
+        start = time.perf_counter()
+        index.sync()
+        build = time.perf_counter() - start
+        stats = index.get_stats()
+        print(f'{stats["indexed"]} avis indexés en {build:.2f} s ({stats["terms"]} termes)')
+
+        start = time.perf_counter()
+        for i in range(100):
+            store.append({'id': f'new{i}', 'feedback': random.choice(PHRASES),
+                          'timestamp': '2025-01-02T12:00:00'})
+            index.sync()
+        print(f'  ajout incrémental : {(time.perf_counter() - start) / 100 * 1000:.2f} ms par avis '
+              '(fsync compris)')
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results, total = index.search(query, limit=20)
+            first = (time.perf_counter() - start) / args.repeat * 1000
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                index.search(query, offset=100, limit=20)
+            page = (time.perf_counter() - start) / args.repeat * 1000
+            print(f'  {query!r:>18} : {total:6d} avis, {first:6.2f} ms (page 6 : {page:6.2f} ms)')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Mesure du coût de VocalineLogger sur le chemin critique
+
+Remplit le logger jusqu'à son budget mémoire puis mesure, en régime établi
+(chaque ajout évince le log le plus ancien), le coût d'un appel à log() et de
+get_stats(). En mode --async, le coût mesuré est celui du handler (dépôt dans
+la file) ; le temps de vidage de la file par le thread de fond est affiché à part.
+Avec --dir, les logs sont aussi écrits dans des segments sur disque ; avec
+--no-policy, aucun type n'est échantillonné ni limité en débit.
+
+Usage : python tools/bench_logger.py [--memory 8388608] [--capacity 0] [--logs 200000]
+        [--async] [--dir /tmp/vocaline-logs] [--no-policy]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.log_store import SegmentedLogStore
+from src.utils.logger import DEFAULT_MEMORY_BYTES, VocalineLogger
+
+EVENT_TYPES = ['WEBRTC_ICE', 'WEBRTC_ICE', 'WEBRTC_ICE', 'WEBRTC_OFFER', 'MATCH_SUCCESS',
+               'JOIN_MATCHMAKING', 'MOBILE_DEBUG', 'ERROR']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--memory', type=int, default=DEFAULT_MEMORY_BYTES, help='budget mémoire (octets)')
+    parser.add_argument('--capacity', type=int, default=0, help='nombre maximal de logs (0 = budget seul)')
+    parser.add_argument('--logs', type=int, default=200000)
+    parser.add_argument('--async', dest='asynchronous', action='store_true')
+    parser.add_argument('--dir', help='répertoire des segments sur disque')
+    parser.add_argument('--no-policy', action='store_true', help='sans échantillonnage ni limite de débit')
+    args = parser.parse_args()
+
+    logger = VocalineLogger(capacity=args.capacity, asynchronous=args.asynchronous,
+                            policies={} if args.no_policy else None,
+                            store=SegmentedLogStore(args.dir) if args.dir else None,
+                            memory_bytes=args.memory)
+    i = 0
+    while not logger.get_stats()['memory']['evicted']:
+        for _ in range(1000):
+            logger.log(EVENT_TYPES[i % len(EVENT_TYPES)], f'sid{i % 500}', None, 'Préremplissage')
+            i += 1
+        logger.flush()
+
+    start = time.perf_counter()
+    for i in range(args.logs):
+        logger.log(EVENT_TYPES[i % len(EVENT_TYPES)], f'sid{i % 500}', f'room{i % 250}',
+                   'Candidat ICE envoyé par %s', {'candidate_type': 'host'}, (f'user{i % 500}',))
+    log_us = (time.perf_counter() - start) / args.logs * 1e6
+    start = time.perf_counter()
+    logger.flush()
+    drain_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        logger.get_stats()
+    stats_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    mode = 'asynchrone' if args.asynchronous else 'synchrone'
+    if args.dir:
+        mode += ', sur disque'
+    stats = logger.get_stats()
+    print(f'{stats["total_logs"]} logs en mémoire ({stats["memory"]["bytes"] / 2 ** 20:.1f} Mio estimés), '
+          f'{mode} : log() {log_us:.2f} µs, get_stats() {stats_us:.1f} µs')
+    if args.asynchronous:
+        print(f'  vidage de la file après la mesure : {drain_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
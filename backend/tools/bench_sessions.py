@@ -0,0 +1,70 @@
+"""Mesure de l'empreinte mémoire des sessions du matchmaking
+
+Compare l'ancien enregistrement (un dict par session) aux objets Session à
+__slots__, index par socket_id compris, ainsi que le coût d'une recherche de
+partenaire pour un relais de signaling (ancienne chaîne session -> room ->
+partenaire contre lecture directe de Session.partner).
+
+Usage : python tools/bench_sessions.py [--sessions 50000]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.matchmaking_state import Session
+
+
+def build(count, make_session):
+    socket_ids = [uuid.uuid4().hex[:20] for _ in range(count)]
+    room_ids = [str(uuid.uuid4()) for _ in range(count // 2)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = {}
+    for i, socket_id in enumerate(socket_ids):
+        partner = socket_ids[i ^ 1]
+        sessions[socket_id] = make_session(socket_id, f'user{i}', room_ids[i // 2], partner)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return sessions, socket_ids, room_ids, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50000)
+    args = parser.parse_args()
+    count = args.sessions - args.sessions % 2
+
+    dicts, socket_ids, room_ids, dict_bytes = build(
+        count, lambda sid, username, room, partner: {
+            'user_id': sid, 'username': username, 'room': room, 'waiting': False})
+    rooms = {room_ids[i // 2]: {'user1': socket_ids[i], 'user2': socket_ids[i + 1]}
+             for i in range(0, count, 2)}
+    slotted, slotted_ids, _, slot_bytes = build(
+        count, lambda sid, username, room, partner: Session(sid, username, room, partner))
+
+    def dict_lookup(socket_id=socket_ids[0]):
+        room_data = rooms[dicts[socket_id]['room']]
+        return room_data['user2'] if room_data['user1'] == socket_id else room_data['user1']
+
+    def slot_lookup(socket_id=slotted_ids[0]):
+        return slotted[socket_id].partner
+
+    loops = 1000000
+    dict_ns = timeit.timeit(dict_lookup, number=loops) / loops * 1e9
+    slot_ns = timeit.timeit(slot_lookup, number=loops) / loops * 1e9
+
+    print(f'{count} sessions (index par socket_id compris)')
+    print(f'  dict    : {dict_bytes / count:6.0f} octets/session, '
+          f'recherche du partenaire {dict_ns:5.0f} ns')
+    print(f'  Session : {slot_bytes / count:6.0f} octets/session, '
+          f'recherche du partenaire {slot_ns:5.0f} ns')
+    print(f'  gain mémoire : {100 * (1 - slot_bytes / dict_bytes):.0f}%')
+
+
+if __name__ == '__main__':
+    main()
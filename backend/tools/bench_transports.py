@@ -0,0 +1,142 @@
+"""Comparaison des transports Socket.IO (long-polling / WebSocket) sur le signaling
+
+Pour chaque transport, un serveur neuf est démarré puis `--pairs` paires de
+clients rejoignent le matchmaking. Deux phases sont mesurées :
+  - repos : coût CPU serveur d'un utilisateur connecté inactif (polls, pings),
+    à mesurer sur au moins un intervalle de ping (25 s par défaut) ;
+  - signaling : chaque initiateur enchaîne offre -> réponse relayées par le
+    serveur (un aller-retour à la fois par paire), pour le débit en messages
+    relayés par seconde, le CPU par message et la latence d'un aller-retour.
+
+Usage : python tools/bench_transports.py [--server gevent|threading] [--pairs 50]
+        [--idle 30] [--duration 10] [--transports polling,websocket]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server_process import ServerProcess, percentile
+
+
+class SignalingClient:
+    """Client de mesure : rejoint le matchmaking puis relaie offres et réponses"""
+
+    def __init__(self, url, transport, name, stats):
+        self.stats = stats
+        self.matched = threading.Event()
+        self.initiator = False
+        self.running = False
+        self.sent_at = 0.0
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('match_found', self.on_match_found)
+        self.sio.on('webrtc_offer', self.on_offer)
+        self.sio.on('webrtc_answer', self.on_answer)
+        self.sio.connect(url, transports=[transport], wait_timeout=30)
+        self.sio.emit('join_matchmaking', {'username': name})
+
+    def on_match_found(self, data):
+        self.initiator = data.get('should_start_call', False)
+        self.matched.set()
+
+    def on_offer(self, data):
+        self.stats['relayed'] += 1
+        if self.sio.connected:
+            self.sio.emit('webrtc_answer', data)
+
+    def on_answer(self, data):
+        self.stats['relayed'] += 1
+        self.stats['round_trips'].append(time.perf_counter() - self.sent_at)
+        if self.running:
+            self.send_offer()
+
+    def send_offer(self):
+        self.sent_at = time.perf_counter()
+        self.sio.emit('webrtc_offer', {'type': 'offer', 'sdp': 'v=0 ' + 'x' * 400})
+
+
+def run(transport, args):
+    env = {'VOCALINE_TRANSPORTS': 'polling,websocket'}
+    stats = {'relayed': 0, 'round_trips': []}
+    with ServerProcess(args.server, args.port, env) as server:
+        clients = [SignalingClient(server.url, transport, f'bench{i}', stats)
+                   for i in range(args.pairs * 2)]
+        for client in clients:
+            if not client.matched.wait(30):
+                raise RuntimeError('Appariement incomplet')
+        users = len(clients)
+        initiators = [client for client in clients if client.initiator]
+
+        # Phase de repos
+        time.sleep(1)
+        cpu_start = server.cpu_seconds()
+        time.sleep(args.idle)
+        idle_cpu = server.cpu_seconds() - cpu_start
+
+        # Phase de signaling
+        cpu_start = server.cpu_seconds()
+        start = time.perf_counter()
+        for client in initiators:
+            client.running = True
+            client.send_offer()
+        time.sleep(args.duration)
+        for client in initiators:
+            client.running = False
+        elapsed = time.perf_counter() - start
+        busy_cpu = server.cpu_seconds() - cpu_start
+        rss = server.rss_bytes()
+
+        # Laisser les derniers allers-retours se terminer, puis déconnecter en parallèle
+        # (une déconnexion en polling attend la fin du poll en cours)
+        time.sleep(1)
+        closers = [threading.Thread(target=client.sio.disconnect) for client in clients]
+        for closer in closers:
+            closer.start()
+        for closer in closers:
+            closer.join(timeout=30)
+
+    relayed = stats['relayed']
+    round_trips = stats['round_trips']
+    return {
+        'transport': transport,
+        'users': users,
+        'idle_cpu_us_per_user': 1e6 * idle_cpu / args.idle / users,
+        'messages_per_sec': relayed / elapsed,
+        'cpu_us_per_message': 1e6 * busy_cpu / relayed if relayed else 0.0,
+        'cpu_ms_per_user': 1000 * busy_cpu / elapsed / users,
+        'rtt_p50_ms': 1000 * percentile(round_trips, 0.5),
+        'rtt_p99_ms': 1000 * percentile(round_trips, 0.99),
+        'rss_mb': rss / 2 ** 20
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', default='gevent', choices=['gevent', 'threading'])
+    parser.add_argument('--pairs', type=int, default=50)
+    parser.add_argument('--idle', type=float, default=30, help='durée de la phase de repos (s)')
+    parser.add_argument('--duration', type=float, default=10, help='durée de la phase de signaling (s)')
+    parser.add_argument('--transports', default='polling,websocket')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    results = [run(transport.strip(), args) for transport in args.transports.split(',')]
+
+    print(f'Serveur {args.server}, {args.pairs * 2} utilisateurs connectés')
+    print(f'{"transport":<10} {"repos CPU/util.":>16} {"msg/s":>8} {"CPU/msg":>9} '
+          f'{"CPU/util.":>10} {"RTT p50":>8} {"RTT p99":>8} {"RSS":>7}')
+    for result in results:
+        print(f'{result["transport"]:<10} {result["idle_cpu_us_per_user"]:>11.1f} µs/s '
+              f'{result["messages_per_sec"]:>8.0f} {result["cpu_us_per_message"]:>6.0f} µs '
+              f'{result["cpu_ms_per_user"]:>5.2f} ms/s '
+              f'{result["rtt_p50_ms"]:>5.1f} ms {result["rtt_p99_ms"]:>5.1f} ms '
+              f'{result["rss_mb"]:>4.0f} Mo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Test de charge Socket.IO : sessions de matchmaking complètes simulées
+
+Des utilisateurs simulés arrivent selon un processus de Poisson (`--rate` par
+seconde, pendant `--duration` secondes). Chacun se connecte, envoie
+join_matchmaking, attend match_found, échange offre / réponse / candidats ICE
+avec son partenaire, garde l'appel (`--call` secondes en moyenne), puis
+quitte la conversation (et repart en attente) ou se déconnecte. Une session
+dure `--session` secondes en moyenne.
+
+Rapport : paires formées par seconde, latence join -> match_found, latence
+des relais de signaling, CPU et mémoire du serveur.
+
+Usage : python tools/loadtest.py [--server gevent|threading] [--rate 20] [--duration 60]
+        [--session 30] [--call 5] [--transport websocket|polling]
+        python tools/loadtest.py --url http://127.0.0.1:5000 --pid 1234
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import psutil
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server_process import ServerProcess, percentile
+
+
+class LoadStats:
+    def __init__(self):
+        self.users = 0
+        self.active = 0
+        self.peak_active = 0
+        self.pairs = 0
+        self.calls_left = 0
+        self.connect_errors = 0
+        self.unmatched = 0
+        self.match_latencies = []
+        self.relay_latencies = []
+        self.cpu_samples = []
+        self.rss_samples = []
+
+
+class SimulatedUser:
+    """Un utilisateur simulé, de la connexion à la déconnexion"""
+
+    def __init__(self, index, url, args, stats, rng):
+        self.index = index
+        self.url = url
+        self.args = args
+        self.stats = stats
+        self.rng = rng
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.matched = asyncio.Event()
+        self.call_ended = asyncio.Event()
+        self.room_id = None
+        self.initiator = False
+        self.waiting_since = 0.0
+
+        self.sio.on('match_found', self.on_match_found)
+        self.sio.on('partner_left', self.on_call_ended)
+        self.sio.on('partner_disconnected', self.on_call_ended)
+        self.sio.on('webrtc_offer', self.on_offer)
+        self.sio.on('webrtc_answer', self.on_relayed)
+        self.sio.on('webrtc_ice_candidate', self.on_relayed)
+        self.sio.on('webrtc_ice_candidates', self.on_ice_candidates)
+
+    async def on_match_found(self, data):
+        self.stats.match_latencies.append(time.perf_counter() - self.waiting_since)
+        self.room_id = data['room_id']
+        self.initiator = data.get('should_start_call', False)
+        if self.initiator:
+            self.stats.pairs += 1
+        self.call_ended.clear()
+        self.matched.set()
+
+    async def on_call_ended(self, data=None):
+        self.room_id = None
+        self.waiting_since = time.perf_counter()
+        self.call_ended.set()
+
+    async def on_offer(self, data):
+        await self.on_relayed(data)
+        await self.emit('webrtc_answer', {'type': 'answer', 'sdp': data.get('sdp'),
+                                          'sent_at': time.perf_counter()})
+        await self.send_ice_candidates()
+
+    async def on_relayed(self, data):
+        sent_at = data.get('sent_at')
+        if sent_at is not None:
+            self.stats.relay_latencies.append(time.perf_counter() - sent_at)
+
+    async def on_ice_candidates(self, data):
+        for candidate in data.get('candidates', []):
+            await self.on_relayed(candidate)
+
+    async def emit(self, event, data=None):
+        if self.sio.connected:
+            await self.sio.emit(event, data)
+
+    async def send_ice_candidates(self):
+        for i in range(self.args.ice):
+            await self.emit('webrtc_ice_candidate', {
+                'candidate': {'type': 'host', 'candidate': f'candidate:{i} 1 udp 2122260223 10.0.0.{i} 9 typ host'},
+                'sent_at': time.perf_counter()
+            })
+
+    async def run(self):
+        self.stats.users += 1
+        try:
+            await self.sio.connect(self.url, transports=[self.args.transport], wait_timeout=30)
+        except socketio.exceptions.ConnectionError:
+            self.stats.connect_errors += 1
+            return
+        self.stats.active += 1
+        self.stats.peak_active = max(self.stats.peak_active, self.stats.active)
+        try:
+            await self.session()
+        finally:
+            self.stats.active -= 1
+            await self.sio.disconnect()
+
+    async def session(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.rng.expovariate(1 / self.args.session)
+        self.waiting_since = time.perf_counter()
+        await self.emit('join_matchmaking', {'username': f'load{self.index}',
+                                             'ice_batching': self.args.ice_batching})
+        while True:
+            try:
+                await asyncio.wait_for(self.matched.wait(), max(deadline - loop.time(), 1))
+            except asyncio.TimeoutError:
+                self.stats.unmatched += 1
+                return
+            self.matched.clear()
+
+            if self.initiator:
+                await self.emit('webrtc_offer', {'type': 'offer', 'sdp': 'v=0 ' + 'x' * 400,
+                                                 'sent_at': time.perf_counter()})
+                await self.send_ice_candidates()
+
+            # Garder l'appel, sauf si le partenaire part avant
+            hold = self.rng.expovariate(1 / self.args.call)
+            try:
+                await asyncio.wait_for(self.call_ended.wait(), hold)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            if loop.time() >= deadline or self.rng.random() < self.args.disconnect_ratio:
+                return
+            self.stats.calls_left += 1
+            self.waiting_since = time.perf_counter()
+            await self.emit('leave_conversation')
+
+
+async def sample_server(process, stats, interval=1.0):
+    process.cpu_percent()
+    while True:
+        await asyncio.sleep(interval)
+        stats.cpu_samples.append(process.cpu_percent())
+        stats.rss_samples.append(process.memory_info().rss)
+
+
+async def load(url, process, args):
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    sampler = asyncio.create_task(sample_server(process, stats)) if process else None
+    users = []
+    start = time.perf_counter()
+    end = start + args.duration
+    index = 0
+    while time.perf_counter() < end:
+        user = SimulatedUser(index, url, args, stats, random.Random(rng.random()))
+        users.append(asyncio.create_task(user.run()))
+        index += 1
+        await asyncio.sleep(rng.expovariate(args.rate))
+
+    # Laisser les sessions en cours se terminer
+    done, pending = await asyncio.wait(users, timeout=args.drain)
+    for task in pending:
+        task.cancel()
+    # Les tâches annulées se déconnectent proprement (bloc finally de run)
+    await asyncio.gather(*pending, return_exceptions=True)
+    if sampler:
+        sampler.cancel()
+    return stats, time.perf_counter() - start
+
+
+def report(stats, elapsed, args):
+    match_ms = [1000 * value for value in stats.match_latencies]
+    relay_ms = [1000 * value for value in stats.relay_latencies]
+    print(f'{stats.users} utilisateurs simulés en {args.duration:.0f}s, mesure sur {elapsed:.0f}s '
+          f'({args.transport}), '
+          f'{stats.peak_active} connectés au maximum')
+    print(f'  paires formées     : {stats.pairs} ({stats.pairs / elapsed:.1f}/s), '
+          f'{stats.calls_left} leave_conversation')
+    print(f'  join -> match      : p50 {percentile(match_ms, 0.5):.1f} ms, '
+          f'p95 {percentile(match_ms, 0.95):.1f} ms, p99 {percentile(match_ms, 0.99):.1f} ms '
+          f'({len(match_ms)} mesures)')
+    print(f'  relais signaling   : p50 {percentile(relay_ms, 0.5):.1f} ms, '
+          f'p95 {percentile(relay_ms, 0.95):.1f} ms, p99 {percentile(relay_ms, 0.99):.1f} ms '
+          f'({len(relay_ms)} messages)')
+    if stats.cpu_samples:
+        print(f'  serveur            : CPU moyen {sum(stats.cpu_samples) / len(stats.cpu_samples):.0f}%, '
+              f'max {max(stats.cpu_samples):.0f}%, RSS max {max(stats.rss_samples) / 2 ** 20:.0f} Mo')
+    if stats.connect_errors or stats.unmatched:
+        print(f'  erreurs            : {stats.connect_errors} connexions refusées, '
+              f'{stats.unmatched} sessions terminées sans partenaire')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', default='gevent', choices=['gevent', 'threading'])
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--url', help='serveur déjà démarré (sinon un serveur est lancé)')
+    parser.add_argument('--pid', type=int, help='pid du serveur --url pour mesurer CPU et mémoire')
+    parser.add_argument('--rate', type=float, default=20, help='arrivées par seconde')
+    parser.add_argument('--duration', type=float, default=60, help='durée des arrivées (s)')
+    parser.add_argument('--session', type=float, default=30, help='durée moyenne d\'une session (s)')
+    parser.add_argument('--call', type=float, default=5, help='durée moyenne d\'un appel (s)')
+    parser.add_argument('--disconnect-ratio', type=float, default=0.3,
+                        help='part des fins d\'appel par déconnexion plutôt que leave_conversation')
+    parser.add_argument('--ice', type=int, default=4, help='candidats ICE envoyés par utilisateur et par appel')
+    parser.add_argument('--ice-batching', action='store_true', help='accepter les lots webrtc_ice_candidates')
+    parser.add_argument('--transport', default='websocket', choices=['websocket', 'polling'])
+    parser.add_argument('--drain', type=float, default=30, help='attente maximale des sessions en cours (s)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        process = psutil.Process(args.pid) if args.pid else None
+        stats, elapsed = asyncio.run(load(args.url, process, args))
+    else:
+        with ServerProcess(args.server, args.port) as server:
+            stats, elapsed = asyncio.run(load(server.url, server.process, args))
+    report(stats, elapsed, args)
+
+
+if __name__ == '__main__':
+    main()
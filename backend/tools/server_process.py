@@ -0,0 +1,83 @@
+"""Serveur Vocaline lancé dans un sous-processus pour les outils de mesure
+
+Dépendances des outils : pip install -r requirements-tools.txt
+"""
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# src/main.py lance Werkzeug en mode debug (rechargeur = second processus) :
+# le serveur threading est démarré sans rechargeur pour mesurer un seul processus
+THREADING_SERVER = (
+    "import os\n"
+    "from src.main import app, socketio\n"
+    "socketio.run(app, host='127.0.0.1', port=int(os.environ['PORT']),\n"
+    "             log_output=False, allow_unsafe_werkzeug=True)\n"
+)
+
+
+class ServerProcess:
+    """Démarrer le serveur (`gevent` ou `threading`), mesurer son CPU et sa mémoire
+
+    S'utilise comme context manager ; `env` complète les variables
+    d'environnement (ex : {'VOCALINE_TRANSPORTS': 'polling'}).
+    """
+
+    def __init__(self, server: str = 'gevent', port: int = 5099, env: dict = None):
+        self.server = server
+        self.port = port
+        self.url = f'http://127.0.0.1:{port}'
+        self.env = dict(os.environ, PORT=str(port), HOST='127.0.0.1', **(env or {}))
+        self.popen = None
+        self.process = None
+
+    def __enter__(self):
+        if self.server == 'gevent':
+            command = [sys.executable, 'run_gevent.py']
+        elif self.server == 'threading':
+            command = [sys.executable, '-c', THREADING_SERVER]
+        else:
+            raise ValueError(f'Serveur inconnu: {self.server}')
+        self.popen = subprocess.Popen(command, cwd=BACKEND_DIR, env=self.env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.process = psutil.Process(self.popen.pid)
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                self.status()
+                return self
+            except requests.ConnectionError:
+                if self.popen.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f'Le serveur {self.server} n\'a pas démarré')
+                time.sleep(0.1)
+
+    def __exit__(self, *exc_info):
+        self.popen.terminate()
+        try:
+            self.popen.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.popen.kill()
+
+    def status(self) -> dict:
+        return requests.get(f'{self.url}/api/status', timeout=5).json()
+
+    def cpu_seconds(self) -> float:
+        times = self.process.cpu_times()
+        return times.user + times.system
+
+    def rss_bytes(self) -> int:
+        return self.process.memory_info().rss
+
+
+def percentile(values, fraction: float) -> float:
+    """Percentile par rang le plus proche (0 pour une liste vide)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,129 @@
+"""Test de charge concurrent de l'état du matchmaking
+
+Plusieurs threads enchaînent au hasard join / leave / disconnect sur un même
+MatchmakingState, en reproduisant les transitions des handlers Socket.IO, puis
+les invariants de validate_user_states sont vérifiés.
+
+Usage : python tools/stress_matchmaking.py [--threads 32] [--ops 5000] [--users 200]
+        [--backend memory|sqlite:///chemin/state.db]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.cleanup import validate_user_states
+from src.utils.matchmaking_state import MatchmakingState, create_matchmaking_state
+
+
+def join(state, socket_id, username):
+    state.register(socket_id, socket_id, username)
+    if state.enqueue(socket_id):
+        return state.pair(socket_id)
+    return None
+
+
+def leave(state, socket_id):
+    user_data = state.connected_users.get(socket_id)
+    if not user_data or not user_data.room:
+        return None
+    room_data = state.close_room(user_data.room)
+    if room_data:
+        other_user_id = MatchmakingState.partner_of(room_data, socket_id)
+        if state.enqueue(other_user_id):
+            state.pair(other_user_id)
+    if state.enqueue(socket_id):
+        return state.pair(socket_id)
+    return None
+
+
+def disconnect(state, socket_id):
+    user_data = state.unregister(socket_id)
+    if user_data and user_data.room:
+        room_data = state.close_room(user_data.room)
+        if room_data:
+            other_user_id = MatchmakingState.partner_of(room_data, socket_id)
+            if state.enqueue(other_user_id):
+                state.pair(other_user_id)
+
+
+def worker(state, socket_ids, ops, seed, errors):
+    rng = random.Random(seed)
+    try:
+        for _ in range(ops):
+            socket_id = rng.choice(socket_ids)
+            action = rng.random()
+            if action < 0.45:
+                # Peu de noms différents pour exercer la prévention d'auto-connexion
+                join(state, socket_id, f'user{rng.randrange(len(socket_ids) // 4 or 1)}')
+            elif action < 0.8:
+                leave(state, socket_id)
+            elif action < 0.95:
+                disconnect(state, socket_id)
+            else:
+                batch = state.pop_pair()
+                if batch is not None and batch[1] == batch[2]:
+                    errors.append(f'User {batch[1]} paired with itself')
+    except Exception as e:
+        errors.append(f'{type(e).__name__}: {e}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--ops', type=int, default=5000, help='opérations par thread')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--partitions', type=int, default=8)
+    parser.add_argument('--stripes', type=int, default=64)
+    parser.add_argument('--backend', default='memory',
+                        help="'memory' ou 'sqlite:///chemin/state.db' (base recréée)")
+    args = parser.parse_args()
+
+    # Forcer des commutations de thread fréquentes pour provoquer les entrelacements
+    sys.setswitchinterval(1e-6)
+
+    if args.backend == 'memory':
+        state = MatchmakingState(pool_partitions=args.partitions, lock_stripes=args.stripes)
+    else:
+        path = args.backend[len('sqlite:///'):]
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        state = create_matchmaking_state(args.backend)
+    socket_ids = [f'sid{i:05d}' for i in range(args.users)]
+    errors = []
+    threads = [threading.Thread(target=worker, args=(state, socket_ids, args.ops, seed, errors))
+               for seed in range(args.threads)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    issues = errors + validate_user_states(state.waiting_users, state.connected_users,
+                                           state.active_rooms)
+    # Un utilisateur marqué en attente doit être en file (et réciproquement)
+    for socket_id, user_data in state.connected_users.items():
+        if user_data.waiting != (socket_id in state.waiting_users):
+            issues.append(f'User {socket_id} waiting flag out of sync with waiting_users')
+
+    total_ops = args.threads * args.ops
+    print(f'{total_ops} opérations en {elapsed:.2f}s ({total_ops / elapsed:.0f} ops/s) - '
+          f'{len(state.connected_users)} connectés, {len(state.waiting_users)} en attente, '
+          f'{len(state.active_rooms)} rooms')
+    if issues:
+        print(f'{len(issues)} incohérences détectées :')
+        for issue in issues[:20]:
+            print(f'  - {issue}')
+        sys.exit(1)
+    print('Aucune incohérence détectée')
+
+
+if __name__ == '__main__':
+    main()
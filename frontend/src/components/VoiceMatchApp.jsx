@@ -198,7 +198,8 @@ const VoiceMatchApp = () => {
     }
 
     // Rejoindre le matchmaking seulement si on a un stream audio valide
-    socket.emit('join_matchmaking', { username: username.trim() });
+    // ice_batching : le hook useWebRTC_MOBILE_DEBUG accepte les candidats ICE groupés (webrtc_ice_candidates)
+    socket.emit('join_matchmaking', { username: username.trim(), ice_batching: true });
     setIsJoined(true);
     
     // Stocker le stream pour WebRTC
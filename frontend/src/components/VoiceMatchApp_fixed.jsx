@@ -109,7 +109,8 @@ const VoiceMatchApp = () => {
       return;
     }
 
-    socket.emit('join_matchmaking', { username: username.trim() });
+    // ice_batching : le hook useWebRTC accepte les candidats ICE groupés (webrtc_ice_candidates)
+    socket.emit('join_matchmaking', { username: username.trim(), ice_batching: true });
     setIsJoined(true);
   };
 
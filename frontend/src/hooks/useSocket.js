@@ -9,9 +9,11 @@ export const useSocket = (serverUrl) => {
   useEffect(() => {
     const connectSocket = () => {
       const socketInstance = io(serverUrl, {
-        transports: ['polling'], // Forcer le polling au lieu de WebSocket
-        upgrade: false, // Désactiver l'upgrade vers WebSocket
-        rememberUpgrade: false,
+        // Connexion en polling puis upgrade vers WebSocket ; le polling reste
+        // utilisé si le WebSocket est bloqué (proxy, réseau d'entreprise)
+        transports: ['polling', 'websocket'],
+        upgrade: true,
+        rememberUpgrade: true, // Passer directement en WebSocket après un premier upgrade réussi
         forceNew: true // Forcer une nouvelle connexion
       });
 
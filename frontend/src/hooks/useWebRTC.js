@@ -118,11 +118,13 @@ export const useWebRTC = (socket, roomId, persistentAudio) => {
     socket.on('webrtc_offer', handleReceiveOffer);
     socket.on('webrtc_answer', handleReceiveAnswer);
     socket.on('webrtc_ice_candidate', handleReceiveIceCandidate);
+    socket.on('webrtc_ice_candidates', handleReceiveIceCandidates);
 
     return () => {
       socket.off('webrtc_offer', handleReceiveOffer);
       socket.off('webrtc_answer', handleReceiveAnswer);
       socket.off('webrtc_ice_candidate', handleReceiveIceCandidate);
+      socket.off('webrtc_ice_candidates', handleReceiveIceCandidates);
       
       if (peerConnection.current) {
         peerConnection.current.close();
@@ -161,6 +163,13 @@ export const useWebRTC = (socket, roomId, persistentAudio) => {
     }
   };
 
+  // Candidats ICE regroupés par le serveur (VOCALINE_ICE_BATCH_MS)
+  const handleReceiveIceCandidates = async (data) => {
+    for (const candidateData of data.candidates) {
+      await handleReceiveIceCandidate(candidateData);
+    }
+  };
+
   const startCall = async () => {
     try {
       console.log('Démarrage de l\'appel WebRTC...');
@@ -1,15 +1,17 @@
 import { useState, useRef, useCallback, useEffect } from 'react';
-import { useSocket } from './useSocket';
 
-export const useWebRTC = () => {
-  const [isConnected, setIsConnected] = useState(false);
+// Le signaling passe par le socket du matchmaking (celui qui a envoyé join_matchmaking) :
+// le serveur ne relaie offres, réponses et candidats ICE qu'entre sessions appariées
+export const useWebRTC = (socket, roomId, persistentAudio) => {
+  const [isCallActive, setIsCallActive] = useState(false);
   const [remoteStream, setRemoteStream] = useState(null);
   const [localStream, setLocalStream] = useState(null);
   const [isMuted, setIsMuted] = useState(false);
   const [connectionState, setConnectionState] = useState('new');
   
   const peerConnection = useRef(null);
-  const { socket } = useSocket();
+  const localAudioRef = useRef(null);
+  const remoteAudioRef = useRef(null);
   
   // 📱 LOGS MOBILES RENFORCÉS
   const logMobileDebug = useCallback((message, data = {}) => {
@@ -67,6 +69,11 @@ export const useWebRTC = () => {
           state,
           debug: `MOBILE_CONNECTION_${state.toUpperCase()}`
         });
+        // État rattaché à la room par le serveur (chronologie des appels, /logs/rooms)
+        socket.emit('webrtc_connection_state', {
+          state,
+          timestamp: new Date().toISOString()
+        });
       }
     };
     
@@ -93,7 +100,7 @@ export const useWebRTC = () => {
         });
         
         if (socket) {
-          socket.emit('ice-candidate', event.candidate);
+          socket.emit('webrtc_ice_candidate', { candidate: event.candidate });
           socket.emit('webrtc_ice', {
             type: 'ice_candidate_sent',
             candidateType: event.candidate.type,
@@ -216,15 +223,15 @@ export const useWebRTC = () => {
       logMobileDebug('Description locale définie');
       
       if (socket) {
-        socket.emit('offer', offer);
-        socket.emit('webrtc_offer', {
+        socket.emit('webrtc_offer', { offer });
+        socket.emit('webrtc_offer_debug', {
           type: 'offer_sent',
           offerType: offer.type,
           debug: 'MOBILE_OFFER_SENT'
         });
       }
       
-      setIsConnected(true);
+      setIsCallActive(true);
       
     } catch (error) {
       logMobileDebug('Erreur démarrage appel', {
@@ -305,7 +312,8 @@ export const useWebRTC = () => {
   useEffect(() => {
     if (!socket) return;
     
-    const handleOffer = async (offer) => {
+    // Signaling relayé par le serveur : { offer }, { answer }, { candidate }
+    const handleOffer = async ({ offer }) => {
       logMobileDebug('Offre reçue', { type: offer.type });
       
       try {
@@ -342,12 +350,13 @@ export const useWebRTC = () => {
         
         logMobileDebug('Réponse créée et définie', { type: answer.type });
         
-        socket.emit('answer', answer);
-        socket.emit('webrtc_answer', {
+        socket.emit('webrtc_answer', { answer });
+        socket.emit('webrtc_answer_debug', {
           type: 'answer_sent',
           answerType: answer.type,
           debug: 'MOBILE_ANSWER_SENT'
         });
+        setIsCallActive(true);
         
       } catch (error) {
         logMobileDebug('Erreur traitement offre', {
@@ -363,7 +372,7 @@ export const useWebRTC = () => {
       }
     };
     
-    const handleAnswer = async (answer) => {
+    const handleAnswer = async ({ answer }) => {
       logMobileDebug('Réponse reçue', { type: answer.type });
       
       try {
@@ -371,7 +380,7 @@ export const useWebRTC = () => {
           await peerConnection.current.setRemoteDescription(answer);
           logMobileDebug('Réponse appliquée avec succès');
           
-          socket.emit('webrtc_answer', {
+          socket.emit('webrtc_answer_debug', {
             type: 'answer_received',
             answerType: answer.type,
             debug: 'MOBILE_ANSWER_RECEIVED'
@@ -391,7 +400,7 @@ export const useWebRTC = () => {
       }
     };
     
-    const handleIceCandidate = async (candidate) => {
+    const handleIceCandidate = async ({ candidate }) => {
       logMobileDebug('Candidat ICE reçu', { 
         type: candidate.type,
         candidate: candidate.candidate?.substring(0, 50) + '...'
@@ -416,19 +425,28 @@ export const useWebRTC = () => {
       }
     };
     
-    socket.on('offer', handleOffer);
-    socket.on('answer', handleAnswer);
-    socket.on('ice-candidate', handleIceCandidate);
+    // Candidats groupés par le serveur (VOCALINE_ICE_BATCH_MS), dans l'ordre d'envoi
+    const handleIceCandidates = async ({ candidates }) => {
+      for (const candidateData of candidates) {
+        await handleIceCandidate(candidateData);
+      }
+    };
+    
+    socket.on('webrtc_offer', handleOffer);
+    socket.on('webrtc_answer', handleAnswer);
+    socket.on('webrtc_ice_candidate', handleIceCandidate);
+    socket.on('webrtc_ice_candidates', handleIceCandidates);
     
     return () => {
-      socket.off('offer', handleOffer);
-      socket.off('answer', handleAnswer);
-      socket.off('ice-candidate', handleIceCandidate);
+      socket.off('webrtc_offer', handleOffer);
+      socket.off('webrtc_answer', handleAnswer);
+      socket.off('webrtc_ice_candidate', handleIceCandidate);
+      socket.off('webrtc_ice_candidates', handleIceCandidates);
     };
   }, [socket, createPeerConnection, logMobileDebug]);
 
-  // Nettoyage avec logs
-  const cleanup = useCallback(() => {
+  // Fin d'appel avec logs
+  const endCall = useCallback(() => {
     logMobileDebug('Nettoyage WebRTC');
     
     if (peerConnection.current) {
@@ -436,15 +454,13 @@ export const useWebRTC = () => {
       peerConnection.current = null;
     }
     
-    if (localStream) {
-      localStream.getTracks().forEach(track => track.stop());
-      setLocalStream(null);
-    }
-    
+    // Le stream local est celui de l'application (window.vocalineAudioStream) :
+    // ne pas arrêter ses pistes, il sert à l'appel suivant
+    setLocalStream(null);
     setRemoteStream(null);
-    setIsConnected(false);
+    setIsCallActive(false);
     setConnectionState('new');
-  }, [localStream, logMobileDebug]);
+  }, [logMobileDebug]);
 
   // Toggle mute avec logs
   const toggleMute = useCallback(() => {
@@ -480,14 +496,16 @@ export const useWebRTC = () => {
   }, [logMobileDebug, socket]);
 
   return {
-    isConnected,
+    isCallActive,
     remoteStream,
     localStream,
     isMuted,
     connectionState,
+    localAudioRef,
+    remoteAudioRef,
     startCall,
     startRemoteAudio,
-    cleanup,
+    endCall,
     toggleMute
   };
 };